@@ -0,0 +1,71 @@
+import threading
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0
+
+    def observe(self, wait_ms: float, timed_out: bool = False):
+        index = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if wait_ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            self.buckets[index] += 1
+            self.count += 1
+            self.total_ms += wait_ms
+            self.max_ms = max(self.max_ms, wait_ms)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            histogram = {f"le_{bound}ms": n for bound, n in zip(WAIT_BUCKETS_MS, self.buckets)}
+            histogram["gt_max"] = self.buckets[-1]
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+                "timeout_s": pool.timeout(),
+                "checkouts": self.count,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "avg": round(self.total_ms / self.count, 3) if self.count else 0.0,
+                    "max": round(self.max_ms, 3),
+                    "histogram": histogram
+                }
+            }
+
+
+def _timed_get(stats: PoolStats, get):
+    started = time.perf_counter()
+    try:
+        connection = get()
+    except PoolTimeoutError:
+        stats.observe((time.perf_counter() - started) * 1000, timed_out=True)
+        raise
+    stats.observe((time.perf_counter() - started) * 1000)
+    return connection
+
+
+class MeteredQueuePool(QueuePool):
+    stats = PoolStats()
+
+    def _do_get(self):
+        return _timed_get(self.stats, super()._do_get)
+
+
+class MeteredAsyncPool(AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+    def _do_get(self):
+        return _timed_get(self.stats, super()._do_get)
@@ -0,0 +1,124 @@
+import argparse
+import importlib
+import os
+import pkgutil
+import re
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+import app.models
+from app.core.core import engine, Base
+
+MIGRATIONS_DIR = Path(os.getenv("MIGRATIONS_DIR", Path(__file__).resolve().parents[2] / "migrations"))
+MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+BASELINE = "0000_baseline"
+LOCK_KEY = 727_001
+
+DOLLAR_TAG = re.compile(r"\$[A-Za-z_]*\$")
+
+
+def load_models():
+    for module in pkgutil.iter_modules(app.models.__path__):
+        importlib.import_module(f"app.models.{module.name}")
+
+
+def split_statements(sql: str) -> list:
+    statements, current, quote, i = [], [], None, 0
+    while i < len(sql):
+        if quote:
+            if sql.startswith(quote, i):
+                current.append(quote)
+                i += len(quote)
+                quote = None
+                continue
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = len(sql) if end == -1 else end
+            continue
+        elif sql[i] == "'":
+            quote = "'"
+        elif sql[i] == "$" and DOLLAR_TAG.match(sql, i):
+            quote = DOLLAR_TAG.match(sql, i).group()
+            current.append(quote)
+            i += len(quote)
+            continue
+        elif sql[i] == ";":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += 1
+            continue
+        current.append(sql[i])
+        i += 1
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def revisions() -> list:
+    return sorted(MIGRATIONS_DIR.glob("*.sql"))
+
+
+def applied_revisions(conn) -> set:
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR PRIMARY KEY,
+            applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+        )
+    """)
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def pending_revisions(bind: Engine = engine) -> list:
+    with bind.connect() as conn:
+        applied = applied_revisions(conn)
+        conn.commit()
+    names = [BASELINE] if BASELINE not in applied else []
+    return names + [path.stem for path in revisions() if path.stem not in applied]
+
+
+def migrate(bind: Engine = engine) -> list:
+    load_models()
+    done = []
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+        conn.exec_driver_sql("SET statement_timeout = 0")
+        try:
+            applied = applied_revisions(conn)
+            record = text("INSERT INTO schema_migrations (version) VALUES (:version) ON CONFLICT DO NOTHING")
+            if BASELINE not in applied:
+                Base.metadata.create_all(bind=conn)
+                conn.execute(record, {"version": BASELINE})
+                done.append(BASELINE)
+            for path in revisions():
+                if path.stem in applied:
+                    continue
+                for statement in split_statements(path.read_text(encoding="utf-8")):
+                    conn.exec_driver_sql(statement)
+                conn.execute(record, {"version": path.stem})
+                done.append(path.stem)
+        finally:
+            conn.exec_driver_sql("RESET statement_timeout")
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply the schema baseline and pending migrations/*.sql revisions")
+    parser.add_argument("--status", action="store_true", help="List pending revisions without applying them")
+    args = parser.parse_args()
+
+    if args.status:
+        pending = pending_revisions()
+        print("\n".join(pending) if pending else "up to date")
+        return
+    done = migrate()
+    print("\n".join(f"applied {name}" for name in done) if done else "up to date")
+
+
+if __name__ == "__main__":
+    main()
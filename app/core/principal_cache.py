@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from starlette.concurrency import run_in_threadpool
+
+from app.models.auth import User
+from app.models.orga import Orga
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_URL = os.getenv("PRINCIPAL_CACHE_URL")
+PRINCIPAL_CACHE_TIMEOUT = float(os.getenv("PRINCIPAL_CACHE_TIMEOUT", "0.5"))
+
+SKIPPED_COLUMNS = {"password", "ver_code", "code_expires_at"}
+USER_COLUMNS = [c for c in User.__table__.columns if c.key not in SKIPPED_COLUMNS]
+
+
+class LocalBackend:
+    blocking = False
+
+    def __init__(self, ttl: float, size: int):
+        self.ttl = ttl
+        self.size = size
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._items.pop(key, None)
+
+    def clear(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._items if k.startswith(prefix)]:
+                del self._items[key]
+
+
+class RedisBackend:
+    blocking = True
+
+    def __init__(self, client, ttl: float, namespace: str = "principal:"):
+        self.client = client
+        self.ttl = max(1, int(ttl))
+        self.namespace = namespace
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.client.get(self.namespace + key)
+        except Exception:
+            traceback.print_exc()
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str):
+        try:
+            self.client.set(self.namespace + key, value, ex=self.ttl)
+        except Exception:
+            traceback.print_exc()
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*[self.namespace + key for key in keys])
+
+    def clear(self, prefix: str):
+        keys = list(self.client.scan_iter(match=f"{self.namespace}{prefix}*", count=500))
+        if keys:
+            self.client.delete(*keys)
+
+
+def _quietly(fn, *args):
+    try:
+        fn(*args)
+    except Exception:
+        traceback.print_exc()
+
+
+def _dump_user(user: User) -> str:
+    snapshot = {}
+    for column in USER_COLUMNS:
+        value = getattr(user, column.key)
+        if isinstance(value, (UUID, datetime)):
+            value = value.isoformat() if isinstance(value, datetime) else str(value)
+        snapshot[column.key] = value
+    return json.dumps(snapshot)
+
+
+def _load_user(raw: str) -> User:
+    snapshot = json.loads(raw)
+    for column in USER_COLUMNS:
+        value = snapshot.get(column.key)
+        if value is None:
+            continue
+        python_type = column.type.python_type
+        if python_type is UUID:
+            snapshot[column.key] = UUID(value)
+        elif python_type is datetime:
+            snapshot[column.key] = datetime.fromisoformat(value)
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+class PrincipalCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, fn, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    def defer(self, fn, *args):
+        if not self.backend.blocking:
+            return fn(*args)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="principal-cache")
+        self._executor.submit(_quietly, fn, *args)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def get_user(self, user_id) -> Optional[User]:
+        raw = self.backend.get(f"user:{user_id}")
+        return _load_user(raw) if raw else None
+
+    def put_user(self, user: User):
+        self.backend.set(f"user:{user.id}", _dump_user(user))
+
+    def org_exists(self, org_id) -> bool:
+        return self.backend.get(f"org:{org_id}") is not None
+
+    def put_org(self, org_id):
+        self.backend.set(f"org:{org_id}", "1")
+
+    def invalidate(self, user_ids=(), org_ids=()):
+        keys = [f"user:{i}" for i in user_ids] + [f"org:{i}" for i in org_ids]
+        if keys:
+            self.backend.delete(*keys)
+
+    def clear_users(self):
+        self.backend.clear("user:")
+
+    def clear_orgs(self):
+        self.backend.clear("org:")
+
+
+def make_backend(url: Optional[str] = PRINCIPAL_CACHE_URL, client=None):
+    if client is not None:
+        return RedisBackend(client, PRINCIPAL_CACHE_TTL)
+    if url:
+        import redis
+        client = redis.Redis.from_url(url, socket_timeout=PRINCIPAL_CACHE_TIMEOUT, socket_connect_timeout=PRINCIPAL_CACHE_TIMEOUT)
+        return RedisBackend(client, PRINCIPAL_CACHE_TTL)
+    return LocalBackend(PRINCIPAL_CACHE_TTL, PRINCIPAL_CACHE_SIZE)
+
+
+principal_cache = PrincipalCache(make_backend())
+
+
+def _pending(session: Session) -> dict:
+    return session.info.setdefault("principal_cache", {"users": set(), "orgs": set(), "clear_users": False, "clear_orgs": False})
+
+
+def _flush_pending(session: Session):
+    pending = session.info.pop("principal_cache", None)
+    if not pending:
+        return
+    principal_cache.defer(principal_cache.invalidate, pending["users"], pending["orgs"])
+    if pending["clear_users"]:
+        principal_cache.defer(principal_cache.clear_users)
+    if pending["clear_orgs"]:
+        principal_cache.defer(principal_cache.clear_orgs)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session: Session, flush_context):
+    users = {obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User)}
+    orgs = {obj.id for obj in session.deleted if isinstance(obj, Orga)}
+    if users or orgs:
+        pending = _pending(session)
+        pending["users"] |= users
+        pending["orgs"] |= orgs
+        principal_cache.defer(principal_cache.invalidate, users, orgs)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    if mapper.class_ is User:
+        _pending(orm_execute_state.session)["clear_users"] = True
+        principal_cache.defer(principal_cache.clear_users)
+    elif mapper.class_ is Orga and orm_execute_state.is_delete:
+        _pending(orm_execute_state.session)["clear_orgs"] = True
+        principal_cache.defer(principal_cache.clear_orgs)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    _flush_pending(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(session: Session, previous_transaction):
+    session.info.pop("principal_cache", None)
@@ -1,7 +1,9 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.core.core import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.core import get_async_db
+from app.core.principal_cache import principal_cache
 from app.models.auth import User
 import jwt
 from uuid import UUID
@@ -15,7 +17,7 @@ SECRET_KEY = "eyJhbGciOiJIUzI1NiJ9.ew0KICAic3ViIjogIjEyMzQ1Njc4OTAiLA0KICAibmFtZ
 ALGORITHM = "HS256"
 
 ph = PasswordHasher()
-async def get_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_me(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -32,9 +34,7 @@ async def get_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid user ID format")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Otter didn't find you in the system!")
+    user = await load_principal(db, user_id)
     if not user.email_verified:
         raise HTTPException(status_code=403, detail="Otter did not find such an email in the system!")
     if not user.is_active:
@@ -44,6 +44,17 @@ async def get_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_
 
     return user
 
+async def load_principal(db: AsyncSession, user_id: str) -> User:
+    cached = await principal_cache.run(principal_cache.get_user, user_id)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=401, detail="Otter didn't find you in the system!")
+    await principal_cache.run(principal_cache.put_user, user)
+    return user
+
 def get_hash(password: str) -> str:
     return ph.hash(password[:72])
 
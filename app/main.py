@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routers.router import router
 from app.routers.orga_rt import orga
@@ -8,11 +10,39 @@ from app.routers.report_rt import pdf
 from app.routers.stock_rt import stockk
 from app.routers.offline_rt import offline
 from app.routers.sklad_docs_rt import docs
-from app.core.core import engine, Base
+from app.routers.metrics_rt import internal
+from app.core.migrate import MIGRATE_ON_STARTUP, migrate
+from app.services.report_jobs import report_queue, recover_report_jobs
+from app.core.principal_cache import principal_cache
+from app.services.stock_history import STOCK_CHECKPOINT_POLL_SECONDS, checkpoint_loop
+from app.services.stock_partitions import STOCK_PARTITION_POLL_SECONDS, partition_loop
+from app.services.stock_analytics import STOCK_ROLLUP_POLL_SECONDS, rollup_loop
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-app = FastAPI(title="RSUE Backend", description="## Otter greets you!\n\nrsue.devoriole.ru", docs_url="/papers", version="0.4.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MIGRATE_ON_STARTUP:
+        await run_in_threadpool(migrate)
+    await run_in_threadpool(recover_report_jobs)
+    tasks = []
+    if STOCK_PARTITION_POLL_SECONDS > 0:
+        tasks.append(asyncio.create_task(partition_loop()))
+    if STOCK_CHECKPOINT_POLL_SECONDS > 0:
+        tasks.append(asyncio.create_task(checkpoint_loop()))
+    if STOCK_ROLLUP_POLL_SECONDS > 0:
+        tasks.append(asyncio.create_task(rollup_loop()))
+    yield
+    for task in tasks:
+        task.cancel()
+    report_queue.shutdown()
+    principal_cache.shutdown()
+
+
+app = FastAPI(title="RSUE Backend", description="## Otter greets you!\n\nrsue.devoriole.ru", docs_url="/papers", version="0.4.0", lifespan=lifespan)
+
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 app.add_middleware(
@@ -21,9 +51,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Sync-Cursor", "ETag"],
 )
 
-Base.metadata.create_all(bind=engine)
 app.include_router(router)
 app.include_router(orga)
 app.include_router(user)
@@ -33,6 +63,7 @@ app.include_router(pdf)
 app.include_router(stockk)
 app.include_router(offline)
 app.include_router(docs)
+app.include_router(internal)
 
 
 if __name__ == "__main__":
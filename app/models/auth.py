@@ -1,15 +1,14 @@
 from pydantic import BaseModel, Field, EmailStr
-from sqlalchemy import Column, String, DateTime, Integer, Date, Time, Boolean, MetaData, text, Table, VARCHAR
+from sqlalchemy import Column, String, DateTime, Integer, Date, Time, Boolean, text, Table, VARCHAR, Index
 from sqlalchemy.dialects.postgresql import UUID as pgUUID
 import uuid
 from datetime import date, time, datetime
-from app.core.core import Base, engine
+from app.core.core import Base
 from uuid import UUID, uuid4
 
-metadata = MetaData()
-
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_connect_organization", "connect_organization", postgresql_where=text("connect_organization IS NOT NULL")),)
 
     id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, index=True)
@@ -98,7 +97,3 @@ class ChooseSkladResponse(BaseModel):
                 "choosen_sklad": "3fa85f64-5717-4562-b3fc-2c963f66afa6"
             }
         }
-
-
-
-metadata.create_all(bind=engine)
\ No newline at end of file
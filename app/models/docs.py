@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Enum, func
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Boolean, Enum, Text, func
 from sqlalchemy.dialects.postgresql import UUID as pgUUID, JSONB
 from app.core.core import Base
 from uuid import uuid4
@@ -6,6 +6,7 @@ import enum
 from pydantic import BaseModel, model_validator
 from typing import Optional
 from uuid import UUID
+from datetime import datetime
 
 
 class DocumentType(str, enum.Enum):
@@ -63,6 +64,88 @@ class InventoryToken(Base):
         return f"<InventoryToken(org={self.organization_id}, token={self.token[:8]}...)>"
 
 
+class InventoryTokenItem(Base):
+    __tablename__ = "inventory_token_items"
+
+    token_id = Column(pgUUID(as_uuid=True), ForeignKey("inventory_tokens.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    article = Column(String, nullable=False)
+    barcode = Column(String, nullable=True)
+    unit = Column(String, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    sklad_name = Column(String, nullable=True)
+
+
+class ReportJobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ReportJob(Base):
+    __tablename__ = "report_jobs"
+
+    id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid4)
+    organization_id = Column(pgUUID(as_uuid=True), ForeignKey("organisations.id", ondelete="CASCADE"), nullable=False, index=True)
+    requested_by = Column(pgUUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    sklad_id = Column(pgUUID(as_uuid=True), ForeignKey("sklads.id", ondelete="CASCADE"), nullable=True)
+    status = Column(Enum(ReportJobStatus), default=ReportJobStatus.QUEUED, nullable=False)
+    error = Column(String, nullable=True)
+    error_code = Column(Integer, nullable=True)
+
+    file_path = Column(String, nullable=True)
+    download_url = Column(String, nullable=True)
+    filename = Column(String, nullable=True)
+    online_url = Column(String, nullable=True)
+    signature_hash = Column(String, nullable=True)
+    qr_code = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<ReportJob(org={self.organization_id}, status={self.status})>"
+
+
+class ReportJobResponse(BaseModel):
+    job_id: UUID
+    status: ReportJobStatus
+    sklad_id: Optional[UUID] = None
+    error: Optional[str] = None
+    error_code: Optional[int] = None
+    url: Optional[str] = None
+    qr: Optional[str] = None
+    path: Optional[str] = None
+    filename: Optional[str] = None
+    online_url: Optional[str] = None
+    signature_hash: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @classmethod
+    def from_job(cls, job: "ReportJob") -> "ReportJobResponse":
+        return cls(
+            job_id=job.id,
+            status=job.status,
+            sklad_id=job.sklad_id,
+            error=job.error,
+            error_code=job.error_code,
+            url=job.download_url,
+            qr=job.qr_code,
+            path=job.file_path,
+            filename=job.filename,
+            online_url=job.online_url,
+            signature_hash=job.signature_hash,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at
+        )
+
+
 class InventoryReportRequest(BaseModel):
     sklad: bool
     sklad_id: Optional[UUID] = None
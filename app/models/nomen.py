@@ -1,13 +1,21 @@
-from sqlalchemy import Column, String, Boolean, text, DateTime, ForeignKey, Integer
+from sqlalchemy import Column, String, Boolean, text, DateTime, ForeignKey, Integer, SmallInteger, Index, DDL, event
 from sqlalchemy.dialects.postgresql import UUID as pgUUID, JSONB
 from app.core.core import Base
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID, uuid4
 from datetime import datetime
 
 class Nomenclature(Base):
     __tablename__ = "nomenclature"
+    __table_args__ = (
+        Index("ix_nomenclature_sklad_updated", "sklad_id", "updated_at"),
+        Index("ix_nomenclature_live_org_sklad_name", "organization_id", "sklad_id", "name", "id", postgresql_where=text("is_deleted = false")),
+        Index("ix_nomenclature_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_nomenclature_article_trgm", "article", postgresql_using="gin", postgresql_ops={"article": "gin_trgm_ops"}),
+        Index("ix_nomenclature_barcode_trgm", "barcode", postgresql_using="gin", postgresql_ops={"barcode": "gin_trgm_ops"}),
+        Index("ix_nomenclature_category_trgm", "category_id", postgresql_using="gin", postgresql_ops={"category_id": "gin_trgm_ops"}),
+    )
 
     id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid4)
     name = Column(String(200), nullable=False, index=True)
@@ -29,8 +37,11 @@ class Nomenclature(Base):
     def __repr__(self):
         return f"<Nomenclature {self.name} ({self.article})>"
 
+event.listen(Nomenclature.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
 class Stock(Base):
     __tablename__ = "stock"
+    __table_args__ = (Index("uq_stock_nomenclature_sklad", "nomenclature_id", "sklad_id", unique=True),)
 
     id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid4)
     nomenclature_id = Column(pgUUID(as_uuid=True), ForeignKey("nomenclature.id"), nullable=False, index=True)
@@ -43,6 +54,21 @@ class Stock(Base):
     created_at = Column(DateTime, server_default=text("TIMEZONE('utc', now())"), nullable=False)
     updated_at = Column(DateTime, server_default=text("TIMEZONE('utc', now())"), onupdate=text("TIMEZONE('utc', now())"), nullable=False)
 
+    @property
+    def available(self) -> int:
+        return self.quantity - self.reserved
+
+
+class StockBalance(Base):
+    __tablename__ = "stock_balances"
+
+    sklad_id = Column(pgUUID(as_uuid=True), ForeignKey("sklads.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True, server_default=text("0"))
+    organization_id = Column(pgUUID(as_uuid=True), nullable=False, index=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    reserved = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=text("TIMEZONE('utc', now())"), nullable=False)
+
 
 
 class NomenclatureProperties(BaseModel):
@@ -95,6 +121,10 @@ class NomenclatureResponse(BaseModel):
         from_attributes = True
 
 
+class NomenclatureSearchResult(NomenclatureResponse):
+    score: float
+
+
 
 class StockCreate(BaseModel):
     nomenclature_id: UUID
@@ -119,4 +149,35 @@ class StockResponse(BaseModel):
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class StockBalanceResponse(BaseModel):
+    sklad_id: UUID
+    quantity: int
+    reserved: int
+    available: int
+    updated_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class StockLineBalanceResponse(BaseModel):
+    sklad_id: UUID
+    nomenclature_id: UUID
+    quantity: int
+    reserved: int
+    available: int
+    updated_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class OrganizationBalanceResponse(BaseModel):
+    organization_id: UUID
+    quantity: int
+    reserved: int
+    available: int
+    sklads: List[StockBalanceResponse]
@@ -1,10 +1,18 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, UniqueConstraint
+from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, BigInteger, Integer, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID as pgUUID
 from app.core.core import Base
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from uuid import uuid4, UUID
 from datetime import datetime, timezone
+import enum
+
+
+class OfflineScanStatus(str, enum.Enum):
+    APPLIED = "applied"
+    CONFLICT = "conflict"
+    NOT_FOUND = "not_found"
+    DUPLICATE = "duplicate"
 
 
 class OfflineToken(Base):
@@ -31,6 +39,28 @@ class OfflineDevice(Base):
     last_seen = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
 
 
+class SkladSnapshotVersion(Base):
+    __tablename__ = "offline_snapshot_versions"
+
+    sklad_id = Column(pgUUID(as_uuid=True), ForeignKey("sklads.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+
+class OfflineScan(Base):
+    __tablename__ = "offline_scans"
+    __table_args__ = (UniqueConstraint("device_id", "seq", name="uq_offline_scan_device_seq"),)
+
+    id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid4)
+    device_id = Column(pgUUID(as_uuid=True), ForeignKey("offline_devices.id", ondelete="CASCADE"), nullable=False)
+    seq = Column(BigInteger, nullable=False)
+    item_id = Column(pgUUID(as_uuid=True), nullable=False)
+    quantity_actual = Column(Integer, nullable=False)
+    status = Column(String, nullable=False)
+    server_quantity = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+
 class OfflineTokenCreate(BaseModel):
     expires_in: int = Field(86400, ge=60, le=604800, description="Seconds until token expiration")
 
@@ -44,3 +74,29 @@ class OfflineTokenResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class OfflineScanResult(BaseModel):
+    seq: int = Field(..., ge=0, description="Monotonic per-device sequence number, the idempotency key together with device_id")
+    item_id: UUID
+    quantity_actual: int = Field(..., ge=0)
+    base_quantity_actual: Optional[int] = Field(None, ge=0, description="quantity_actual the device saw before counting (null if not counted yet)")
+
+
+class OfflineResultsUpload(BaseModel):
+    results: List[OfflineScanResult] = Field(..., min_length=1, max_length=10000)
+
+
+class OfflineScanOutcome(BaseModel):
+    seq: int
+    item_id: UUID
+    status: OfflineScanStatus
+    quantity_actual: Optional[int] = Field(None, description="Current server value; on conflict the value that won")
+    replayed: bool = False
+
+
+class OfflineResultsResponse(BaseModel):
+    applied: int
+    conflicts: int
+    results: List[OfflineScanOutcome]
+    verified_documents: List[UUID]
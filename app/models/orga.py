@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, text, ForeignKey, DateTime
+from sqlalchemy import Column, String, Boolean, text, ForeignKey, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID as pgUUID, JSONB
 from app.core.core import Base
 from pydantic import BaseModel, Field
@@ -135,6 +135,10 @@ class OrgaUpdate(BaseModel):
 
 class Invitation(Base):
     __tablename__ = "invitations"
+    __table_args__ = (
+        Index("ix_invitations_org_status_user", "organization_id", "status", "user_id"),
+        Index("ix_invitations_org_status_email", "organization_id", "status", "email"),
+    )
 
     id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     organization_id = Column(pgUUID(as_uuid=True), ForeignKey("organisations.id", ondelete="CASCADE"), nullable=False, index=True)
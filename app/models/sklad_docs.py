@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Enum, Integer, text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Enum, Integer, Index, text
 from sqlalchemy.dialects.postgresql import UUID as pgUUID, JSONB, ARRAY
 from app.core.core import Base
 from pydantic import BaseModel, Field
@@ -14,11 +14,16 @@ class SkladDocumentType(str, enum.Enum):
 
 class SkladDocument(Base):
     __tablename__ = "sklad_doc"
+    __table_args__ = (
+        Index("ix_sklad_doc_org_updated", "organization_id", "updated_at"),
+        Index("ix_sklad_doc_live_org", "organization_id", "created_at", postgresql_where=text("is_deleted = false")),
+        Index("ix_sklad_doc_sklad_ids_gin", "sklad_ids", postgresql_using="gin"),
+    )
 
     id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid4)
     organization_id = Column(pgUUID(as_uuid=True), ForeignKey("organisations.id", ondelete="CASCADE"), nullable=False, index=True)
     created_by = Column(pgUUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    sklad_ids = Column(ARRAY(pgUUID), nullable=False, index=True)
+    sklad_ids = Column(ARRAY(pgUUID), nullable=False)
     doc_type = Column(Enum(SkladDocumentType), nullable=False, index=True)
     number = Column(String, nullable=False)
     description = Column(String, nullable=True)
@@ -28,9 +33,25 @@ class SkladDocument(Base):
     updated_at = Column(DateTime(timezone=True), server_default=text("TIMEZONE('utc', now())"), onupdate=text("TIMEZONE('utc', now())"), nullable=False)
     is_deleted = Column(Boolean, default=False, nullable=False)
     is_verified = Column(Boolean, default=False, nullable=False)
+    total_items = Column(Integer, default=0, server_default=text("0"), nullable=False)
+    verified_items = Column(Integer, default=0, server_default=text("0"), nullable=False)
+
+class SkladDocumentUnlink(Base):
+    __tablename__ = "sklad_doc_unlinks"
+    __table_args__ = (
+        Index("ix_sklad_doc_unlinks_sklad_unlinked", "sklad_id", "unlinked_at"),
+    )
+
+    document_id = Column(pgUUID(as_uuid=True), ForeignKey("sklad_doc.id", ondelete="CASCADE"), primary_key=True)
+    sklad_id = Column(pgUUID(as_uuid=True), primary_key=True)
+    unlinked_at = Column(DateTime(timezone=True), server_default=text("TIMEZONE('utc', now())"), nullable=False)
 
 class SkladDocumentItem(Base):
     __tablename__ = "sklad_doc_items"
+    __table_args__ = (
+        Index("ix_sklad_doc_items_document_updated", "document_id", "updated_at"),
+        Index("ix_sklad_doc_items_live_document", "document_id", "id", postgresql_where=text("is_deleted = false")),
+    )
 
     id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid4)
     document_id = Column(pgUUID(as_uuid=True), ForeignKey("sklad_doc.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -119,6 +140,8 @@ class SkladDocumentResponse(BaseModel):
     updated_at: datetime
     is_deleted: bool
     is_verified: bool
+    total_items: int = 0
+    verified_items: int = 0
 
     class Config:
         from_attributes = True
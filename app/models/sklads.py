@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Enum, text, DateTime
+from sqlalchemy import Column, String, Boolean, Enum, text, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID as pgUUID, JSONB
 from app.core.core import Base
 from pydantic import BaseModel, Field, EmailStr, validator, model_validator
@@ -10,6 +10,7 @@ from datetime import datetime
 WarehouseType = Literal["MAIN", "RETAIL", "TRANSIT", "QUARANTINE"]
 class Sklads(Base):
     __tablename__ = "sklads"
+    __table_args__ = (Index("ix_sklads_org_created_id", "organization_id", "created_at", "id"),)
 
     id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(100), nullable=False, index=True)
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum, DateTime, text
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, DateTime, Index, text
 from sqlalchemy.dialects.postgresql import UUID as pgUUID, JSONB
 from app.core.core import Base
 from pydantic import BaseModel, Field, validator, model_validator
-from typing import Optional, Literal
+from typing import Optional, Literal, List
 from uuid import UUID, uuid4
 from datetime import datetime
 import enum
@@ -18,6 +18,11 @@ class OperationType(str, enum.Enum):
 
 class StockOperation(Base):
     __tablename__ = "stockk"
+    __table_args__ = (
+        Index("ix_stockk_org_created_id", "organization_id", "created_at", "id"),
+        Index("ix_stockk_org_nomenclature_created", "organization_id", "nomenclature_id", "created_at", "id"),
+        Index("ix_stockk_org_type_created", "organization_id", "operation_type", "created_at", "id"),
+    )
 
     id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid4)
     organization_id = Column(pgUUID(as_uuid=True), nullable=False, index=True)
@@ -33,7 +38,7 @@ class StockOperation(Base):
     operation_metadata = Column(JSONB, nullable=True, default=dict)
     comment = Column(String, nullable=True)
     
-    created_at = Column(DateTime, server_default=text("TIMEZONE('utc', now())"), nullable=False)
+    created_at = Column(DateTime, server_default=text("TIMEZONE('utc', now())"), primary_key=True, nullable=False)
     updated_at = Column(DateTime, server_default=text("TIMEZONE('utc', now())"),
                         onupdate=text("TIMEZONE('utc', now())"), nullable=False)
 
@@ -41,6 +46,58 @@ class StockOperation(Base):
         return f"<StockOperation(type={self.operation_type}, qty={self.quantity}, nom={self.nomenclature_id})>"
 
 
+class StockCheckpoint(Base):
+    __tablename__ = "stock_checkpoints"
+    __table_args__ = (Index("uq_stock_checkpoints_org_taken", "organization_id", "taken_at", unique=True),)
+
+    id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid4)
+    organization_id = Column(pgUUID(as_uuid=True), ForeignKey("organisations.id", ondelete="CASCADE"), nullable=False)
+    taken_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, server_default=text("TIMEZONE('utc', now())"), nullable=False)
+
+
+class StockCheckpointLine(Base):
+    __tablename__ = "stock_checkpoint_lines"
+
+    checkpoint_id = Column(pgUUID(as_uuid=True), ForeignKey("stock_checkpoints.id", ondelete="CASCADE"), primary_key=True)
+    sklad_id = Column(pgUUID(as_uuid=True), primary_key=True)
+    nomenclature_id = Column(pgUUID(as_uuid=True), primary_key=True)
+    quantity = Column(Integer, nullable=False)
+
+
+class StockJournalArchive(Base):
+    __tablename__ = "stock_journal_archives"
+
+    partition_name = Column(String, primary_key=True)
+    range_from = Column(DateTime, nullable=False)
+    range_to = Column(DateTime, nullable=False, index=True)
+    path = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, server_default=text("TIMEZONE('utc', now())"), nullable=False)
+
+
+class StockMovementRollup(Base):
+    __tablename__ = "stock_movement_rollups"
+
+    organization_id = Column(pgUUID(as_uuid=True), primary_key=True)
+    day = Column(DateTime, primary_key=True)
+    operation_type = Column(Enum(OperationType), primary_key=True)
+    sklad_id = Column(pgUUID(as_uuid=True), primary_key=True)
+    nomenclature_id = Column(pgUUID(as_uuid=True), primary_key=True)
+    quantity_in = Column(Integer, nullable=False, default=0)
+    quantity_out = Column(Integer, nullable=False, default=0)
+    operations = Column(Integer, nullable=False, default=0)
+    transfers_in = Column(Integer, nullable=False, default=0)
+
+
+class StockRollupWatermark(Base):
+    __tablename__ = "stock_rollup_watermarks"
+
+    organization_id = Column(pgUUID(as_uuid=True), ForeignKey("organisations.id", ondelete="CASCADE"), primary_key=True)
+    rolled_until = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, server_default=text("TIMEZONE('utc', now())"), nullable=False)
+
+
 OperationTypeLiteral = Literal["TRANSFER", "SALE", "DISPOSAL", "ADJUSTMENT", "RECEIPT", "RETURN"]
 
 
@@ -76,6 +133,10 @@ class StockOperationCreate(BaseModel):
         return self
 
 
+class StockOperationBatchCreate(BaseModel):
+    operations: List[StockOperationCreate] = Field(..., min_length=1, max_length=5000, description="Операции, применяемые одной транзакцией")
+
+
 class StockOperationResponse(BaseModel):
     id: UUID
     organization_id: UUID
@@ -93,3 +154,54 @@ class StockOperationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+class StockBalanceLine(BaseModel):
+    sklad_id: UUID
+    nomenclature_id: UUID
+    quantity: int
+
+
+class SkladBalanceTotal(BaseModel):
+    sklad_id: UUID
+    quantity: int
+
+
+class StockBalanceAtResponse(BaseModel):
+    at: datetime
+    checkpoint_at: Optional[datetime] = Field(None, description="Чекпоинт, от которого восстановлены остатки; None — воспроизведение журнала с начала")
+    sklads: List[SkladBalanceTotal]
+    items: List[StockBalanceLine]
+
+
+class TurnoverRow(BaseModel):
+    period: datetime
+    operation_type: OperationTypeLiteral
+    sklad_id: Optional[UUID] = None
+    nomenclature_id: Optional[UUID] = None
+    quantity_in: int
+    quantity_out: int
+    operations: int
+
+
+class TurnoverResponse(BaseModel):
+    granularity: Literal["day", "week", "month"]
+    created_from: datetime
+    created_to: datetime
+    rolled_until: Optional[datetime] = Field(None, description="До этого момента данные взяты из дневных агрегатов, дальше — из журнала")
+    rows: List[TurnoverRow]
+
+
+class TopMover(BaseModel):
+    nomenclature_id: UUID
+    name: Optional[str] = None
+    article: Optional[str] = None
+    quantity_in: int
+    quantity_out: int
+    operations: int
+
+
+class TopMoversResponse(BaseModel):
+    created_from: datetime
+    created_to: datetime
+    by: Literal["total", "in", "out"]
+    items: List[TopMover]
@@ -0,0 +1,35 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+
+from app.core.core import engine, async_engine
+from app.core.metrics import MeteredQueuePool, MeteredAsyncPool
+from app.services.snapshot_cache import snapshot_cache
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+internal = APIRouter(prefix="/api/internal", tags=["Internal"], include_in_schema=False)
+
+
+def check_token(x_metrics_token: Optional[str]):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_metrics_token or not hmac.compare_digest(x_metrics_token, METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid metrics token")
+
+
+@internal.get("/pool")
+async def pool_metrics(x_metrics_token: Optional[str] = Header(None, alias="X-Metrics-Token")):
+    check_token(x_metrics_token)
+    return {
+        "sync": MeteredQueuePool.stats.snapshot(engine.pool),
+        "async": MeteredAsyncPool.stats.snapshot(async_engine.pool)
+    }
+
+
+@internal.get("/offline-snapshots")
+async def snapshot_metrics(x_metrics_token: Optional[str] = Header(None, alias="X-Metrics-Token")):
+    check_token(x_metrics_token)
+    return snapshot_cache.stats()
@@ -1,31 +1,68 @@
-from fastapi import APIRouter, Depends, Query, Header, Body, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Header, Body, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from uuid import UUID
 
-from app.core.core import get_db
+from app.core.core import get_async_db, AsyncSessionLocal
 from app.core.security import get_me
 from app.core.api_keys import validate_key
 from app.models.auth import User
-from app.models.offline import OfflineTokenCreate, OfflineTokenResponse
+from app.models.offline import OfflineTokenCreate, OfflineTokenResponse, OfflineResultsUpload, OfflineResultsResponse
 from app.services.offline_service import OfflineService
+from app.services.snapshot_cache import SnapshotRef, snapshot_cache
+from app.utils.negotiation import negotiated_response, negotiate, encoded_response, etag_matches
 
 
 offline = APIRouter(prefix="/api/offline", tags=["Offline Access"])
 
 
 @offline.post("/sklad/{sklad_id}/token", response_model=OfflineTokenResponse, status_code=status.HTTP_201_CREATED)
-def create_token(sklad_id: UUID, payload: OfflineTokenCreate = Body(...), db: Session = Depends(get_db), current_user: User = Depends(get_me)):
+async def create_token(sklad_id: UUID, payload: OfflineTokenCreate = Body(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
     if current_user.role != "Founder":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only Founder can create offline tokens")
-    service = OfflineService(db)
-    return service.create_token(sklad_id, payload, current_user)
+    return await db.run_sync(lambda session: OfflineService(session).create_token(sklad_id, payload, current_user))
+
+
+async def build_snapshot(ref: SnapshotRef) -> dict:
+    async with AsyncSessionLocal() as session:
+        return await session.run_sync(lambda sync_session: OfflineService(sync_session).build_snapshot(ref))
+
+
+async def snapshot_response(request: Request, ref: SnapshotRef):
+    if etag_matches(request, ref.etag):
+        _, _, headers = negotiate(request, ref.etag)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    entry = await snapshot_cache.get_or_build(ref, lambda: build_snapshot(ref))
+    media_type, encoding, headers = negotiate(request, ref.etag, {"X-Sync-Cursor": entry.cursor})
+    return encoded_response(await snapshot_cache.body(entry, media_type, encoding), media_type, encoding, headers)
 
 
 @offline.get("/sklad")
-def get_offline(token: str = Query(...), device_id: str = Query(...), x_api_key: Optional[str] = Header(None, alias="X-API-Key"), db: Session = Depends(get_db)):
+async def get_offline(request: Request, token: str = Query(...), device_id: str = Query(...), x_api_key: Optional[str] = Header(None, alias="X-API-Key"), db: AsyncSession = Depends(get_async_db)):
+    if not x_api_key or not validate_key(x_api_key):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid API key")
+    ref = await db.run_sync(lambda session: OfflineService(session).get_sklad_data(token, device_id))
+    return await snapshot_response(request, ref)
+
+
+@offline.get("/sklad/snapshot")
+async def get_offline_snapshot(request: Request, token: str = Query(...), device_id: str = Query(...), x_api_key: Optional[str] = Header(None, alias="X-API-Key"), db: AsyncSession = Depends(get_async_db)):
     if not x_api_key or not validate_key(x_api_key):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid API key")
-    service = OfflineService(db)
-    return service.get_sklad_data(token, device_id)
+    ref = await db.run_sync(lambda session: OfflineService(session).get_sklad_snapshot(token, device_id))
+    return await snapshot_response(request, ref)
 
+
+@offline.get("/sklad/changes")
+async def get_offline_changes(request: Request, token: str = Query(...), device_id: str = Query(...), cursor: Optional[str] = Query(None, description="Курсор из предыдущего ответа /sklad или /sklad/changes"), x_api_key: Optional[str] = Header(None, alias="X-API-Key"), db: AsyncSession = Depends(get_async_db)):
+    if not x_api_key or not validate_key(x_api_key):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid API key")
+    data = await db.run_sync(lambda session: OfflineService(session).get_sklad_changes(token, device_id, cursor))
+    return negotiated_response(request, data, headers={"X-Sync-Cursor": data["cursor"]})
+
+
+@offline.post("/sklad/results", response_model=OfflineResultsResponse)
+async def upload_offline_results(token: str = Query(...), device_id: str = Query(...), payload: OfflineResultsUpload = Body(...), x_api_key: Optional[str] = Header(None, alias="X-API-Key"), db: AsyncSession = Depends(get_async_db)):
+    if not x_api_key or not validate_key(x_api_key):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid API key")
+    return await db.run_sync(lambda session: OfflineService(session).upload_results(token, device_id, payload))
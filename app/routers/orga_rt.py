@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
-from app.core.core import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.core import get_async_db
 from app.core.security import get_me
-from app.services.orga_service import cr_orga, del_orga, upd_orga
+from app.services.orga_service import cr_orga, del_orga as remove_orga, upd_orga
 from app.services.qr_service import QrService
-from app.services.invitation_service import create_invite, cancel_invite
+from app.services.invitation_service import create_invite, cancel_invite as revoke_invite
 from app.models.orga import OrgaCreate, OrgaResponse, QrCodeResponse, QrCode, Orga, UserInOrgaResp, MyOrga, UsersInOrg,  DeleteOrga, OrgaUpdate, InvitationResponse, OrganizationInvitationCreate
 from app.models.user_profile import InvitationActionResponse
 from app.models.auth import User
@@ -18,11 +19,11 @@ from datetime import datetime, timedelta, timezone
 
 orga = APIRouter(prefix="/api/orga")
 @orga.post("/create", response_model=OrgaResponse, status_code=status.HTTP_201_CREATED, summary="Создать организацию", tags=["Organisation"])
-async def create_orga(org_data: OrgaCreate, db: Session = Depends(get_db), current_user: User = Depends(get_me)):
-    return cr_orga(db, org_data, user_id=current_user.id)
+async def create_orga(org_data: OrgaCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    return await db.run_sync(lambda session: cr_orga(session, org_data, user_id=current_user.id))
 
 @orga.get("/", response_model=List[OrgaResponse], summary="Список всех организаций",  tags=["Organisation"])
-async def get_all_organizations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_me)):
+async def get_all_organizations(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
     if limit > 1000:
         limit = 1000
     if limit < 1:
@@ -30,34 +31,34 @@ async def get_all_organizations(skip: int = 0, limit: int = 100, db: Session = D
     if skip < 0:
         skip = 0
 
-    organizations = db.query(Orga).offset(skip).limit(limit).all()
+    organizations = (await db.scalars(select(Orga).offset(skip).limit(limit))).all()
     return [OrgaResponse.from_orm(org) for org in organizations]
 
 
 @orga.get("/create-qr/{org_id}/", response_model=QrCodeResponse, tags=['QRs'])
-async def get_qr(org_id: UUID, expires_in: int = 86400, db: Session = Depends(get_db),current_user = Depends(get_me)):
-    org = db.query(Orga).filter(Orga.id == org_id, Orga.user_id == current_user.id).first()
+async def get_qr(org_id: UUID, expires_in: int = 86400, db: AsyncSession = Depends(get_async_db),current_user = Depends(get_me)):
+    org = (await db.execute(select(Orga).where(Orga.id == org_id, Orga.user_id == current_user.id))).scalar_one_or_none()
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found or access denied")
 
     qr_service = QrService()
-    result = qr_service.create_qr(db, org_id, expires_in)
+    result = await db.run_sync(lambda session: qr_service.create_qr(session, org_id, expires_in))
 
     return QrCodeResponse(**result)
 
 
 @orga.get("/join/{token}", tags=['QRs'])
-async def join_by(token: str, db: Session = Depends(get_db), current_user: User = Depends(get_me)):
-    qr = db.query(QrCode).filter(
+async def join_by(token: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    qr = (await db.execute(select(QrCode).where(
         QrCode.token == token,
         QrCode.is_active == True,
         QrCode.expires_at > datetime.now(timezone.utc)
-    ).first()
+    ))).scalar_one_or_none()
 
     if not qr:
         raise HTTPException(status_code=410, detail="QR code is invalid. The otter took him home. ")
 
-    org = db.query(Orga).filter(Orga.id == qr.organization_id).first()
+    org = (await db.execute(select(Orga).where(Orga.id == qr.organization_id))).scalar_one_or_none()
     if not org:
         raise HTTPException(status_code=404, detail="Otter did not find such an organization(( ")
 
@@ -65,10 +66,10 @@ async def join_by(token: str, db: Session = Depends(get_db), current_user: User
         current_user.connect_organization = str(org.id)
 
         join_time = datetime.now(timezone.utc)
-        existing_invitation = db.query(Invitation).filter(
+        existing_invitation = (await db.execute(select(Invitation).where(
             Invitation.user_id == current_user.id,
             Invitation.organization_id == org.id
-        ).first()
+        ))).scalars().first()
         
         if existing_invitation:
             existing_invitation.status = "accepted"
@@ -94,11 +95,11 @@ async def join_by(token: str, db: Session = Depends(get_db), current_user: User
             )
             db.add(new_invitation)
         
-        db.commit()
-        db.refresh(current_user)
+        await db.commit()
+        await db.refresh(current_user)
 
     qr.is_active = False
-    db.commit()
+    await db.commit()
 
     return {
         "organization": {
@@ -112,31 +113,31 @@ async def join_by(token: str, db: Session = Depends(get_db), current_user: User
 
 
 @orga.get("/{org_id}/members", response_model=List[UserInOrgaResp], tags=["Organisation"])
-async def get_organization_members(org_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_me)):
+async def get_organization_members(org_id: UUID, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
     if current_user.connect_organization != str(org_id):
         raise HTTPException(
             status_code=403,
             detail="Otter think: you are not a member of this organization"
         )
 
-    members = db.query(User).filter(
+    members = (await db.scalars(select(User).where(
         User.connect_organization == str(org_id)
-    ).all()
+    ))).all()
 
     result = []
     for member in members:
-        invitation = db.query(Invitation).filter(
+        invitation = (await db.scalars(select(Invitation).where(
             Invitation.organization_id == org_id,
             Invitation.status == "accepted",
             Invitation.user_id == member.id
-        ).order_by(Invitation.used_at.desc()).first()
+        ).order_by(Invitation.used_at.desc()).limit(1))).first()
 
         if not invitation:
-            invitation = db.query(Invitation).filter(
+            invitation = (await db.scalars(select(Invitation).where(
                 Invitation.organization_id == org_id,
                 Invitation.status == "accepted",
                 Invitation.email == member.email
-            ).order_by(Invitation.used_at.desc()).first()
+            ).order_by(Invitation.used_at.desc()).limit(1))).first()
 
         joined_at = None
         if invitation:
@@ -156,7 +157,7 @@ async def get_organization_members(org_id: UUID, db: Session = Depends(get_db),
 
 
 @orga.get("/me", response_model=MyOrga, tags=["Organisation"])
-async def get_my_org(current_user: User = Depends(get_me), db: Session = Depends(get_db)):
+async def get_my_org(current_user: User = Depends(get_me), db: AsyncSession = Depends(get_async_db)):
     if not current_user.connect_organization:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a member of the organization. Join us using a QR code")
 
@@ -168,25 +169,25 @@ async def get_my_org(current_user: User = Depends(get_me), db: Session = Depends
             detail="uncorrect org_id"
         )
 
-    org = db.query(Orga).filter(Orga.id == org_id).first()
+    org = (await db.execute(select(Orga).where(Orga.id == org_id))).scalar_one_or_none()
     if not org:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="org not found"
         )
 
-    members = db.query(User).filter(
+    members = (await db.scalars(select(User).where(
         User.connect_organization == str(org_id)
-    ).all()
+    ))).all()
 
     members_count = len(members)
     members_list = []
     for user in members:
-        invitation = db.query(Invitation).filter(
+        invitation = (await db.scalars(select(Invitation).where(
             Invitation.organization_id == org_id,
             Invitation.status == "accepted",
             (Invitation.user_id == user.id) | (Invitation.email == user.email)
-        ).order_by(Invitation.used_at.desc()).first()
+        ).order_by(Invitation.used_at.desc()).limit(1))).first()
         
 
         joined_at = None
@@ -217,18 +218,18 @@ async def get_my_org(current_user: User = Depends(get_me), db: Session = Depends
 
 
 @orga.delete("/{org_id}", response_model=dict, status_code=status.HTTP_200_OK, summary="Удалить организацию (с подтверждением паролем)", tags=["Organisation"])
-async def del_orga(org_id: UUID, request: DeleteOrga, db: Session = Depends(get_db), current_user: User = Depends(get_me)):
-    return del_orga(db=db, org_id=org_id, user_id=current_user.id, password=request.password)
+async def del_orga(org_id: UUID, request: DeleteOrga, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    return await db.run_sync(lambda session: remove_orga(db=session, org_id=org_id, user_id=current_user.id, password=request.password))
 
 @orga.patch("/upd/{org_id}", response_model=dict, status_code=status.HTTP_200_OK, summary="Обновить организацию", tags=["Organisation"])
-async def upd_org(org_id: UUID, update_data: OrgaUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_me)):
-    return upd_orga(db=db, org_id=org_id, user_id=current_user.id, update_data=update_data)
+async def upd_org(org_id: UUID, update_data: OrgaUpdate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    return await db.run_sync(lambda session: upd_orga(db=session, org_id=org_id, user_id=current_user.id, update_data=update_data))
 
 @orga.post("/{org_id}/invite", response_model=InvitationResponse, status_code=status.HTTP_201_CREATED, tags=["Organisation User"])
-async def create_invites(org_id: UUID, payload: OrganizationInvitationCreate, db: Session = Depends(get_db), current_user: User = Depends(get_me)) -> InvitationResponse:
-    return create_invite(db, org_id=org_id, payload=payload, current_user=current_user)
+async def create_invites(org_id: UUID, payload: OrganizationInvitationCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)) -> InvitationResponse:
+    return await db.run_sync(lambda session: create_invite(session, org_id=org_id, payload=payload, current_user=current_user))
 
 
 @orga.delete("/{org_id}/invite/{invitation_id}", response_model=InvitationActionResponse, status_code=status.HTTP_200_OK, tags=["Organisation User"])
-async def cancel_invite(org_id: UUID, invitation_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_me),) -> InvitationActionResponse:
-    return cancel_invite(db, org_id=org_id, invitation_id=invitation_id, current_user=current_user)
+async def cancel_invite(org_id: UUID, invitation_id: UUID, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me),) -> InvitationActionResponse:
+    return await db.run_sync(lambda session: revoke_invite(session, org_id=org_id, invitation_id=invitation_id, current_user=current_user))
@@ -1,58 +1,64 @@
-from io import BytesIO
-from fastapi import APIRouter, Depends, Response, Query, Body
-from sqlalchemy.orm import Session
-from starlette.responses import JSONResponse, StreamingResponse
+import asyncio
+from fastapi import APIRouter, Depends, Response, Query, Body, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import JSONResponse, FileResponse
 from pydantic import BaseModel, model_validator
 
 from fastapi import HTTPException
 
-from app.core.core import get_db
+from app.core.core import get_async_db
 from app.core.security import get_me
 from app.models.auth import User
 from app.models.docs import InventoryToken
 from app.services.reports import PDFService
 from typing import Optional
 from uuid import UUID
-from app.models.docs import InventoryReportRequest, VerifyByHash
+from app.models.docs import InventoryReportRequest, VerifyByHash, ReportJobResponse, ReportJobStatus
+from app.services.report_jobs import ReportJobService, report_queue, await_job
 
 
 pdf = APIRouter(prefix="/api/report", tags=["PDF Reports"])
 
-@pdf.post("/inventory")
-async def get_inventory_report(request: InventoryReportRequest = Body(...), db: Session = Depends(get_db), current_user: User = Depends(get_me)):
-    pdf_service = PDFService(db)
-    result = pdf_service.gen_report(current_user, sklad=request.sklad, sklad_id=request.sklad_id)
+@pdf.post("/inventory", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def get_inventory_report(request: InventoryReportRequest = Body(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    job = await db.run_sync(lambda session: ReportJobResponse.from_job(ReportJobService(session).create_job(current_user, sklad=request.sklad, sklad_id=request.sklad_id)))
+    report_queue.submit(job.job_id, UUID(current_user.connect_organization))
+    return job
 
-    return JSONResponse({
-        "message": "Inventory report generated successfully!",
-        "url": result["download_url"],
-        "qr": result["qr_code"].getvalue().hex(),
-        "path": result["file_path"],
-        "filename": result["filename"]
-    })
+@pdf.get("/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(job_id: UUID, wait: float = Query(0, ge=0, le=30, description="Сколько секунд ждать завершения (long-poll)"), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    return await await_job(db, job_id, current_user, wait)
 
-@pdf.post("/inventory/download", response_class=StreamingResponse)
-async def download_inventory_report(request: InventoryReportRequest = Body(...), db: Session = Depends(get_db), current_user: User = Depends(get_me)):
-    pdf_service = PDFService(db)
-    result = pdf_service.gen_report(current_user, sklad=request.sklad, sklad_id=request.sklad_id)
+@pdf.get("/jobs/{job_id}/download", response_class=FileResponse)
+async def download_report_job(job_id: UUID, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    job = await await_job(db, job_id, current_user, 0)
+    return _job_file(job)
 
-    with open(result["file_path"], "rb") as f:
-        pdf_content = f.read()
+@pdf.post("/inventory/download", response_class=FileResponse)
+async def download_inventory_report(request: InventoryReportRequest = Body(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    job = await db.run_sync(lambda session: ReportJobResponse.from_job(ReportJobService(session).create_job(current_user, sklad=request.sklad, sklad_id=request.sklad_id)))
+    task = report_queue.submit(job.job_id, UUID(current_user.connect_organization))
+    await db.rollback()
+    await asyncio.shield(task)
+    return _job_file(await await_job(db, job.job_id, current_user, 0))
 
-    return StreamingResponse(
-        BytesIO(pdf_content),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={result['filename']}"}
-    )
+def _job_file(job: ReportJobResponse) -> FileResponse:
+    if job.status == ReportJobStatus.FAILED:
+        raise HTTPException(status_code=job.error_code or 500, detail=job.error)
+    if job.status != ReportJobStatus.DONE:
+        raise HTTPException(status_code=409, detail="Report is not ready yet", headers={"Retry-After": "1"})
+    return FileResponse(job.path, media_type="application/pdf", filename=job.filename)
 
 @pdf.get("/inventory/view/{token}")
-async def view_inventory(token: str, db: Session = Depends(get_db)):
+async def view_inventory(token: str, offset: int = Query(0, ge=0, description="Сколько позиций пропустить (для отчётов, хранящих позиции постранично)"),
+    limit: int = Query(500, ge=1, le=5000), db: AsyncSession = Depends(get_async_db)):
     from datetime import datetime, timezone
     
-    inventory_token = db.query(InventoryToken).filter(
+    inventory_token = (await db.execute(select(InventoryToken).where(
         InventoryToken.token == token,
         InventoryToken.is_active == True
-    ).first()
+    ))).scalar_one_or_none()
     
     if not inventory_token:
         raise HTTPException(status_code=404, detail="Inventory report not found or expired")
@@ -61,20 +67,35 @@ async def view_inventory(token: str, db: Session = Depends(get_db)):
         if datetime.now(timezone.utc) > inventory_token.expires_at:
             raise HTTPException(status_code=410, detail="Inventory report has expired")
     
+    report_data = inventory_token.report_data
+    page = {}
+    items = report_data.get("items")
+    if report_data.get("items_stored"):
+        rows = await db.run_sync(lambda session: PDFService(session).stored_items(inventory_token.id, offset, limit).all())
+        items = [{
+            "name": row.name,
+            "article": row.article,
+            "barcode": row.barcode,
+            "unit": row.unit,
+            "quantity": row.quantity,
+            "sklad_name": row.sklad_name if not report_data.get("sklad") else None
+        } for row in rows]
+        page = {"items_offset": offset, "items_limit": limit}
+
     return JSONResponse({
-        "organization": inventory_token.report_data.get("organization"),
-        "sklad": inventory_token.report_data.get("sklad"),
-        "items": inventory_token.report_data.get("items"),
-        "created_at": inventory_token.report_data.get("created_at"),
-        "items_count": inventory_token.report_data.get("items_count"),
+        "organization": report_data.get("organization"),
+        "sklad": report_data.get("sklad"),
+        "items": items,
+        **page,
+        "created_at": report_data.get("created_at"),
+        "items_count": report_data.get("items_count"),
         "signature_hash": inventory_token.signature_hash,
         "report_id": str(inventory_token.id)
     })
 
 @pdf.post("/inventory/verify")
-async def verify_by_hash(request: VerifyByHash = Body(...), db: Session = Depends(get_db)):
+async def verify_by_hash(request: VerifyByHash = Body(...), db: AsyncSession = Depends(get_async_db)):
 
-    pdf_service = PDFService(db)
-    result = pdf_service.verify_by_hash(request.signature_hash)
+    result = await db.run_sync(lambda session: PDFService(session).verify_by_hash(request.signature_hash))
     
     return JSONResponse(result)
\ No newline at end of file
@@ -3,7 +3,9 @@ from fastapi.security import OAuth2PasswordBearer
 from typing import Optional
 from uuid import UUID
 
-from app.core.core import get_db, SessionLocal as Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.core import get_async_db
 from app.core.security import get_me
 from app.models.auth import (
     User,
@@ -29,19 +31,17 @@ async def health():
     return {"status": "otter said: i'm okey! thank u <3"}
 
 @router.post("/auth/reg", tags=auth_tags, summary="Регистрация пользователя")
-async def register(user: UserCreate, invite: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    service = auth_service(db)
-    return await service.register(user, invite)
+async def register(user: UserCreate, invite: Optional[str] = Query(None), db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: auth_service(session).register(user, invite))
 
 @router.post("/auth/login", tags=auth_tags, summary="Вход пользователя")
-async def login(user: UserLogin, invite: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    service = auth_service(db)
-    return await service.login(user, invite)
+async def login(user: UserLogin, invite: Optional[str] = Query(None), db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: auth_service(session).login(user, invite))
 
 
 @router.get("/auth/me", response_model=CurrentUserResponse, tags=auth_tags)
-async def get_me(current_user: User = Depends(get_me), db: Session = Depends(get_db)):
-    invitations = list_user(db, current_user=current_user)
+async def get_me(current_user: User = Depends(get_me), db: AsyncSession = Depends(get_async_db)):
+    invitations = await db.run_sync(lambda session: list_user(session, current_user=current_user))
     return CurrentUserResponse(
         id=str(current_user.id),
         username=current_user.fullName,
@@ -52,12 +52,10 @@ async def get_me(current_user: User = Depends(get_me), db: Session = Depends(get
     )
 
 @router.post("/auth/verify", tags=auth_tags, summary="Подтверждение почты")
-async def verify_email(request: VerifyEmailRequest, db: Session = Depends(get_db)):
-    service = auth_service(db)
-    return await service.verify_email(request.email, request.code)
+async def verify_email(request: VerifyEmailRequest, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: auth_service(session).verify_email(request.email, request.code))
 
 
 @router.post("/auth/resend", tags=auth_tags, summary="Повторная отправка кода подтверждения")
-async def resend_verification_code(request: ResendVerificationRequest, db: Session = Depends(get_db)):
-    service = auth_service(db)
-    return await service.resend_ver(request.email)
\ No newline at end of file
+async def resend_verification_code(request: ResendVerificationRequest, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: auth_service(session).resend_ver(request.email))
\ No newline at end of file
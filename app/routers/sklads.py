@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Response, status, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
-from app.core.core import get_db
+from app.core.core import get_async_db
 from app.core.security import get_me
+from app.core.principal_cache import principal_cache
 from app.models.auth import User, ChooseSkladRequest, ChooseSkladResponse
 from app.models.orga import Orga
 from app.models.sklads import SkladsCreate, SkladsUpdate, SkladsResponse, Sklads
@@ -13,80 +15,76 @@ from app.services.sklads import SkladService
 sklad = APIRouter(prefix="/api/sklads", tags=["Sklads"])
 
 
-def req_found(current_user: User = Depends(get_me), db: Session = Depends(get_db)):
+async def req_found(current_user: User = Depends(get_me), db: AsyncSession = Depends(get_async_db)):
     if not current_user.connect_organization:
         raise HTTPException(
             status_code=403,
             detail="Firstly, get involved in the organization, and secondly, don't mess with the otter!"
         )
 
-    org = db.query(Orga).filter(
-        Orga.id == UUID(current_user.connect_organization)
-    ).first()
+    org_id = UUID(current_user.connect_organization)
+    if not await principal_cache.run(principal_cache.org_exists, org_id):
+        org = (await db.execute(select(Orga.id).where(Orga.id == org_id))).scalar_one_or_none()
 
-    if not org:
-        raise HTTPException(
-            status_code=403,
-            detail="Organization not found"
-        )
+        if not org:
+            raise HTTPException(
+                status_code=403,
+                detail="Organization not found"
+            )
+        await principal_cache.run(principal_cache.put_org, org_id)
 
-    return current_user, UUID(current_user.connect_organization)
+    return current_user, org_id
 
 @sklad.post("/", response_model=SkladsResponse, status_code=status.HTTP_201_CREATED)
 async def create_sklad(
     data: SkladsCreate,
     deps: tuple = Depends(req_found),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     current_user, org_id = deps
-    service = SkladService(db)
-    return service.create_sklad(data, org_id)
+    return await db.run_sync(lambda session: SkladService(session).create_sklad(data, org_id))
 
 
 @sklad.get("/", response_model=List[SkladsResponse])
-async def get_sklads(skip: int = 0, limit: int = 100, deps: tuple = Depends(req_found), db: Session = Depends(get_db)):
+async def get_sklads(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = Query(None, description="Курсор следующей страницы из заголовка X-Next-Cursor; если задан, skip игнорируется"), deps: tuple = Depends(req_found), db: AsyncSession = Depends(get_async_db)):
     current_user, org_id = deps
-    service = SkladService(db)
-    sklads = service.get_sklads(org_id, skip=skip, limit=limit)
-    return sklads
+    page = await db.run_sync(lambda session: SkladService(session).get_sklads(org_id, skip=skip, limit=limit, cursor=cursor))
+    return page.to_response(response)
 
 @sklad.get("/{sklad_id}", response_model=SkladsResponse)
-async def get_sklad(sklad_id: UUID, current_user: User = Depends(get_me), db: Session = Depends(get_db)):
+async def get_sklad(sklad_id: UUID, current_user: User = Depends(get_me), db: AsyncSession = Depends(get_async_db)):
     if not current_user.connect_organization:
         raise HTTPException(status_code=403, detail="Firstly, get involved in the organization, and secondly, don't mess with the otter!")
 
-    service = SkladService(db)
-    return service.get_sklad_by_id(sklad_id, UUID(current_user.connect_organization))
+    return await db.run_sync(lambda session: SkladService(session).get_sklad_by_id(sklad_id, UUID(current_user.connect_organization)))
 
 
 @sklad.patch("/{sklad_id}", response_model=SkladsResponse)
-async def update_sklad(sklad_id: UUID, data: SkladsUpdate, deps: tuple = Depends(req_found), db: Session = Depends(get_db)):
+async def update_sklad(sklad_id: UUID, data: SkladsUpdate, deps: tuple = Depends(req_found), db: AsyncSession = Depends(get_async_db)):
     current_user, org_id = deps
-    service = SkladService(db)
-    return service.update_sklad(sklad_id, data, org_id)
+    return await db.run_sync(lambda session: SkladService(session).update_sklad(sklad_id, data, org_id))
 
 
 @sklad.delete("/{sklad_id}")
-async def delete_sklad(sklad_id: UUID, deps: tuple = Depends(req_found), db: Session = Depends(get_db)):
+async def delete_sklad(sklad_id: UUID, deps: tuple = Depends(req_found), db: AsyncSession = Depends(get_async_db)):
     current_user, org_id = deps
-    service = SkladService(db)
-    return service.delete_sklad(sklad_id, org_id)
+    return await db.run_sync(lambda session: SkladService(session).delete_sklad(sklad_id, org_id))
 
 
 
 @sklad.post("/choose", response_model=ChooseSkladResponse,summary="Выбрать текущий склад для работы")
-async def choose_sklad(request: ChooseSkladRequest, db: Session = Depends(get_db), current_user: User = Depends(get_me)):
+async def choose_sklad(request: ChooseSkladRequest, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
     if not current_user.connect_organization:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User is not associated with any organization"
         )
 
-    sklad = db.query(Sklads).filter(
+    sklad = (await db.execute(select(Sklads).where(
         Sklads.id == request.sklad_id,
         Sklads.organization_id == current_user.connect_organization,
         Sklads.is_deleted == False
-    ).first()
+    ))).scalar_one_or_none()
 
     if not sklad:
         raise HTTPException(
@@ -95,8 +93,8 @@ async def choose_sklad(request: ChooseSkladRequest, db: Session = Depends(get_db
         )
 
     current_user.choosen_sklad = request.sklad_id
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
 
     return ChooseSkladResponse(
         message="Склад успешно выбран",
@@ -1,27 +1,48 @@
-from fastapi import APIRouter, Depends, Query, Path, Body, status, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Path, Body, Response, status, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Literal
 from uuid import UUID
+from datetime import datetime
 
-from app.core.core import get_db
+from app.core.core import get_async_db
 from app.core.security import get_me
-from app.models.stock_oper import StockOperationCreate, StockOperationResponse, OperationType
+from app.models.stock_oper import StockOperationCreate, StockOperationBatchCreate, StockOperationResponse, StockBalanceAtResponse, TurnoverResponse, TopMoversResponse, OperationType
 from app.models.auth import User
+from app.models.nomen import StockBalanceResponse, StockLineBalanceResponse, OrganizationBalanceResponse
 from app.services.stock_service import StockOperationService
+from app.services.stock_history import StockHistoryService
+from app.services.stock_analytics import StockAnalyticsService
 
 stockk = APIRouter(prefix="/api/stock", tags=["Stock Operations"])
 
 
+def _operation_type(operation_type: Optional[str]) -> Optional[OperationType]:
+    if not operation_type:
+        return None
+    try:
+        return OperationType[operation_type.upper()]
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid operation type: {operation_type}"
+        )
+
+
 @stockk.post("/create/", response_model=StockOperationResponse, status_code=status.HTTP_201_CREATED)
-async def create_operation(data: StockOperationCreate = Body(...), db: Session = Depends(get_db), current_user: User = Depends(get_me)):
-    service = StockOperationService(db)
-    return service.create_operation(data, current_user)
+async def create_operation(data: StockOperationCreate = Body(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    return await db.run_sync(lambda session: StockOperationService(session).create_operation(data, current_user))
+
+
+@stockk.post("/batch", response_model=List[StockOperationResponse], status_code=status.HTTP_201_CREATED)
+async def create_operations_batch(data: StockOperationBatchCreate = Body(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    return await db.run_sync(lambda session: StockOperationService(session).create_operations_batch(data.operations, current_user))
 
 
 @stockk.get("/all/", response_model=List[StockOperationResponse])
-async def get_operations(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), operation_type: Optional[str] = Query(None, description="Filter by operation type"), nomenclature_id: Optional[UUID] = Query(None, description="Filter by nomenclature ID"),
-    sklad_id: Optional[UUID] = Query(None, description="Filter by warehouse ID"), db: Session = Depends(get_db), current_user: User = Depends(get_me)):
-    service = StockOperationService(db)
+async def get_operations(response: Response, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), operation_type: Optional[str] = Query(None, description="Filter by operation type"), nomenclature_id: Optional[UUID] = Query(None, description="Filter by nomenclature ID"),
+    sklad_id: Optional[UUID] = Query(None, description="Filter by warehouse ID"), cursor: Optional[str] = Query(None, description="Курсор следующей страницы из заголовка X-Next-Cursor; если задан, skip игнорируется"),
+    created_from: Optional[datetime] = Query(None, description="Операции начиная с момента (включительно); ограничивает просматриваемые месячные партиции"), created_to: Optional[datetime] = Query(None, description="Операции до момента (не включая)"),
+    db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
     organization_id = UUID(current_user.connect_organization) if current_user.connect_organization else None
     
     if not organization_id:
@@ -30,29 +51,103 @@ async def get_operations(skip: int = Query(0, ge=0), limit: int = Query(100, ge=
             detail="User is not associated with any organization"
         )
     
-    op_type = None
-    if operation_type:
-        try:
-            op_type = OperationType[operation_type.upper()]
-        except KeyError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid operation type: {operation_type}"
-            )
+    op_type = _operation_type(operation_type)
     
-    return service.get_operations(
+    page = await db.run_sync(lambda session: StockOperationService(session).get_operations(
         organization_id=organization_id,
         skip=skip,
         limit=limit,
         operation_type=op_type,
         nomenclature_id=nomenclature_id,
-        sklad_id=sklad_id
-    )
+        sklad_id=sklad_id,
+        cursor=cursor,
+        created_from=created_from,
+        created_to=created_to
+    ))
+    return page.to_response(response)
+
+
+@stockk.get("/balance", response_model=StockBalanceAtResponse)
+async def get_balance_at(at: datetime = Query(..., description="Момент времени (ISO 8601; без часового пояса — UTC)"), sklad_id: Optional[UUID] = Query(None, description="Filter by warehouse ID"),
+    db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    if not current_user.connect_organization:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with any organization"
+        )
+    organization_id = UUID(current_user.connect_organization)
+    return await db.run_sync(lambda session: StockHistoryService(session).balance_at(organization_id, at, sklad_id))
+
+
+@stockk.get("/balance/summary", response_model=OrganizationBalanceResponse)
+async def get_organization_balance(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    if not current_user.connect_organization:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with any organization"
+        )
+    organization_id = UUID(current_user.connect_organization)
+    return await db.run_sync(lambda session: StockOperationService(session).get_organization_balance(organization_id))
+
+
+@stockk.get("/balance/summary/{sklad_id}", response_model=StockBalanceResponse)
+async def get_sklad_balance(sklad_id: UUID = Path(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    if not current_user.connect_organization:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with any organization"
+        )
+    organization_id = UUID(current_user.connect_organization)
+    return await db.run_sync(lambda session: StockOperationService(session).get_sklad_balance(sklad_id, organization_id))
+
+
+@stockk.get("/balance/summary/{sklad_id}/{nomenclature_id}", response_model=StockLineBalanceResponse)
+async def get_line_balance(sklad_id: UUID = Path(...), nomenclature_id: UUID = Path(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    if not current_user.connect_organization:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with any organization"
+        )
+    organization_id = UUID(current_user.connect_organization)
+    return await db.run_sync(lambda session: StockOperationService(session).get_line_balance(sklad_id, nomenclature_id, organization_id))
+
+
+@stockk.get("/analytics/turnover", response_model=TurnoverResponse)
+async def get_turnover(created_from: datetime = Query(..., description="Начало периода (включительно)"), created_to: Optional[datetime] = Query(None, description="Конец периода (не включая); по умолчанию — сейчас"),
+    granularity: Literal["day", "week", "month"] = Query("day"), group_by: List[Literal["sklad", "nomenclature"]] = Query([], description="Дополнительные измерения: sklad, nomenclature"),
+    operation_type: Optional[str] = Query(None, description="Filter by operation type"), sklad_id: Optional[UUID] = Query(None, description="Filter by warehouse ID"),
+    nomenclature_id: Optional[UUID] = Query(None, description="Filter by nomenclature ID"), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    if not current_user.connect_organization:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with any organization"
+        )
+    organization_id = UUID(current_user.connect_organization)
+    op_type = _operation_type(operation_type)
+    return await db.run_sync(lambda session: StockAnalyticsService(session).turnover(
+        organization_id, created_from, created_to, granularity, group_by, op_type, sklad_id, nomenclature_id
+    ))
+
+
+@stockk.get("/analytics/top", response_model=TopMoversResponse)
+async def get_top_movers(created_from: datetime = Query(..., description="Начало периода (включительно)"), created_to: Optional[datetime] = Query(None, description="Конец периода (не включая); по умолчанию — сейчас"),
+    by: Literal["total", "in", "out"] = Query("total", description="Сортировка: приход + расход, только приход или только расход"), limit: int = Query(10, ge=1, le=100),
+    operation_type: Optional[str] = Query(None, description="Filter by operation type"), sklad_id: Optional[UUID] = Query(None, description="Filter by warehouse ID"),
+    db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
+    if not current_user.connect_organization:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with any organization"
+        )
+    organization_id = UUID(current_user.connect_organization)
+    op_type = _operation_type(operation_type)
+    return await db.run_sync(lambda session: StockAnalyticsService(session).top_movers(
+        organization_id, created_from, created_to, by, limit, op_type, sklad_id
+    ))
 
 
 @stockk.get("/{operation_id}", response_model=StockOperationResponse)
-async def get_operation(operation_id: UUID = Path(...), db: Session = Depends(get_db), current_user: User = Depends(get_me)):
-    service = StockOperationService(db)
+async def get_operation(operation_id: UUID = Path(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_me)):
     organization_id = UUID(current_user.connect_organization) if current_user.connect_organization else None
     
     if not organization_id:
@@ -61,5 +156,5 @@ async def get_operation(operation_id: UUID = Path(...), db: Session = Depends(ge
             detail="User is not associated with any organization"
         )
     
-    return service.get_operation_by_id(operation_id, organization_id)
+    return await db.run_sync(lambda session: StockOperationService(session).get_operation_by_id(operation_id, organization_id))
 
@@ -1,13 +1,24 @@
+from collections import Counter
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, func, case, or_, literal, desc
 from fastapi import HTTPException, status, Depends
 from typing import List
 from uuid import UUID
 
-from app.models.nomen import Nomenclature, NomenclatureCreate, NomenclatureUpdate, NomenclatureResponse, Stock
+from app.models.nomen import Nomenclature, NomenclatureCreate, NomenclatureUpdate, NomenclatureResponse, NomenclatureSearchResult, Stock
 from app.models.auth import User
 from app.models.sklads import Sklads
 from app.core.security import get_me
+from app.utils.pagination import Keyset, Page, paginate
+from app.services.snapshot_cache import bump_snapshot_version
+from app.services.stock_service import apply_stock_deltas, journal_adjustment
+
+NOMENCLATURE_KEYSET = Keyset("nomenclature", Nomenclature.name, Nomenclature.id)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 class NomenclatureService:
@@ -82,6 +93,10 @@ class NomenclatureService:
                 min_quantity=None
             )
             self.db.add(stock_entry)
+            journal_adjustment(self.db, organization_id, new_item.id, sklad_id, quantity, current_user.id, "nomenclature")
+            self.db.flush()
+            apply_stock_deltas(self.db, organization_id, {(sklad_id, new_item.id): quantity})
+            bump_snapshot_version(self.db, sklad_id)
 
             self.db.commit()
             self.db.refresh(new_item)
@@ -94,7 +109,7 @@ class NomenclatureService:
 
         return NomenclatureResponse.from_orm(new_item)
 
-    def get_nomen(self, skip: int = 0, limit: int = 100, search: str = None, current_user: User = Depends(get_me)) -> List[NomenclatureResponse]:
+    def get_nomen(self, skip: int = 0, limit: int = 100, search: str = None, current_user: User = Depends(get_me), cursor: str = None) -> Page:
         organization_id, sklad_id = self._get_organization_and_sklad(current_user)
 
         query = self.db.query(Nomenclature).filter(
@@ -106,8 +121,8 @@ class NomenclatureService:
         if search:
             query = query.filter(Nomenclature.name.ilike(f"%{search}%"))
 
-        items = query.offset(skip).limit(limit).all()
-        return [NomenclatureResponse.from_orm(item) for item in items]
+        page = paginate(query, NOMENCLATURE_KEYSET, limit, cursor, skip)
+        return Page([NomenclatureResponse.from_orm(item) for item in page.items], page.next_cursor)
 
     def get_nomen_by_id(self, item_id: UUID, current_user: User = Depends(get_me)) -> NomenclatureResponse:
         organization_id, sklad_id = self._get_organization_and_sklad(current_user)
@@ -172,14 +187,18 @@ class NomenclatureService:
             stock = self.db.query(Stock).filter(
                 Stock.nomenclature_id == item_id,
                 Stock.sklad_id == sklad_id
-            ).first()
+            ).with_for_update().populate_existing().first()
             if stock:
+                delta = update_dict["quantity"] - stock.quantity
+                journal_adjustment(self.db, organization_id, item_id, sklad_id, delta, current_user.id, "nomenclature")
+                apply_stock_deltas(self.db, organization_id, {(sklad_id, item_id): delta})
                 stock.quantity = update_dict["quantity"]
 
         for key, value in update_dict.items():
             if key != "quantity":
                 setattr(item, key, value)
 
+        bump_snapshot_version(self.db, sklad_id)
         self.db.commit()
         self.db.refresh(item)
         return NomenclatureResponse.from_orm(item)
@@ -201,6 +220,15 @@ class NomenclatureService:
             )
 
         item.is_deleted = True
+        deltas, reserved = Counter(), Counter()
+        for stock in self.db.query(Stock).filter(Stock.nomenclature_id == item_id).order_by(Stock.sklad_id).with_for_update().populate_existing():
+            deltas[(stock.sklad_id, item_id)] -= stock.quantity
+            reserved[(stock.sklad_id, item_id)] -= stock.reserved
+            journal_adjustment(self.db, organization_id, item_id, stock.sklad_id, -stock.quantity, current_user.id, "nomenclature_delete")
+            stock.quantity = 0
+            stock.reserved = 0
+        apply_stock_deltas(self.db, organization_id, deltas, reserved)
+        bump_snapshot_version(self.db, sklad_id)
         self.db.commit()
         return {"message": "Nomenclature successfully deleted"}
 
@@ -214,4 +242,39 @@ class NomenclatureService:
             Nomenclature.is_deleted == False
         ).all()
 
-        return [NomenclatureResponse.from_orm(item) for item in items]
\ No newline at end of file
+        return [NomenclatureResponse.from_orm(item) for item in items]
+
+    def find(self, q: str, limit: int = 20, current_user: User = Depends(get_me)) -> List[NomenclatureSearchResult]:
+        organization_id, sklad_id = self._get_organization_and_sklad(current_user)
+        term = q.strip()
+        if not term:
+            return []
+
+        escaped = _escape_like(term)
+        contains = f"%{escaped}%"
+        prefix = f"{escaped}%"
+        score = (case(
+            (or_(Nomenclature.barcode == term, Nomenclature.article == term.upper()), 3.0),
+            (or_(Nomenclature.name.ilike(prefix, escape="\\"), Nomenclature.article.ilike(prefix, escape="\\"), Nomenclature.barcode.like(prefix, escape="\\")), 2.0),
+            (Nomenclature.name.ilike(contains, escape="\\"), 1.0),
+            else_=0.0
+        ) + func.word_similarity(term, Nomenclature.name)).label("score")
+
+        rows = self.db.execute(
+            select(Nomenclature, score)
+            .where(
+                Nomenclature.organization_id == organization_id,
+                Nomenclature.sklad_id == sklad_id,
+                Nomenclature.is_deleted == False,
+                or_(
+                    Nomenclature.name.ilike(contains, escape="\\"),
+                    Nomenclature.article.ilike(contains, escape="\\"),
+                    Nomenclature.barcode.like(prefix, escape="\\"),
+                    Nomenclature.category_id.ilike(contains, escape="\\"),
+                    literal(term).op("<%")(Nomenclature.name)
+                )
+            )
+            .order_by(desc(score), Nomenclature.name)
+            .limit(limit)
+        ).all()
+        return [NomenclatureSearchResult(**NomenclatureResponse.from_orm(item).dict(), score=round(item_score, 4)) for item, item_score in rows]
@@ -1,16 +1,62 @@
+import base64
+import json
+import os
+from collections import Counter, defaultdict
+from typing import List
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import select, update, bindparam, cast, text, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from fastapi import HTTPException, status
-from uuid import UUID
+from uuid import UUID, uuid4
 from datetime import datetime, timezone, timedelta
 
-from app.models.offline import OfflineToken, OfflineDevice, OfflineTokenCreate, OfflineTokenResponse
+from app.models.offline import (
+    OfflineToken, OfflineDevice, OfflineScan, OfflineScanStatus, OfflineTokenCreate, OfflineTokenResponse,
+    OfflineResultsUpload, OfflineResultsResponse, OfflineScanOutcome
+)
 from app.models.sklads import Sklads
 from app.models.auth import User
 from app.models.nomen import Nomenclature, NomenclatureResponse
-from app.models.sklad_docs import SkladDocument, SkladDocumentItem, SkladDocumentResponse, SkladDocumentItemResponse
+from app.models.sklad_docs import SkladDocument, SkladDocumentItem, SkladDocumentUnlink, SkladDocumentResponse, SkladDocumentItemResponse
+from app.services.sdocs_service import adjust_item_counters
+from app.services.snapshot_cache import SnapshotRef, get_snapshot_version, bump_snapshot_version
 from app.utils.qr import generate_token, make_qr_base64
 
+NOMENCLATURE_ADAPTER = TypeAdapter(List[NomenclatureResponse])
+DOCUMENTS_ADAPTER = TypeAdapter(List[SkladDocumentResponse])
+ITEMS_ADAPTER = TypeAdapter(List[SkladDocumentItemResponse])
+
+OFFLINE_SYNC_LAG = timedelta(seconds=float(os.getenv("OFFLINE_SYNC_LAG_SECONDS", "5")))
+
+WATERMARK_SQL = text("""
+    SELECT LEAST(
+        TIMEZONE('utc', now()) - make_interval(secs => :lag),
+        (SELECT TIMEZONE('utc', min(xact_start)) - interval '1 microsecond' FROM pg_stat_activity
+         WHERE datname = current_database() AND pid <> pg_backend_pid() AND xact_start IS NOT NULL)
+    )
+""")
+
+
+def encode_cursor(watermark: datetime) -> str:
+    payload = json.dumps({"ts": watermark.replace(tzinfo=timezone.utc).isoformat()}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> datetime:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        watermark = datetime.fromisoformat(payload["ts"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync cursor")
+    if watermark.tzinfo is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync cursor")
+    return watermark.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def stored_time(value: datetime):
+    return cast(value, DateTime())
+
 
 class OfflineService:
     def __init__(self, db: Session):
@@ -67,7 +113,7 @@ class OfflineService:
             raise HTTPException(status_code=status.HTTP_410_GONE, detail="Offline token expired")
         return offline_token
 
-    def get_sklad_data(self, token: str, device_id: str) -> dict:
+    def get_sklad_data(self, token: str, device_id: str) -> SnapshotRef:
         offline_token = self._get_active_token(token)
         sklad = self.db.query(Sklads).filter(Sklads.id == offline_token.sklad_id).first()
         if not sklad:
@@ -105,31 +151,63 @@ class OfflineService:
             self.db.add(device_record)
         self.db.commit()
 
-        nomenclature = self.db.query(Nomenclature).filter(
-            Nomenclature.organization_id == offline_token.organization_id,
-            Nomenclature.sklad_id == offline_token.sklad_id,
+        return self._snapshot_ref(offline_token)
+
+    def get_sklad_snapshot(self, token: str, device_id: str) -> SnapshotRef:
+        offline_token = self._get_active_token(token)
+        self._touch_device(offline_token, device_id)
+        return self._snapshot_ref(offline_token)
+
+    def _snapshot_ref(self, offline_token: OfflineToken) -> SnapshotRef:
+        return SnapshotRef(
+            sklad_id=offline_token.sklad_id,
+            organization_id=offline_token.organization_id,
+            token=offline_token.token,
+            version=get_snapshot_version(self.db, offline_token.sklad_id)
+        )
+
+    def _touch_device(self, offline_token: OfflineToken, device_id: str) -> OfflineDevice:
+        device = self.db.query(OfflineDevice).filter(
+            OfflineDevice.token_id == offline_token.id,
+            OfflineDevice.device_id == device_id,
+            OfflineDevice.is_active == True
+        ).first()
+        if not device:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Device is not checked in, call /api/offline/sklad first")
+        device.last_seen = datetime.now(timezone.utc)
+        self.db.commit()
+        return device
+
+    def build_snapshot(self, ref: SnapshotRef) -> dict:
+        sklad = self.db.query(Sklads).filter(Sklads.id == ref.sklad_id).first()
+        if not sklad:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Warehouse not found")
+        watermark = self._watermark()
+        nomenclature_payload = self._dump(NOMENCLATURE_ADAPTER, select(*Nomenclature.__table__.c).where(
+            Nomenclature.organization_id == ref.organization_id,
+            Nomenclature.sklad_id == ref.sklad_id,
             Nomenclature.is_deleted == False
-        ).all()
-        nomenclature_payload = [NomenclatureResponse.from_orm(item).model_dump() for item in nomenclature]
+        ))
 
-        documents = self.db.query(SkladDocument).filter(
-            SkladDocument.organization_id == offline_token.organization_id,
+        doc_filter = (
+            SkladDocument.organization_id == ref.organization_id,
             SkladDocument.is_deleted == False,
-            func.array_position(SkladDocument.sklad_ids, offline_token.sklad_id) != None
-        ).all()
-
-        documents_payload = []
-        for doc in documents:
-            doc_resp = SkladDocumentResponse.from_orm(doc).model_dump()
-            items = self.db.query(SkladDocumentItem).filter(
-                SkladDocumentItem.document_id == doc.id,
-                SkladDocumentItem.is_deleted == False
-            ).all()
-            doc_resp["items"] = [SkladDocumentItemResponse.from_orm(item).model_dump() for item in items]
-            documents_payload.append(doc_resp)
+            SkladDocument.sklad_ids.contains([ref.sklad_id])
+        )
+        documents_payload = self._dump(DOCUMENTS_ADAPTER, select(*SkladDocument.__table__.c).where(*doc_filter))
+        items_payload = self._dump(ITEMS_ADAPTER, select(*SkladDocumentItem.__table__.c).join(
+            SkladDocument, SkladDocument.id == SkladDocumentItem.document_id
+        ).where(*doc_filter, SkladDocumentItem.is_deleted == False))
+
+        items_by_doc = defaultdict(list)
+        for item in items_payload:
+            items_by_doc[item["document_id"]].append(item)
+        for doc in documents_payload:
+            doc["items"] = items_by_doc.get(doc["id"], [])
 
         return {
-            "token": token,
+            "token": ref.token,
+            "cursor": encode_cursor(watermark),
             "sklad": {
                 "id": str(sklad.id),
                 "name": sklad.name,
@@ -142,4 +220,185 @@ class OfflineService:
             "documents": documents_payload
         }
 
+    def _dump(self, adapter: TypeAdapter, query) -> list:
+        rows = self.db.execute(query).mappings().all()
+        return adapter.dump_python(adapter.validate_python(rows), mode="json")
+
+    def _split_deleted(self, adapter: TypeAdapter, query) -> dict:
+        rows = self.db.execute(query).mappings().all()
+        return {
+            "changed": adapter.dump_python(adapter.validate_python([row for row in rows if not row["is_deleted"]]), mode="json"),
+            "deleted": [str(row["id"]) for row in rows if row["is_deleted"]]
+        }
+
+    def _watermark(self) -> datetime:
+        return self.db.execute(WATERMARK_SQL, {"lag": OFFLINE_SYNC_LAG.total_seconds()}).scalar()
+
+    def _add_unlinked(self, documents: dict, items: dict, org_id: UUID, sklad_id: UUID, since: datetime, watermark: datetime):
+        unlinked = self.db.execute(
+            select(SkladDocumentUnlink.document_id).join(SkladDocument, SkladDocument.id == SkladDocumentUnlink.document_id).where(
+                SkladDocumentUnlink.sklad_id == sklad_id,
+                SkladDocumentUnlink.unlinked_at > stored_time(since),
+                SkladDocumentUnlink.unlinked_at <= stored_time(watermark),
+                SkladDocument.organization_id == org_id,
+                ~SkladDocument.sklad_ids.contains([sklad_id])
+            )
+        ).scalars().all()
+        if not unlinked:
+            return
+        item_ids = self.db.execute(select(SkladDocumentItem.id).where(SkladDocumentItem.document_id.in_(unlinked))).scalars().all()
+        documents["deleted"] = sorted(set(documents["deleted"]) | {str(doc_id) for doc_id in unlinked})
+        items["deleted"] = sorted(set(items["deleted"]) | {str(item_id) for item_id in item_ids})
+
+    def get_sklad_changes(self, token: str, device_id: str, cursor: str | None = None) -> dict:
+        offline_token = self._get_active_token(token)
+        since = decode_cursor(cursor) if cursor else None
+        self._touch_device(offline_token, device_id)
+
+        watermark = self._watermark()
+        if since and since >= watermark:
+            return {
+                "cursor": cursor,
+                "nomenclature": {"changed": [], "deleted": []},
+                "documents": {"changed": [], "deleted": []},
+                "items": {"changed": [], "deleted": []}
+            }
+
+        sklad_id = offline_token.sklad_id
+        org_id = offline_token.organization_id
+
+        nomen_query = select(*Nomenclature.__table__.c).where(
+            Nomenclature.organization_id == org_id,
+            Nomenclature.sklad_id == sklad_id,
+            Nomenclature.updated_at <= watermark
+        )
+        doc_query = select(*SkladDocument.__table__.c).where(
+            SkladDocument.organization_id == org_id,
+            SkladDocument.sklad_ids.contains([sklad_id]),
+            SkladDocument.updated_at <= stored_time(watermark)
+        )
+        item_query = select(*SkladDocumentItem.__table__.c).join(
+            SkladDocument, SkladDocument.id == SkladDocumentItem.document_id
+        ).where(
+            SkladDocument.organization_id == org_id,
+            SkladDocument.sklad_ids.contains([sklad_id]),
+            SkladDocumentItem.updated_at <= stored_time(watermark)
+        )
+        if since:
+            nomen_query = nomen_query.where(Nomenclature.updated_at > since)
+            doc_query = doc_query.where(SkladDocument.updated_at > stored_time(since))
+            item_query = item_query.where(SkladDocumentItem.updated_at > stored_time(since))
+        else:
+            nomen_query = nomen_query.where(Nomenclature.is_deleted == False)
+            doc_query = doc_query.where(SkladDocument.is_deleted == False)
+            item_query = item_query.where(SkladDocumentItem.is_deleted == False, SkladDocument.is_deleted == False)
+
+        nomenclature = self._split_deleted(NOMENCLATURE_ADAPTER, nomen_query)
+        documents = self._split_deleted(DOCUMENTS_ADAPTER, doc_query)
+        items = self._split_deleted(ITEMS_ADAPTER, item_query)
+        if since:
+            self._add_unlinked(documents, items, org_id, sklad_id, since, watermark)
+
+        return {
+            "cursor": encode_cursor(watermark),
+            "nomenclature": nomenclature,
+            "documents": documents,
+            "items": items
+        }
+
+    def upload_results(self, token: str, device_id: str, payload: OfflineResultsUpload) -> OfflineResultsResponse:
+        offline_token = self._get_active_token(token)
+        device = self._touch_device(offline_token, device_id)
+
+        outcomes = {}
+        duplicates = []
+        fresh = {}
+        for result in payload.results:
+            if result.seq in fresh:
+                duplicates.append(OfflineScanOutcome(seq=result.seq, item_id=result.item_id, status=OfflineScanStatus.DUPLICATE))
+            else:
+                fresh[result.seq] = result
+
+        for row in self.db.execute(select(OfflineScan.seq, OfflineScan.item_id, OfflineScan.status, OfflineScan.server_quantity).where(
+            OfflineScan.device_id == device.id,
+            OfflineScan.seq.in_(list(fresh))
+        )):
+            del fresh[row.seq]
+            outcomes[row.seq] = OfflineScanOutcome(
+                seq=row.seq, item_id=row.item_id, status=OfflineScanStatus(row.status), quantity_actual=row.server_quantity, replayed=True
+            )
+
+        items = {}
+        if fresh:
+            items = {row.id: row for row in self.db.execute(
+                select(
+                    SkladDocumentItem.id, SkladDocumentItem.document_id, SkladDocumentItem.nomenclature_id,
+                    SkladDocumentItem.quantity_actual, SkladDocumentItem.is_verified, SkladDocument.sklad_ids,
+                    Nomenclature.sklad_id.label("nomenclature_sklad_id")
+                )
+                .join(SkladDocument, SkladDocument.id == SkladDocumentItem.document_id)
+                .outerjoin(Nomenclature, Nomenclature.id == SkladDocumentItem.nomenclature_id)
+                .where(
+                    SkladDocumentItem.id.in_({result.item_id for result in fresh.values()}),
+                    SkladDocumentItem.is_deleted == False,
+                    SkladDocument.is_deleted == False,
+                    SkladDocument.organization_id == offline_token.organization_id,
+                    SkladDocument.sklad_ids.contains([offline_token.sklad_id])
+                )
+                .order_by(SkladDocumentItem.id)
+                .with_for_update(of=SkladDocumentItem)
+            )}
+
+        current = {item_id: row.quantity_actual for item_id, row in items.items()}
+        updates = {}
+        log = []
+        for seq in sorted(fresh):
+            result = fresh[seq]
+            row = items.get(result.item_id)
+            if row is None:
+                outcome, server_quantity = OfflineScanStatus.NOT_FOUND, None
+            elif current[result.item_id] in (result.base_quantity_actual, result.quantity_actual):
+                outcome, server_quantity = OfflineScanStatus.APPLIED, result.quantity_actual
+                current[result.item_id] = result.quantity_actual
+                updates[result.item_id] = result.quantity_actual
+            else:
+                outcome, server_quantity = OfflineScanStatus.CONFLICT, current[result.item_id]
+            outcomes[seq] = OfflineScanOutcome(seq=seq, item_id=result.item_id, status=outcome, quantity_actual=server_quantity)
+            log.append({
+                "id": uuid4(), "device_id": device.id, "seq": seq, "item_id": result.item_id,
+                "quantity_actual": result.quantity_actual, "status": outcome.value, "server_quantity": server_quantity
+            })
+
+        verified_documents = []
+        if updates:
+            item_table = SkladDocumentItem.__table__
+            self.db.execute(
+                update(item_table).where(item_table.c.id == bindparam("b_id")).values(quantity_actual=bindparam("b_quantity"), is_verified=True),
+                [{"b_id": item_id, "b_quantity": quantity} for item_id, quantity in updates.items()]
+            )
+            self.db.execute(update(Nomenclature).where(
+                Nomenclature.id.in_({items[item_id].nomenclature_id for item_id in updates}),
+                Nomenclature.is_verified == False
+            ).values(is_verified=True).execution_options(synchronize_session=False))
+            newly_verified = Counter(items[item_id].document_id for item_id in updates if not items[item_id].is_verified)
+            for document_id in sorted(newly_verified):
+                doc = adjust_item_counters(self.db, document_id, 0, newly_verified[document_id])
+                if doc and doc.is_verified:
+                    verified_documents.append(document_id)
+            touched = {offline_token.sklad_id}
+            for item_id in updates:
+                touched.update(items[item_id].sklad_ids)
+                touched.add(items[item_id].nomenclature_sklad_id)
+            bump_snapshot_version(self.db, *touched)
 
+        if log:
+            self.db.execute(pg_insert(OfflineScan).on_conflict_do_nothing(index_elements=[OfflineScan.device_id, OfflineScan.seq]), log)
+        self.db.commit()
+
+        results = sorted([*outcomes.values(), *duplicates], key=lambda outcome: (outcome.seq, outcome.status == OfflineScanStatus.DUPLICATE))
+        return OfflineResultsResponse(
+            applied=sum(1 for outcome in results if outcome.status == OfflineScanStatus.APPLIED and not outcome.replayed),
+            conflicts=sum(1 for outcome in results if outcome.status == OfflineScanStatus.CONFLICT),
+            results=results,
+            verified_documents=verified_documents
+        )
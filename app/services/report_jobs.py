@@ -0,0 +1,251 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.core import SessionLocal
+from app.models.auth import User
+from app.models.docs import ReportJob, ReportJobStatus, ReportJobResponse
+from app.models.sklads import Sklads
+from app.services.reports import PDFService
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_QUEUE_SIZE = int(os.getenv("REPORT_QUEUE_SIZE", "50"))
+REPORT_ORG_CONCURRENCY = int(os.getenv("REPORT_ORG_CONCURRENCY", "1"))
+REPORT_ORG_QUEUE = int(os.getenv("REPORT_ORG_QUEUE", "5"))
+REPORT_RETRY_AFTER = int(os.getenv("REPORT_RETRY_AFTER", "15"))
+REPORT_JOB_TIMEOUT = int(os.getenv("REPORT_JOB_TIMEOUT", "900"))
+REPORT_POLL_INTERVAL = 0.5
+
+ACTIVE_STATUSES = (ReportJobStatus.QUEUED, ReportJobStatus.RUNNING)
+
+
+def _finish(db: Session, job: ReportJob, status: ReportJobStatus, error: Optional[str] = None, error_code: Optional[int] = None):
+    job.status = status
+    job.error = error
+    job.error_code = error_code
+    job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def _stale_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=REPORT_JOB_TIMEOUT)
+
+
+def fail_stale_jobs(db: Session) -> int:
+    result = db.execute(
+        update(ReportJob)
+        .where(ReportJob.status.in_(ACTIVE_STATUSES), func.coalesce(ReportJob.started_at, ReportJob.created_at) < _stale_cutoff())
+        .values(status=ReportJobStatus.FAILED, error="Report job was lost, request the report again", error_code=500, finished_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def recover_report_jobs() -> int:
+    db = SessionLocal()
+    try:
+        return fail_stale_jobs(db)
+    finally:
+        db.close()
+
+
+def render_inventory_job(job_id: UUID) -> str:
+    db = SessionLocal()
+    try:
+        job = db.get(ReportJob, job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return job.status.value if job else ReportJobStatus.FAILED.value
+        job.status = ReportJobStatus.RUNNING
+        job.started_at = datetime.now(timezone.utc)
+        db.commit()
+
+        user = db.get(User, job.requested_by)
+        try:
+            if user is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            result = PDFService(db).gen_report(user, sklad=job.sklad_id is not None, sklad_id=job.sklad_id)
+        except HTTPException as e:
+            db.rollback()
+            _finish(db, job, ReportJobStatus.FAILED, str(e.detail), e.status_code)
+            return job.status.value
+        except Exception as e:
+            db.rollback()
+            _finish(db, job, ReportJobStatus.FAILED, f"Report rendering failed: {e}", 500)
+            return job.status.value
+
+        job.file_path = result["file_path"]
+        job.download_url = result["download_url"]
+        job.filename = result["filename"]
+        job.online_url = result["online_url"]
+        job.signature_hash = result["signature_hash"]
+        job.qr_code = result["qr_code"].getvalue().hex()
+        _finish(db, job, ReportJobStatus.DONE)
+        return job.status.value
+    finally:
+        db.close()
+
+
+def _load_renderer():
+    import app.services.report_render
+
+
+def _mark_failed(job_id: UUID, error: str):
+    db = SessionLocal()
+    try:
+        job = db.get(ReportJob, job_id)
+        if job is not None and job.status in ACTIVE_STATUSES:
+            _finish(db, job, ReportJobStatus.FAILED, error, 500)
+    finally:
+        db.close()
+
+
+class ReportJobQueue:
+    def __init__(self, workers: int, queue_size: int, org_concurrency: int, org_queue: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.org_concurrency = org_concurrency
+        self.org_queue = org_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._total = 0
+        self._pending: Dict[UUID, int] = {}
+        self._semaphores: Dict[UUID, asyncio.Semaphore] = {}
+        self._tasks: Dict[UUID, asyncio.Task] = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_renderer
+            )
+        return self._executor
+
+    def reserve(self, org_id: UUID):
+        headers = {"Retry-After": str(REPORT_RETRY_AFTER)}
+        if self._total >= self.queue_size:
+            raise HTTPException(status_code=503, detail="Report queue is full, try again later", headers=headers)
+        if self._pending.get(org_id, 0) >= self.org_queue:
+            raise HTTPException(status_code=429, detail="Too many reports in progress for this organization", headers=headers)
+        self._total += 1
+        self._pending[org_id] = self._pending.get(org_id, 0) + 1
+
+    def release(self, org_id: UUID):
+        self._total -= 1
+        self._pending[org_id] -= 1
+        if not self._pending[org_id]:
+            del self._pending[org_id]
+            self._semaphores.pop(org_id, None)
+
+    def submit(self, job_id: UUID, org_id: UUID) -> asyncio.Task:
+        task = asyncio.create_task(self._run(job_id, org_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return task
+
+    async def _run(self, job_id: UUID, org_id: UUID) -> str:
+        semaphore = self._semaphores.setdefault(org_id, asyncio.Semaphore(self.org_concurrency))
+        try:
+            async with semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._pool(), render_inventory_job, job_id)
+        except BrokenProcessPool:
+            self._executor = None
+            await run_in_threadpool(_mark_failed, job_id, "Report worker crashed")
+            return ReportJobStatus.FAILED.value
+        except Exception as e:
+            await run_in_threadpool(_mark_failed, job_id, f"Report rendering failed: {e}")
+            return ReportJobStatus.FAILED.value
+        finally:
+            self.release(org_id)
+
+    async def wait(self, job_id: UUID, timeout: float) -> bool:
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return True
+
+    def stats(self) -> dict:
+        return {"queued": self._total, "queue_size": self.queue_size, "organizations": len(self._pending)}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+report_queue = ReportJobQueue(REPORT_WORKERS, REPORT_QUEUE_SIZE, REPORT_ORG_CONCURRENCY, REPORT_ORG_QUEUE)
+
+
+class ReportJobService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_job(self, current_user: User, sklad: bool, sklad_id: Optional[UUID] = None) -> ReportJob:
+        org_id = PDFService(self.db)._get_org(current_user)
+
+        if sklad:
+            exists = self.db.query(Sklads.id).filter(
+                Sklads.id == sklad_id,
+                Sklads.organization_id == org_id,
+                Sklads.is_deleted == False
+            ).first()
+            if not exists:
+                raise HTTPException(status_code=404, detail="Warehouse not found")
+
+        report_queue.reserve(org_id)
+        try:
+            job = ReportJob(
+                organization_id=org_id,
+                requested_by=current_user.id,
+                sklad_id=sklad_id if sklad else None,
+                status=ReportJobStatus.QUEUED
+            )
+            self.db.add(job)
+            self.db.commit()
+            self.db.refresh(job)
+        except Exception:
+            self.db.rollback()
+            report_queue.release(org_id)
+            raise
+        return job
+
+    def get_job(self, job_id: UUID, current_user: User) -> ReportJob:
+        org_id = PDFService(self.db)._get_org(current_user)
+        job = self.db.query(ReportJob).filter(
+            ReportJob.id == job_id,
+            ReportJob.organization_id == org_id
+        ).first()
+        if not job:
+            raise HTTPException(status_code=404, detail="Report job not found")
+        if job.status in ACTIVE_STATUSES and (job.started_at or job.created_at) < _stale_cutoff():
+            fail_stale_jobs(self.db)
+            self.db.refresh(job)
+        return job
+
+
+async def await_job(db, job_id: UUID, current_user: User, timeout: float) -> ReportJobResponse:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        job = await db.run_sync(lambda session: ReportJobResponse.from_job(ReportJobService(session).get_job(job_id, current_user)))
+        await db.rollback()
+        remaining = deadline - loop.time()
+        if job.status not in ACTIVE_STATUSES or remaining <= 0:
+            return job
+        if not await report_queue.wait(job_id, remaining):
+            await asyncio.sleep(min(REPORT_POLL_INTERVAL, remaining))
@@ -0,0 +1,333 @@
+import itertools
+from io import BytesIO
+
+import qrcode
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_LEFT
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.fonts import addMapping
+from reportlab.graphics import renderPDF
+from reportlab.graphics.barcode.widgets import BarcodeCode128
+from reportlab.graphics.barcode.qr import QrCodeWidget
+from reportlab.graphics.shapes import Drawing, Group
+
+pdfmetrics.registerFont(TTFont('Arial', './static/Arial.ttf'))
+addMapping('Arial', 0, 0, 'Arial')
+
+STREAM_CHUNK_ROWS = 22
+
+SKLAD_HEADERS = ["Название", "Артикул", "Штрих-код", "Ед.", "Количество"]
+ORG_HEADERS = ["Склад", "Название", "Артикул", "Штрих-код", "Ед.", "Количество"]
+SKLAD_COL_WIDTHS = [60*mm, 35*mm, 40*mm, 15*mm, 30*mm]
+ORG_COL_WIDTHS = [30*mm, 50*mm, 30*mm, 35*mm, 12*mm, 23*mm]
+
+
+class StreamingFlowables(list):
+    def __init__(self, head, tail, lookahead: int = 2):
+        super().__init__(head)
+        self._tail = iter(tail)
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while self._tail is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._tail))
+            except StopIteration:
+                self._tail = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+def inventory_table_style(sklad: bool) -> TableStyle:
+    header_bg_color = colors.HexColor('#3498db')
+    header_text_color = colors.white
+    even_row_bg = colors.HexColor('#f8f9fa')
+    odd_row_bg = colors.white
+    border_color = colors.HexColor('#dee2e6')
+
+    table_style = [
+        ("FONTNAME", (0, 0), (-1, -1), "Arial"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("GRID", (0, 0), (-1, -1), 1, border_color),
+
+        ("BACKGROUND", (0, 0), (-1, 0), header_bg_color),
+        ("TEXTCOLOR", (0, 0), (-1, 0), header_text_color),
+        ("FONTNAME", (0, 0), (-1, 0), "Arial"),
+        ("FONTSIZE", (0, 0), (-1, 0), 10),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("TOPPADDING", (0, 0), (-1, 0), 12),
+        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+        ("VALIGN", (0, 0), (-1, 0), "MIDDLE"),
+
+        ("TOPPADDING", (0, 1), (-1, -1), 8),
+        ("BOTTOMPADDING", (0, 1), (-1, -1), 8),
+        ("LEFTPADDING", (0, 1), (-1, -1), 6),
+        ("RIGHTPADDING", (0, 1), (-1, -1), 6),
+        ("VALIGN", (0, 1), (-1, -1), "MIDDLE"),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [odd_row_bg, even_row_bg]),
+
+        ("ALIGN", (-2, 1), (-1, -1), "CENTER"),
+    ]
+
+    if sklad:
+        table_style.append(("ALIGN", (2, 1), (2, -1), "CENTER"))
+    else:
+        table_style.append(("ALIGN", (3, 1), (3, -1), "CENTER"))
+    return TableStyle(table_style)
+
+
+def inventory_row(item, sklad: bool) -> list:
+    row = [item.name, item.article, item.barcode if item.barcode else "-", item.unit, str(item.quantity)]
+    return row if sklad else [item.sklad_name] + row
+
+
+def inventory_tables(rows, sklad: bool, chunk_rows: int = STREAM_CHUNK_ROWS):
+    headers = SKLAD_HEADERS if sklad else ORG_HEADERS
+    col_widths = SKLAD_COL_WIDTHS if sklad else ORG_COL_WIDTHS
+    style = inventory_table_style(sklad)
+    chunk = [headers]
+    for item in rows:
+        chunk.append(inventory_row(item, sklad))
+        if len(chunk) > chunk_rows:
+            yield Table(chunk, colWidths=col_widths, repeatRows=1, style=style)
+            chunk = [headers]
+    if len(chunk) > 1:
+        yield Table(chunk, colWidths=col_widths, repeatRows=1, style=style)
+
+
+class InventoryDocTemplate(SimpleDocTemplate):
+    FOOTER_FORM = "inventory_footer"
+
+    def __init__(self, *args, **kwargs):
+        self.signature_hash = kwargs.pop('signature_hash', None)
+        self.online_url = kwargs.pop('online_url', None)
+        self._footer_ready = False
+        super().__init__(*args, **kwargs)
+
+    def _fit(self, widget, width: float, height: float) -> Drawing:
+        x0, y0, x1, y1 = widget.getBounds()
+        scale = min(width / (x1 - x0), height / (y1 - y0))
+        drawing = Drawing(width, height)
+        group = Group(widget)
+        group.transform = (scale, 0, 0, scale,
+                           (width - (x1 - x0) * scale) / 2 - x0 * scale,
+                           (height - (y1 - y0) * scale) / 2 - y0 * scale)
+        drawing.add(group)
+        return drawing
+
+    def _draw_footer(self, canv):
+        barcode_width = 60*mm
+        barcode_height = 15*mm
+        barcode_x = 15*mm
+        barcode_y = 18*mm
+
+        canv.setFillColor(colors.white)
+        canv.rect(barcode_x - 2*mm, barcode_y - 2*mm,
+                  barcode_width + 4*mm, barcode_height + 8*mm,
+                  fill=1, stroke=0)
+
+        signature = BarcodeCode128(value=self.signature_hash, barHeight=barcode_height * 0.75, humanReadable=True, fontName="Arial")
+        renderPDF.draw(self._fit(signature, barcode_width, barcode_height), canv, barcode_x, barcode_y)
+
+        canv.setFont("Arial", 8)
+        canv.setFillColor(colors.HexColor('#2c3e50'))
+        text_width = canv.stringWidth("Электронная подпись", "Arial", 8)
+        canv.drawString(barcode_x + (barcode_width - text_width) / 2,
+                        barcode_y - 4*mm, "Электронная подпись")
+
+        qr_size = 25*mm
+        qr_x = A4[0] - 15*mm - qr_size
+        qr_y = 18*mm
+
+        canv.setFillColor(colors.white)
+        canv.rect(qr_x - 2*mm, qr_y - 2*mm,
+                  qr_size + 4*mm, qr_size + 8*mm,
+                  fill=1, stroke=0)
+
+        renderPDF.draw(self._fit(QrCodeWidget(self.online_url), qr_size, qr_size), canv, qr_x, qr_y)
+
+        canv.setFont("Arial", 8)
+        canv.setFillColor(colors.HexColor('#2c3e50'))
+        text_width = canv.stringWidth("Онлайн просмотр", "Arial", 8)
+        canv.drawString(qr_x + (qr_size - text_width) / 2,
+                        qr_y - 4*mm, "Онлайн просмотр")
+
+    def afterPage(self):
+        if self.signature_hash and self.online_url:
+            if not self._footer_ready:
+                self.canv.beginForm(self.FOOTER_FORM)
+                self._draw_footer(self.canv)
+                self.canv.endForm()
+                self._footer_ready = True
+            self.canv.saveState()
+            self.canv.doForm(self.FOOTER_FORM)
+            self.canv.restoreState()
+
+
+def qr_png(data: str) -> BytesIO:
+    qr = qrcode.QRCode(version=1, box_size=10, border=4)
+    qr.add_data(data)
+    qr.make(fit=True)
+    qr_img = qr.make_image(fill_color="black", back_color="white")
+    qr_buffer = BytesIO()
+    qr_img.save(qr_buffer, format='PNG')
+    qr_buffer.seek(0)
+    return qr_buffer
+
+
+def render_stock_report(items, sklad_id: str | None) -> bytes:
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=15*mm, rightMargin=15*mm, topMargin=20*mm)
+    styles = getSampleStyleSheet()
+    styles["Normal"].fontName = "Arial"
+    styles["Title"].fontName = "Arial"
+    content = []
+
+    title_text = "Остатки по складам" if sklad_id is None else "Остатки по выбранному складу"
+    content.append(Paragraph(title_text, styles["Title"]))
+    content.append(Spacer(1, 12))
+
+    data = [["Название", "Артикул", "Ед.", "Количество"]]
+    for item in items:
+        data.append([item.name, item.article, item.unit, str(item.quantity)])
+
+    table = Table(data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (-1, -1), "Arial"),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("ALIGN", (2, 1), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Arial"),
+        ("FONTSIZE", (0, 0), (-1, 0), 12),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
+    ]))
+    content.append(table)
+    doc.build(content)
+
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes
+
+
+def render_inventory(organization, sklad_obj, timestamp, rows, stream: bool, signature_hash: str, online_url: str) -> bytes:
+    sklad = sklad_obj is not None
+    buffer = BytesIO()
+    styles = getSampleStyleSheet()
+    styles["Normal"].fontName = "Arial"
+    styles["Title"].fontName = "Arial"
+    styles["Heading2"].fontName = "Arial"
+
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Title'],
+        fontSize=20,
+        textColor=colors.HexColor('#1a1a1a'),
+        spaceAfter=12,
+        alignment=TA_LEFT,
+        fontName='Arial'
+    )
+    
+    header_style = ParagraphStyle(
+        'CustomHeader',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.HexColor('#2c3e50'),
+        spaceAfter=8,
+        spaceBefore=4,
+        fontName='Arial'
+    )
+    
+    info_style = ParagraphStyle(
+        'CustomInfo',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#34495e'),
+        spaceAfter=6,
+        leftIndent=8,
+        fontName='Arial'
+    )
+    
+    content = []
+
+    if sklad:
+        title_text = f"ИНВЕНТАРИЗАЦИЯ СКЛАДА<br/>{sklad_obj.name}"
+    else:
+        title_text = f"ИНВЕНТАРИЗАЦИЯ ОРГАНИЗАЦИИ<br/>{organization.legalName}"
+    
+    content.append(Paragraph(title_text, title_style))
+    content.append(Spacer(1, 8))
+    content.append(Paragraph("<b>Информация об организации</b>", header_style))
+    
+    org_info_html = f"""
+    <para leftIndent="10" spaceAfter="4">
+    <b>Организация:</b> {organization.legalName}
+    </para>
+    """
+    content.append(Paragraph(org_info_html, info_style))
+    
+    if organization.inn:
+        org_info_html = f"""
+        <para leftIndent="10" spaceAfter="4">
+        <b>ИНН:</b> {organization.inn}
+        </para>
+        """
+        content.append(Paragraph(org_info_html, info_style))
+    
+    if organization.description:
+        org_info_html = f"""
+        <para leftIndent="10" spaceAfter="4">
+        <b>Описание:</b> {organization.description}
+        </para>
+        """
+        content.append(Paragraph(org_info_html, info_style))
+    
+    if organization.address:
+        addr = organization.address
+        address_str = f"{addr.get('country', '')}, {addr.get('city', '')}, {addr.get('street', '')}, {addr.get('postalCode', '')}"
+        org_info_html = f"""
+        <para leftIndent="10" spaceAfter="4">
+        <b>Адрес:</b> {address_str}
+        </para>
+        """
+        content.append(Paragraph(org_info_html, info_style))
+    
+    content.append(Spacer(1, 10))
+
+    date_text = f"<b>Дата создания:</b> {timestamp.strftime('%d.%m.%Y %H:%M')}"
+    content.append(Paragraph(date_text, header_style))
+    content.append(Spacer(1, 16))
+
+    if stream:
+        content = StreamingFlowables(content, itertools.chain(
+            inventory_tables(rows, sklad),
+            [Spacer(1, 12)]
+        ))
+    else:
+        data = [SKLAD_HEADERS if sklad else ORG_HEADERS]
+        data.extend(inventory_row(item, sklad) for item in rows)
+        table = Table(data, repeatRows=1)
+        table.setStyle(inventory_table_style(sklad))
+        content.append(table)
+        content.append(Spacer(1, 12))
+
+    doc = InventoryDocTemplate(buffer, pagesize=A4, leftMargin=15*mm, rightMargin=15*mm,
+                               topMargin=20*mm, bottomMargin=40*mm,
+                               signature_hash=signature_hash, online_url=online_url)
+
+    try:
+        doc.build(content)
+        return buffer.getvalue()
+    finally:
+        buffer.close()
@@ -1,13 +1,27 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import update, and_, delete, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from fastapi import HTTPException, status
 from typing import List
 from uuid import UUID
 
-from app.models.sklad_docs import SkladDocument, SkladDocumentItem, SkladDocumentCreate, SkladDocumentUpdate, SkladDocumentResponse, SkladDocumentItemCreate, SkladDocumentItemUpdate, SkladDocumentItemResponse
+from app.models.sklad_docs import SkladDocument, SkladDocumentItem, SkladDocumentUnlink, SkladDocumentCreate, SkladDocumentUpdate, SkladDocumentResponse, SkladDocumentItemCreate, SkladDocumentItemUpdate, SkladDocumentItemResponse
 from app.models.auth import User
 from app.models.sklads import Sklads
 from app.models.nomen import Nomenclature
+from app.services.snapshot_cache import bump_snapshot_version
+
+def adjust_item_counters(db: Session, document_id: UUID, total_delta: int, verified_delta: int):
+    total = SkladDocument.total_items + total_delta
+    verified = SkladDocument.verified_items + verified_delta
+    return db.execute(
+        update(SkladDocument)
+        .where(SkladDocument.id == document_id)
+        .values(total_items=total, verified_items=verified, is_verified=and_(total > 0, verified == total))
+        .returning(SkladDocument.is_verified, SkladDocument.sklad_ids)
+        .execution_options(synchronize_session=False)
+    ).first()
+
 
 class SkladDocumentService:
     def __init__(self, db: Session):
@@ -38,6 +52,7 @@ class SkladDocumentService:
             address_to=data.address_to.dict() if data.address_to else None
         )
         self.db.add(doc)
+        bump_snapshot_version(self.db, *data.sklad_ids)
         self.db.commit()
         self.db.refresh(doc)
         return SkladDocumentResponse.from_orm(doc)
@@ -45,7 +60,7 @@ class SkladDocumentService:
     def get_documents(self, org_id: UUID, sklad_id: UUID = None) -> List[SkladDocumentResponse]:
         query = self.db.query(SkladDocument).filter(SkladDocument.organization_id == org_id, SkladDocument.is_deleted == False)
         if sklad_id:
-            query = query.filter(func.array_position(SkladDocument.sklad_ids, sklad_id) != None)
+            query = query.filter(SkladDocument.sklad_ids.contains([sklad_id]))
         return [SkladDocumentResponse.from_orm(d) for d in query.all()]
 
     def get_document_by_id(self, doc_id: UUID, org_id: UUID) -> SkladDocumentResponse:
@@ -54,6 +69,24 @@ class SkladDocumentService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
         return SkladDocumentResponse.from_orm(doc)
 
+    def _relink_sklads(self, doc: SkladDocument, sklad_ids: List[UUID]):
+        removed = set(doc.sklad_ids) - set(sklad_ids)
+        added = set(sklad_ids) - set(doc.sklad_ids)
+        if removed:
+            stmt = pg_insert(SkladDocumentUnlink).values([{"document_id": doc.id, "sklad_id": sklad_id} for sklad_id in sorted(removed, key=str)])
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[SkladDocumentUnlink.document_id, SkladDocumentUnlink.sklad_id],
+                set_={"unlinked_at": text("TIMEZONE('utc', now())")}
+            ))
+        if added:
+            self.db.execute(delete(SkladDocumentUnlink).where(SkladDocumentUnlink.document_id == doc.id, SkladDocumentUnlink.sklad_id.in_(added)))
+            self.db.execute(
+                update(SkladDocumentItem)
+                .where(SkladDocumentItem.document_id == doc.id)
+                .values(updated_at=text("TIMEZONE('utc', now())"))
+                .execution_options(synchronize_session=False)
+            )
+
     def update_document(self, doc_id: UUID, data: SkladDocumentUpdate, org_id: UUID) -> SkladDocumentResponse:
         doc = self.db.query(SkladDocument).filter(SkladDocument.id == doc_id, SkladDocument.organization_id == org_id, SkladDocument.is_deleted == False).first()
         if not doc:
@@ -65,6 +98,9 @@ class SkladDocumentService:
             update_dict["address_from"] = update_dict["address_from"].dict() if hasattr(update_dict["address_from"], "dict") else update_dict["address_from"]
         if "address_to" in update_dict and update_dict["address_to"]:
             update_dict["address_to"] = update_dict["address_to"].dict() if hasattr(update_dict["address_to"], "dict") else update_dict["address_to"]
+        if data.sklad_ids:
+            self._relink_sklads(doc, data.sklad_ids)
+        bump_snapshot_version(self.db, *doc.sklad_ids, *(data.sklad_ids or []))
         for key, value in update_dict.items():
             setattr(doc, key, value)
         self.db.commit()
@@ -76,7 +112,10 @@ class SkladDocumentService:
         if not doc:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
         doc.is_deleted = True
+        doc.total_items = 0
+        doc.verified_items = 0
         self.db.query(SkladDocumentItem).filter(SkladDocumentItem.document_id == doc_id).update({"is_deleted": True})
+        bump_snapshot_version(self.db, *doc.sklad_ids)
         self.db.commit()
         return {"message": "Document deleted"}
 
@@ -107,15 +146,9 @@ class SkladDocumentService:
         
         self.db.add(item)
         self.db.flush()
+        adjust_item_counters(self.db, doc_id, 1, int(item.is_verified))
 
-
-        all_items = self.db.query(SkladDocumentItem).filter(
-            SkladDocumentItem.document_id == doc_id,
-            SkladDocumentItem.is_deleted == False
-        ).all()
-        if all_items and all(item.is_verified for item in all_items):
-            doc.is_verified = True
-        
+        bump_snapshot_version(self.db, *doc.sklad_ids, nomen.sklad_id)
         self.db.commit()
         self.db.refresh(item)
         return SkladDocumentItemResponse.from_orm(item)
@@ -138,7 +171,8 @@ class SkladDocumentService:
         return SkladDocumentItemResponse.from_orm(item)
 
     def update_item(self, item_id: UUID, data: SkladDocumentItemUpdate, org_id: UUID) -> SkladDocumentItemResponse:
-        item = self.db.query(SkladDocumentItem).join(SkladDocument).filter(SkladDocumentItem.id == item_id, SkladDocument.organization_id == org_id, SkladDocumentItem.is_deleted == False).first()
+        item = self.db.query(SkladDocumentItem).join(SkladDocument).filter(SkladDocumentItem.id == item_id, SkladDocument.organization_id == org_id, SkladDocumentItem.is_deleted == False
+        ).with_for_update(of=SkladDocumentItem).populate_existing().first()
         if not item:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
         if data.nomenclature_id:
@@ -149,33 +183,40 @@ class SkladDocumentService:
         if "packaging" in update_dict and update_dict["packaging"]:
             update_dict["packaging"] = update_dict["packaging"].dict() if hasattr(update_dict["packaging"], "dict") else update_dict["packaging"]
 
+        was_verified = item.is_verified
+        touched_sklads = []
         if "quantity_actual" in update_dict and update_dict["quantity_actual"] is not None:
             item.is_verified = True
             nomen = self.db.query(Nomenclature).filter(Nomenclature.id == item.nomenclature_id).first()
             if nomen:
                 nomen.is_verified = True
+                touched_sklads.append(nomen.sklad_id)
         
         for key, value in update_dict.items():
             setattr(item, key, value)
+        self.db.flush()
 
-        doc = self.db.query(SkladDocument).filter(SkladDocument.id == item.document_id).first()
+        if item.is_verified != was_verified:
+            doc = adjust_item_counters(self.db, item.document_id, 0, 1)
+        else:
+            doc = self.db.query(SkladDocument.sklad_ids).filter(SkladDocument.id == item.document_id).first()
         if doc:
-            all_items = self.db.query(SkladDocumentItem).filter(
-                SkladDocumentItem.document_id == doc.id,
-                SkladDocumentItem.is_deleted == False
-            ).all()
-            if all_items and all(item.is_verified for item in all_items):
-                doc.is_verified = True
-        
+            touched_sklads.extend(doc.sklad_ids)
+
+        bump_snapshot_version(self.db, *touched_sklads)
         self.db.commit()
         self.db.refresh(item)
         return SkladDocumentItemResponse.from_orm(item)
 
     def delete_item(self, item_id: UUID, org_id: UUID) -> dict:
-        item = self.db.query(SkladDocumentItem).join(SkladDocument).filter(SkladDocumentItem.id == item_id, SkladDocument.organization_id == org_id, SkladDocumentItem.is_deleted == False).first()
+        item = self.db.query(SkladDocumentItem).join(SkladDocument).filter(SkladDocumentItem.id == item_id, SkladDocument.organization_id == org_id, SkladDocumentItem.is_deleted == False
+        ).with_for_update(of=SkladDocumentItem).populate_existing().first()
         if not item:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
         item.is_deleted = True
+        self.db.flush()
+        doc = adjust_item_counters(self.db, item.document_id, -1, -int(item.is_verified))
+        bump_snapshot_version(self.db, *(doc.sklad_ids if doc else []))
         self.db.commit()
         return {"message": "Item deleted"}
 
@@ -18,7 +18,7 @@ class AuthService:
     def __init__(self, db: Session):
         self.db = db
 
-    async def register(self, user: UserCreate, invite_token: str = None):
+    def register(self, user: UserCreate, invite_token: str = None):
         if self.db.query(User).filter(User.email == user.email).first():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -77,7 +77,7 @@ class AuthService:
             "user_id": str(db_user.id)
         }
 
-    async def verify_email(self, email: str, code: str):
+    def verify_email(self, email: str, code: str):
         user = self.db.query(User).filter(User.email == email).first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -105,7 +105,7 @@ class AuthService:
 
         return {"message": "cool!"}
 
-    async def resend_ver(self, email: str):
+    def resend_ver(self, email: str):
         user = self.db.query(User).filter(User.email == email).first()
         if not user:
             raise HTTPException(status_code=404, detail="Otter did not find such a user")
@@ -139,7 +139,7 @@ class AuthService:
             "expires_in": 600
         }
 
-    async def login(self, user: UserLogin, invite_token: str = None):
+    def login(self, user: UserLogin, invite_token: str = None):
         db_user = self.db.query(User).filter(User.email == user.email).first()
         if not db_user:
             raise HTTPException(status_code=401, detail="User not found! Otter is sad :(")
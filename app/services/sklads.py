@@ -3,9 +3,12 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from app.models.sklads import Sklads, SkladsCreate, SkladsUpdate, SkladsResponse
-from typing import List
+from app.services.snapshot_cache import bump_snapshot_version
+from app.utils.pagination import Keyset, Page, paginate
 from uuid import UUID
 
+SKLADS_KEYSET = Keyset("sklads", Sklads.created_at, Sklads.id)
+
 
 class SkladService:
     def __init__(self, db: Session):
@@ -53,15 +56,10 @@ class SkladService:
 
         return SkladsResponse.from_orm(new_sklad)
 
-    def get_sklads(self, organization_id: UUID, skip: int = 0, limit: int = 100) -> List[SkladsResponse]:
-        sklads = (
-            self.db.query(Sklads)
-            .filter( Sklads.organization_id == organization_id, Sklads.is_deleted == False)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
-        return [SkladsResponse.from_orm(sklad) for sklad in sklads]
+    def get_sklads(self, organization_id: UUID, skip: int = 0, limit: int = 100, cursor: str = None) -> Page:
+        query = self.db.query(Sklads).filter(Sklads.organization_id == organization_id, Sklads.is_deleted == False)
+        page = paginate(query, SKLADS_KEYSET, limit, cursor, skip)
+        return Page([SkladsResponse.from_orm(sklad) for sklad in page.items], page.next_cursor)
 
     def get_sklad_by_id(self, sklad_id: UUID, organization_id: UUID) -> SkladsResponse:
         sklad = self.db.query(Sklads).filter(
@@ -110,6 +108,7 @@ class SkladService:
             if value is not None:
                 setattr(sklad, key, value)
 
+        bump_snapshot_version(self.db, sklad_id)
         self.db.commit()
         self.db.refresh(sklad)
         return SkladsResponse.from_orm(sklad)
@@ -128,6 +127,7 @@ class SkladService:
             )
 
         sklad.is_deleted = True
+        bump_snapshot_version(self.db, sklad_id)
         self.db.commit()
 
         return {"message": "sklad successfully deleted"}
\ No newline at end of file
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.offline import SkladSnapshotVersion
+from app.utils.negotiation import serialize, compress, make_etag, JSON_TYPE, MSGPACK_TYPES
+
+SNAPSHOT_CACHE_SIZE = int(os.getenv("OFFLINE_SNAPSHOT_CACHE_SIZE", "32"))
+
+
+def bump_snapshot_version(db: Session, *sklad_ids):
+    ids = sorted({sklad_id if isinstance(sklad_id, UUID) else UUID(str(sklad_id)) for sklad_id in sklad_ids if sklad_id})
+    if not ids:
+        return
+    stmt = pg_insert(SkladSnapshotVersion).values([{"sklad_id": sklad_id, "version": 1, "updated_at": func.now()} for sklad_id in ids])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[SkladSnapshotVersion.sklad_id],
+        set_={"version": SkladSnapshotVersion.version + 1, "updated_at": func.now()}
+    ))
+
+
+def get_snapshot_version(db: Session, sklad_id: UUID) -> int:
+    return db.execute(select(SkladSnapshotVersion.version).where(SkladSnapshotVersion.sklad_id == sklad_id)).scalar() or 0
+
+
+@dataclass(frozen=True)
+class SnapshotRef:
+    sklad_id: UUID
+    organization_id: UUID
+    token: str
+    version: int
+
+    @property
+    def etag(self) -> str:
+        return make_etag("offline-snapshot", self.sklad_id, self.token, self.version)
+
+
+class SnapshotEntry:
+    def __init__(self, ref: SnapshotRef, payload: dict):
+        self.ref = ref
+        self.cursor = payload["cursor"]
+        self._bodies = {
+            (JSON_TYPE, None): serialize(payload, JSON_TYPE),
+            (MSGPACK_TYPES[0], None): serialize(payload, MSGPACK_TYPES[0])
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self._bodies.values())
+
+    def cached_body(self, media_type: str, encoding: Optional[str]) -> Optional[bytes]:
+        return self._bodies.get((media_type, encoding))
+
+    def body(self, media_type: str, encoding: Optional[str]) -> bytes:
+        with self._lock:
+            body = self._bodies.get((media_type, encoding))
+            if body is None:
+                body = self._bodies[(media_type, encoding)] = compress(self._bodies[(media_type, None)], encoding)
+            return body
+
+
+class SnapshotCache:
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: OrderedDict = OrderedDict()
+        self._pending: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+
+    def get(self, ref: SnapshotRef) -> Optional[SnapshotEntry]:
+        entry = self._entries.get(ref.sklad_id)
+        if entry is None or entry.ref != ref:
+            return None
+        self._entries.move_to_end(ref.sklad_id)
+        return entry
+
+    async def get_or_build(self, ref: SnapshotRef, build: Callable[[], Awaitable[dict]]) -> SnapshotEntry:
+        entry = self.get(ref)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        pending = self._pending.get(ref)
+        if pending is None:
+            pending = asyncio.ensure_future(self._build(ref, build))
+            self._pending[ref] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(ref, None))
+        return await asyncio.shield(pending)
+
+    async def _build(self, ref: SnapshotRef, build: Callable[[], Awaitable[dict]]) -> SnapshotEntry:
+        payload = await build()
+        entry = await run_in_threadpool(SnapshotEntry, ref, payload)
+        self.builds += 1
+        current = self._entries.get(ref.sklad_id)
+        if current is None or current.ref.version <= ref.version:
+            self._entries[ref.sklad_id] = entry
+            self._entries.move_to_end(ref.sklad_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
+
+    async def body(self, entry: SnapshotEntry, media_type: str, encoding: Optional[str]) -> bytes:
+        body = entry.cached_body(media_type, encoding)
+        if body is None:
+            body = await run_in_threadpool(entry.body, media_type, encoding)
+        return body
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "bytes": sum(entry.size for entry in self._entries.values()),
+            "building": len(self._pending),
+            "hits": self.hits,
+            "misses": self.misses,
+            "builds": self.builds
+        }
+
+
+snapshot_cache = SnapshotCache(SNAPSHOT_CACHE_SIZE)
@@ -0,0 +1,301 @@
+import asyncio
+import os
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, func, literal, union_all, text, desc, case, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from uuid import UUID
+
+from app.core.core import engine
+from app.models.nomen import Nomenclature
+from app.models.orga import Orga
+from app.models.stock_oper import (StockOperation, OperationType, StockMovementRollup, StockRollupWatermark,
+                                   TurnoverRow, TurnoverResponse, TopMover, TopMoversResponse)
+from app.services.stock_history import STOCK_CHECKPOINT_LAG_SECONDS, OUTBOUND, INBOUND, utc_naive
+
+STOCK_ROLLUP_POLL_SECONDS = int(os.getenv("STOCK_ROLLUP_POLL_SECONDS", "3600"))
+ANALYTICS_MAX_ROWS = int(os.getenv("ANALYTICS_MAX_ROWS", "50000"))
+ROLLUP_CHUNK_DAYS = 31
+LOCK_KEY = 727_004
+
+
+def _floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil_day(value: datetime) -> datetime:
+    floor = _floor_day(value)
+    return floor if floor == value else floor + timedelta(days=1)
+
+
+def _operations(rows, per_sklad: bool):
+    if per_sklad:
+        return func.sum(rows.c.operations + rows.c.transfers_in)
+    return func.sum(rows.c.operations)
+
+
+def journal_legs(organization_id: UUID, since: Optional[datetime], until: Optional[datetime]):
+    window = [StockOperation.organization_id == organization_id]
+    if since is not None:
+        window.append(StockOperation.created_at >= since)
+    if until is not None:
+        window.append(StockOperation.created_at < until)
+    outbound = select(
+        StockOperation.created_at.label("moment"),
+        StockOperation.operation_type.label("operation_type"),
+        StockOperation.from_sklad_id.label("sklad_id"),
+        StockOperation.nomenclature_id.label("nomenclature_id"),
+        literal(0).label("quantity_in"),
+        StockOperation.quantity.label("quantity_out"),
+        literal(1).label("operations"),
+        literal(0).label("transfers_in")
+    ).where(*window, StockOperation.operation_type.in_(OUTBOUND), StockOperation.from_sklad_id.isnot(None))
+    sklad_id = func.coalesce(StockOperation.to_sklad_id, StockOperation.from_sklad_id)
+    transfer = and_(StockOperation.operation_type == OperationType.TRANSFER, StockOperation.from_sklad_id.isnot(None))
+    inbound = select(
+        StockOperation.created_at.label("moment"),
+        StockOperation.operation_type.label("operation_type"),
+        sklad_id.label("sklad_id"),
+        StockOperation.nomenclature_id.label("nomenclature_id"),
+        func.greatest(StockOperation.quantity, 0).label("quantity_in"),
+        func.greatest(-StockOperation.quantity, 0).label("quantity_out"),
+        case((transfer, 0), else_=1).label("operations"),
+        case((transfer, 1), else_=0).label("transfers_in")
+    ).where(*window, StockOperation.operation_type.in_(INBOUND), sklad_id.isnot(None))
+    return [outbound, inbound]
+
+
+def rollup_rows(organization_id: UUID, since: datetime, until: datetime):
+    return select(
+        StockMovementRollup.day.label("moment"),
+        StockMovementRollup.operation_type.label("operation_type"),
+        StockMovementRollup.sklad_id.label("sklad_id"),
+        StockMovementRollup.nomenclature_id.label("nomenclature_id"),
+        StockMovementRollup.quantity_in.label("quantity_in"),
+        StockMovementRollup.quantity_out.label("quantity_out"),
+        StockMovementRollup.operations.label("operations"),
+        StockMovementRollup.transfers_in.label("transfers_in")
+    ).where(
+        StockMovementRollup.organization_id == organization_id,
+        StockMovementRollup.day >= since,
+        StockMovementRollup.day < until
+    )
+
+
+class StockAnalyticsService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _rolled_until(self, organization_id: UUID) -> Optional[datetime]:
+        return self.db.query(StockRollupWatermark.rolled_until).filter(
+            StockRollupWatermark.organization_id == organization_id
+        ).scalar()
+
+    def _window(self, created_from: datetime, created_to: Optional[datetime]):
+        created_from = utc_naive(created_from)
+        created_to = utc_naive(created_to or datetime.now(timezone.utc))
+        if created_to <= created_from:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="created_to must be later than created_from"
+            )
+        return created_from, created_to
+
+    def _movements(self, organization_id: UUID, created_from: datetime, created_to: datetime, operation_type: Optional[OperationType],
+                   sklad_id: Optional[UUID], nomenclature_id: Optional[UUID]):
+        rolled_until = self._rolled_until(organization_id)
+        rollup_from = _ceil_day(created_from)
+        rollup_to = min(_floor_day(created_to), rolled_until) if rolled_until else rollup_from
+
+        if rollup_from < rollup_to:
+            parts = journal_legs(organization_id, created_from, rollup_from) + [rollup_rows(organization_id, rollup_from, rollup_to)] \
+                + journal_legs(organization_id, rollup_to, created_to)
+        else:
+            parts = journal_legs(organization_id, created_from, created_to)
+            rolled_until = None
+
+        rows = union_all(*parts).subquery("movements")
+        filters = []
+        if operation_type:
+            filters.append(rows.c.operation_type == operation_type)
+        if sklad_id:
+            filters.append(rows.c.sklad_id == sklad_id)
+        if nomenclature_id:
+            filters.append(rows.c.nomenclature_id == nomenclature_id)
+        return rows, filters, rolled_until
+
+    def turnover(self, organization_id: UUID, created_from: datetime, created_to: Optional[datetime] = None, granularity: str = "day",
+                 group_by: List[str] = (), operation_type: Optional[OperationType] = None, sklad_id: Optional[UUID] = None,
+                 nomenclature_id: Optional[UUID] = None) -> TurnoverResponse:
+        created_from, created_to = self._window(created_from, created_to)
+        rows, filters, rolled_until = self._movements(organization_id, created_from, created_to, operation_type, sklad_id, nomenclature_id)
+
+        period = func.date_trunc(granularity, rows.c.moment).label("period")
+        keys = [period, rows.c.operation_type]
+        if "sklad" in group_by:
+            keys.append(rows.c.sklad_id)
+        if "nomenclature" in group_by:
+            keys.append(rows.c.nomenclature_id)
+        query = select(
+            *keys,
+            func.sum(rows.c.quantity_in).label("quantity_in"),
+            func.sum(rows.c.quantity_out).label("quantity_out"),
+            _operations(rows, "sklad" in group_by or sklad_id is not None).label("operations")
+        ).where(*filters).group_by(*keys).order_by(*keys).limit(ANALYTICS_MAX_ROWS + 1)
+        result = self.db.execute(query).all()
+        if len(result) > ANALYTICS_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"More than {ANALYTICS_MAX_ROWS} rows; narrow the period, use a coarser granularity or fewer group_by dimensions"
+            )
+
+        return TurnoverResponse(
+            granularity=granularity,
+            created_from=created_from,
+            created_to=created_to,
+            rolled_until=rolled_until,
+            rows=[TurnoverRow(
+                period=row.period,
+                operation_type=row.operation_type.value,
+                sklad_id=row.sklad_id if "sklad" in group_by else None,
+                nomenclature_id=row.nomenclature_id if "nomenclature" in group_by else None,
+                quantity_in=row.quantity_in,
+                quantity_out=row.quantity_out,
+                operations=row.operations
+            ) for row in result]
+        )
+
+    def top_movers(self, organization_id: UUID, created_from: datetime, created_to: Optional[datetime] = None, by: str = "total", limit: int = 10,
+                   operation_type: Optional[OperationType] = None, sklad_id: Optional[UUID] = None) -> TopMoversResponse:
+        created_from, created_to = self._window(created_from, created_to)
+        rows, filters, _ = self._movements(organization_id, created_from, created_to, operation_type, sklad_id, None)
+
+        quantity_in = func.sum(rows.c.quantity_in)
+        quantity_out = func.sum(rows.c.quantity_out)
+        metric = {"in": quantity_in, "out": quantity_out, "total": quantity_in + quantity_out}[by]
+        totals = select(
+            rows.c.nomenclature_id,
+            quantity_in.label("quantity_in"),
+            quantity_out.label("quantity_out"),
+            _operations(rows, sklad_id is not None).label("operations"),
+            metric.label("metric")
+        ).where(*filters).group_by(rows.c.nomenclature_id).order_by(desc(metric), rows.c.nomenclature_id).limit(limit).subquery("totals")
+
+        result = self.db.execute(
+            select(totals, Nomenclature.name, Nomenclature.article)
+            .outerjoin(Nomenclature, Nomenclature.id == totals.c.nomenclature_id)
+            .order_by(desc(totals.c.metric), totals.c.nomenclature_id)
+        ).all()
+        return TopMoversResponse(
+            created_from=created_from,
+            created_to=created_to,
+            by=by,
+            items=[TopMover(
+                nomenclature_id=row.nomenclature_id,
+                name=row.name,
+                article=row.article,
+                quantity_in=row.quantity_in,
+                quantity_out=row.quantity_out,
+                operations=row.operations
+            ) for row in result]
+        )
+
+    def _roll(self, organization_id: UUID, since: Optional[datetime], until: datetime):
+        rows = union_all(*journal_legs(organization_id, since, until)).subquery("movements")
+        day = func.date_trunc("day", rows.c.moment)
+        source = select(
+            literal(organization_id).label("organization_id"),
+            day.label("day"),
+            rows.c.operation_type,
+            rows.c.sklad_id,
+            rows.c.nomenclature_id,
+            func.sum(rows.c.quantity_in),
+            func.sum(rows.c.quantity_out),
+            func.sum(rows.c.operations),
+            func.sum(rows.c.transfers_in)
+        ).group_by(day, rows.c.operation_type, rows.c.sklad_id, rows.c.nomenclature_id)
+        stmt = pg_insert(StockMovementRollup).from_select(
+            ["organization_id", "day", "operation_type", "sklad_id", "nomenclature_id", "quantity_in", "quantity_out", "operations", "transfers_in"],
+            source
+        )
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[StockMovementRollup.organization_id, StockMovementRollup.day, StockMovementRollup.operation_type,
+                            StockMovementRollup.sklad_id, StockMovementRollup.nomenclature_id],
+            set_={
+                "quantity_in": StockMovementRollup.quantity_in + stmt.excluded.quantity_in,
+                "quantity_out": StockMovementRollup.quantity_out + stmt.excluded.quantity_out,
+                "operations": StockMovementRollup.operations + stmt.excluded.operations,
+                "transfers_in": StockMovementRollup.transfers_in + stmt.excluded.transfers_in
+            }
+        ))
+        watermark = pg_insert(StockRollupWatermark).values(organization_id=organization_id, rolled_until=until)
+        self.db.execute(watermark.on_conflict_do_update(
+            index_elements=[StockRollupWatermark.organization_id],
+            set_={"rolled_until": watermark.excluded.rolled_until, "updated_at": text("TIMEZONE('utc', now())")}
+        ))
+
+    def roll_organization(self, organization_id: UUID, horizon: datetime) -> int:
+        since = self._rolled_until(organization_id)
+        if since is None:
+            first = self.db.query(func.min(StockOperation.created_at)).filter(
+                StockOperation.organization_id == organization_id,
+                StockOperation.created_at < horizon
+            ).scalar()
+            if first is None:
+                return 0
+            since = _floor_day(first)
+
+        rolled = 0
+        while since < horizon:
+            until = min(since + timedelta(days=ROLLUP_CHUNK_DAYS), horizon)
+            self._roll(organization_id, since, until)
+            self.db.commit()
+            since = until
+            rolled += 1
+        return rolled
+
+    def roll_up(self, now: Optional[datetime] = None) -> int:
+        now = utc_naive(now or datetime.now(timezone.utc))
+        horizon = _floor_day(now - timedelta(seconds=STOCK_CHECKPOINT_LAG_SECONDS))
+        organizations = self.db.execute(select(Orga.id).order_by(Orga.id)).scalars().all()
+        self.db.commit()
+        return sum(self.roll_organization(organization_id, horizon) for organization_id in organizations)
+
+
+def run_rollups(bind: Engine = engine) -> int:
+    with bind.connect() as conn:
+        locked = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LOCK_KEY}).scalar()
+        conn.commit()
+        if not locked:
+            return 0
+        try:
+            with Session(bind=conn) as db:
+                return StockAnalyticsService(db).roll_up()
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+            conn.commit()
+
+
+async def rollup_loop():
+    while True:
+        try:
+            await run_in_threadpool(run_rollups)
+        except Exception:
+            traceback.print_exc()
+        await asyncio.sleep(STOCK_ROLLUP_POLL_SECONDS)
+
+
+def main():
+    rolled = run_rollups()
+    print(f"rolled {rolled} organization-months" if rolled else "up to date")
+
+
+if __name__ == "__main__":
+    main()
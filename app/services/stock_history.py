@@ -0,0 +1,199 @@
+import asyncio
+import os
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, insert, func, literal, union_all, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.core import engine
+from app.models.stock_oper import (StockOperation, OperationType, StockCheckpoint, StockCheckpointLine, StockJournalArchive,
+                                   StockBalanceLine, SkladBalanceTotal, StockBalanceAtResponse)
+from app.models.sklads import Sklads
+from app.models.orga import Orga
+
+STOCK_CHECKPOINT_LAG_SECONDS = int(os.getenv("STOCK_CHECKPOINT_LAG_SECONDS", "300"))
+STOCK_CHECKPOINT_MIN_OPERATIONS = int(os.getenv("STOCK_CHECKPOINT_MIN_OPERATIONS", "50000"))
+STOCK_CHECKPOINT_POLL_SECONDS = int(os.getenv("STOCK_CHECKPOINT_POLL_SECONDS", "3600"))
+LOCK_KEY = 727_002
+
+OUTBOUND = (OperationType.TRANSFER, OperationType.SALE, OperationType.DISPOSAL)
+INBOUND = (OperationType.TRANSFER, OperationType.RECEIPT, OperationType.RETURN, OperationType.ADJUSTMENT)
+
+
+def utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def movements(organization_id: UUID, since: Optional[datetime], until: datetime, inclusive: bool = False):
+    window = [StockOperation.organization_id == organization_id,
+              StockOperation.created_at <= until if inclusive else StockOperation.created_at < until]
+    if since is not None:
+        window.append(StockOperation.created_at >= since)
+    outbound = select(
+        StockOperation.from_sklad_id.label("sklad_id"),
+        StockOperation.nomenclature_id.label("nomenclature_id"),
+        (-StockOperation.quantity).label("quantity")
+    ).where(*window, StockOperation.operation_type.in_(OUTBOUND))
+    inbound = select(
+        func.coalesce(StockOperation.to_sklad_id, StockOperation.from_sklad_id).label("sklad_id"),
+        StockOperation.nomenclature_id.label("nomenclature_id"),
+        StockOperation.quantity.label("quantity")
+    ).where(*window, StockOperation.operation_type.in_(INBOUND))
+    return union_all(outbound, inbound)
+
+
+def _checkpoint_lines(checkpoint_id: UUID):
+    return select(
+        StockCheckpointLine.sklad_id.label("sklad_id"),
+        StockCheckpointLine.nomenclature_id.label("nomenclature_id"),
+        StockCheckpointLine.quantity.label("quantity")
+    ).where(StockCheckpointLine.checkpoint_id == checkpoint_id)
+
+
+def balances(checkpoint: Optional[StockCheckpoint], journal, sklad_id: Optional[UUID] = None):
+    parts = union_all(_checkpoint_lines(checkpoint.id), journal) if checkpoint else journal
+    rows = parts.subquery("movements")
+    query = select(
+        rows.c.sklad_id, rows.c.nomenclature_id, func.sum(rows.c.quantity).label("quantity")
+    ).where(rows.c.sklad_id.isnot(None))
+    if sklad_id:
+        query = query.where(rows.c.sklad_id == sklad_id)
+    return query.group_by(rows.c.sklad_id, rows.c.nomenclature_id).having(func.sum(rows.c.quantity) != 0)
+
+
+def checkpoint_boundaries(daily_counts, horizon: datetime, threshold: int) -> list:
+    boundaries = []
+    pending = 0
+    for day, count in daily_counts:
+        boundary = day + timedelta(days=1)
+        if boundary > horizon:
+            break
+        pending += count
+        month_start = boundary.day == 1
+        if pending and (pending >= threshold or month_start):
+            boundaries.append(boundary)
+            pending = 0
+    return boundaries
+
+
+class StockHistoryService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _latest_checkpoint(self, organization_id: UUID, at: datetime) -> Optional[StockCheckpoint]:
+        return self.db.query(StockCheckpoint).filter(
+            StockCheckpoint.organization_id == organization_id,
+            StockCheckpoint.taken_at <= at
+        ).order_by(StockCheckpoint.taken_at.desc()).first()
+
+    def balance_at(self, organization_id: UUID, at: datetime, sklad_id: Optional[UUID] = None) -> StockBalanceAtResponse:
+        if sklad_id:
+            sklad = self.db.query(Sklads.id).filter(
+                Sklads.id == sklad_id,
+                Sklads.organization_id == organization_id
+            ).first()
+            if not sklad:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Warehouse not found or does not belong to your organization"
+                )
+
+        moment = utc_naive(at)
+        archived_until = self.db.query(func.max(StockJournalArchive.range_to)).scalar()
+        if archived_until and moment < archived_until:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail=f"Stock journal before {archived_until.isoformat()} is archived"
+            )
+        checkpoint = self._latest_checkpoint(organization_id, moment)
+        journal = movements(organization_id, checkpoint.taken_at if checkpoint else None, moment, inclusive=True)
+        rows = self.db.execute(balances(checkpoint, journal, sklad_id).order_by("sklad_id", "nomenclature_id")).all()
+
+        items = [StockBalanceLine(sklad_id=row.sklad_id, nomenclature_id=row.nomenclature_id, quantity=row.quantity) for row in rows]
+        totals = {}
+        for item in items:
+            totals[item.sklad_id] = totals.get(item.sklad_id, 0) + item.quantity
+        return StockBalanceAtResponse(
+            at=moment,
+            checkpoint_at=checkpoint.taken_at if checkpoint else None,
+            sklads=[SkladBalanceTotal(sklad_id=key, quantity=value) for key, value in totals.items()],
+            items=items
+        )
+
+    def _write_checkpoint(self, organization_id: UUID, previous: Optional[StockCheckpoint], boundary: datetime) -> StockCheckpoint:
+        checkpoint = StockCheckpoint(id=uuid4(), organization_id=organization_id, taken_at=boundary)
+        self.db.add(checkpoint)
+        self.db.flush()
+        journal = movements(organization_id, previous.taken_at if previous else None, boundary)
+        source = balances(previous, journal).subquery("balances")
+        self.db.execute(insert(StockCheckpointLine).from_select(
+            ["checkpoint_id", "sklad_id", "nomenclature_id", "quantity"],
+            select(literal(checkpoint.id), source.c.sklad_id, source.c.nomenclature_id, source.c.quantity)
+        ))
+        return checkpoint
+
+    def checkpoint_organization(self, organization_id: UUID, horizon: datetime, threshold: int = STOCK_CHECKPOINT_MIN_OPERATIONS) -> int:
+        previous = self._latest_checkpoint(organization_id, horizon)
+        day = func.date_trunc("day", StockOperation.created_at)
+        query = select(day, func.count()).where(
+            StockOperation.organization_id == organization_id,
+            StockOperation.created_at < horizon
+        )
+        if previous:
+            query = query.where(StockOperation.created_at >= previous.taken_at)
+        daily_counts = self.db.execute(query.group_by(day).order_by(day)).all()
+
+        written = 0
+        for boundary in checkpoint_boundaries(daily_counts, horizon, threshold):
+            previous = self._write_checkpoint(organization_id, previous, boundary)
+            self.db.commit()
+            written += 1
+        return written
+
+    def take_checkpoints(self, now: Optional[datetime] = None, threshold: int = STOCK_CHECKPOINT_MIN_OPERATIONS) -> int:
+        now = utc_naive(now or datetime.now(timezone.utc))
+        horizon = (now - timedelta(seconds=STOCK_CHECKPOINT_LAG_SECONDS)).replace(hour=0, minute=0, second=0, microsecond=0)
+        organizations = self.db.execute(select(Orga.id).order_by(Orga.id)).scalars().all()
+        self.db.commit()
+        return sum(self.checkpoint_organization(organization_id, horizon, threshold) for organization_id in organizations)
+
+
+def run_checkpoints(bind: Engine = engine) -> int:
+    with bind.connect() as conn:
+        locked = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LOCK_KEY}).scalar()
+        conn.commit()
+        if not locked:
+            return 0
+        try:
+            with Session(bind=conn) as db:
+                return StockHistoryService(db).take_checkpoints()
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+            conn.commit()
+
+
+async def checkpoint_loop():
+    while True:
+        try:
+            await run_in_threadpool(run_checkpoints)
+        except Exception:
+            traceback.print_exc()
+        await asyncio.sleep(STOCK_CHECKPOINT_POLL_SECONDS)
+
+
+def main():
+    written = run_checkpoints()
+    print(f"written {written} checkpoints" if written else "up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import asyncio
+import gzip
+import os
+import re
+import traceback
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from starlette.concurrency import run_in_threadpool
+
+from app.core.core import engine
+from app.services.stock_history import run_checkpoints
+from app.services.stock_analytics import run_rollups
+
+STOCK_PARTITION_AHEAD_MONTHS = int(os.getenv("STOCK_PARTITION_AHEAD_MONTHS", "3"))
+STOCK_RETENTION_MONTHS = int(os.getenv("STOCK_RETENTION_MONTHS", "0"))
+STOCK_ARCHIVE_DIR = Path(os.getenv("STOCK_ARCHIVE_DIR", "var/backups/stockk"))
+STOCK_PARTITION_POLL_SECONDS = int(os.getenv("STOCK_PARTITION_POLL_SECONDS", "3600"))
+LOCK_KEY = 727_003
+
+PARTITION_NAME = re.compile(r"^stockk_(\d{4})_(\d{2})$")
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"stockk_{month:%Y_%m}"
+
+
+def partitions(conn: Connection) -> List[Tuple[str, datetime]]:
+    names = conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'stockk'::regclass
+    """)).scalars().all()
+    months = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append((name, datetime(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(months, key=lambda item: item[1])
+
+
+def ensure_partitions(conn: Connection, now: datetime, ahead: int = STOCK_PARTITION_AHEAD_MONTHS, since: Optional[datetime] = None) -> List[str]:
+    existing = {name for name, _ in partitions(conn)}
+    created = []
+    lower = month_start(min(since, now) if since else now)
+    last = add_months(month_start(now), ahead)
+    while lower <= last:
+        name = partition_name(lower)
+        if name not in existing:
+            conn.exec_driver_sql(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF stockk "
+                f"FOR VALUES FROM ('{lower:%Y-%m-%d}') TO ('{add_months(lower, 1):%Y-%m-%d}')"
+            )
+            conn.commit()
+            created.append(name)
+        lower = add_months(lower, 1)
+    return created
+
+
+def uncovered_organizations(conn: Connection, name: str, upper: datetime) -> int:
+    return conn.execute(text(f"""
+        SELECT count(*) FROM (SELECT DISTINCT organization_id FROM {name}) o
+        WHERE NOT EXISTS (
+            SELECT 1 FROM stock_checkpoints c
+            WHERE c.organization_id = o.organization_id AND c.taken_at >= :upper
+        ) OR NOT EXISTS (
+            SELECT 1 FROM stock_rollup_watermarks w
+            WHERE w.organization_id = o.organization_id AND w.rolled_until >= :upper
+        )
+    """), {"upper": upper}).scalar()
+
+
+def fsync_directory(directory: Path):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def archive_partition(conn: Connection, name: str, lower: datetime, directory: Path = STOCK_ARCHIVE_DIR) -> Optional[Path]:
+    upper = add_months(lower, 1)
+    if uncovered_organizations(conn, name, upper):
+        conn.rollback()
+        return None
+
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.csv.gz"
+    partial = path.with_suffix(".gz.partial")
+    conn.exec_driver_sql(f"LOCK TABLE {name} IN SHARE MODE")
+    row_count = conn.exec_driver_sql(f"SELECT count(*) FROM {name}").scalar()
+    cursor = conn.connection.cursor()
+    try:
+        with open(partial, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+                cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+            raw.flush()
+            os.fsync(raw.fileno())
+    finally:
+        cursor.close()
+    os.replace(partial, path)
+    fsync_directory(directory)
+
+    conn.exec_driver_sql(f"ALTER TABLE stockk DETACH PARTITION {name}")
+    conn.exec_driver_sql(f"DROP TABLE {name}")
+    conn.execute(text("""
+        INSERT INTO stock_journal_archives (partition_name, range_from, range_to, path, row_count)
+        VALUES (:name, :lower, :upper, :path, :row_count)
+        ON CONFLICT (partition_name) DO UPDATE SET path = EXCLUDED.path, row_count = EXCLUDED.row_count, archived_at = TIMEZONE('utc', now())
+    """), {"name": name, "lower": lower, "upper": upper, "path": str(path), "row_count": row_count})
+    conn.commit()
+    return path
+
+
+def archive_partitions(conn: Connection, now: datetime, retention: int = STOCK_RETENTION_MONTHS) -> Tuple[List[Path], List[str]]:
+    if retention <= 0:
+        return [], []
+    cutoff = add_months(month_start(now), -retention)
+    archived, skipped = [], []
+    for name, lower in partitions(conn):
+        if add_months(lower, 1) > cutoff:
+            break
+        path = archive_partition(conn, name, lower)
+        if path:
+            archived.append(path)
+        else:
+            skipped.append(name)
+    return archived, skipped
+
+
+def run_maintenance(bind: Engine = engine, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    if STOCK_RETENTION_MONTHS > 0:
+        run_checkpoints(bind)
+        run_rollups(bind)
+    with bind.connect() as conn:
+        locked = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LOCK_KEY}).scalar()
+        conn.commit()
+        if not locked:
+            return {"created": [], "archived": [], "skipped": []}
+        conn.exec_driver_sql("SET statement_timeout = 0")
+        conn.commit()
+        try:
+            created = ensure_partitions(conn, now)
+            archived, skipped = archive_partitions(conn, now)
+            return {"created": created, "archived": archived, "skipped": skipped}
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql("RESET statement_timeout")
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+            conn.commit()
+
+
+async def partition_loop():
+    while True:
+        try:
+            await run_in_threadpool(run_maintenance)
+        except Exception:
+            traceback.print_exc()
+        await asyncio.sleep(STOCK_PARTITION_POLL_SECONDS)
+
+
+def main():
+    result = run_maintenance()
+    for name in result["created"]:
+        print(f"created {name}")
+    for path in result["archived"]:
+        print(f"archived {path}")
+    for name in result["skipped"]:
+        print(f"skipped {name}: organizations without a checkpoint or rollup after this month")
+    if not any(result.values()):
+        print("up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,63 @@
+import os
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import insert, update, tuple_, text, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from fastapi import HTTPException, status
-from typing import List
+from collections import Counter
+from typing import List, Dict, Set, Tuple
 from uuid import UUID
 
 from app.models.stock_oper import StockOperation, OperationType, StockOperationCreate, StockOperationResponse
-from app.models.nomen import Stock, Nomenclature
+from app.models.nomen import Stock, Nomenclature, StockBalance, StockBalanceResponse, StockLineBalanceResponse, OrganizationBalanceResponse
 from app.models.sklads import Sklads
 from app.models.auth import User
+from app.utils.pagination import Keyset, Page, paginate
+from app.services.stock_history import utc_naive
 from typing import Optional
+from datetime import datetime
+
+STOCK_BALANCE_SHARDS = max(1, int(os.getenv("STOCK_BALANCE_SHARDS", "16")))
+
+OPERATIONS_KEYSET = Keyset("operations", StockOperation.created_at, StockOperation.id, descending=True)
+
+def apply_stock_deltas(db: Session, organization_id: UUID, deltas: Dict[Tuple[UUID, UUID], int], reserved: Optional[Dict[Tuple[UUID, UUID], int]] = None):
+    quantity_by_shard, reserved_by_shard = Counter(), Counter()
+    for (sklad_id, nomenclature_id), delta in deltas.items():
+        quantity_by_shard[(sklad_id, nomenclature_id.int % STOCK_BALANCE_SHARDS)] += delta
+    for (sklad_id, nomenclature_id), delta in (reserved or {}).items():
+        reserved_by_shard[(sklad_id, nomenclature_id.int % STOCK_BALANCE_SHARDS)] += delta
+    rows = [
+        {"sklad_id": sklad_id, "shard": shard, "organization_id": organization_id,
+         "quantity": quantity_by_shard[(sklad_id, shard)], "reserved": reserved_by_shard[(sklad_id, shard)]}
+        for sklad_id, shard in sorted(set(quantity_by_shard) | set(reserved_by_shard), key=lambda key: (str(key[0]), key[1]))
+        if sklad_id and (quantity_by_shard[(sklad_id, shard)] or reserved_by_shard[(sklad_id, shard)])
+    ]
+    if not rows:
+        return
+    stmt = pg_insert(StockBalance).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[StockBalance.sklad_id, StockBalance.shard],
+        set_={
+            "quantity": StockBalance.quantity + stmt.excluded.quantity,
+            "reserved": StockBalance.reserved + stmt.excluded.reserved,
+            "updated_at": text("TIMEZONE('utc', now())")
+        }
+    ))
+
+
+def journal_adjustment(db: Session, organization_id: UUID, nomenclature_id: UUID, sklad_id: UUID, delta: int, user_id: Optional[UUID], source: str):
+    if not delta:
+        return
+    db.add(StockOperation(
+        organization_id=organization_id,
+        operation_type=OperationType.ADJUSTMENT,
+        to_sklad_id=sklad_id,
+        nomenclature_id=nomenclature_id,
+        quantity=delta,
+        performed_by=user_id,
+        operation_metadata={"source": source}
+    ))
 
 
 class StockOperationService:
@@ -51,36 +100,73 @@ class StockOperationService:
             )
         return nomen
 
-    def _get_or_create_stock(self, nomenclature_id: UUID, sklad_id: UUID) -> Stock:
-        stock = self.db.query(Stock).filter(
+    def _available_quantity(self, nomenclature_id: UUID, sklad_id: UUID) -> int:
+        available = self.db.query(Stock.quantity).filter(
             Stock.nomenclature_id == nomenclature_id,
             Stock.sklad_id == sklad_id
-        ).first()
-        
-        if not stock:
-            stock = Stock(
-                nomenclature_id=nomenclature_id,
-                sklad_id=sklad_id,
-                quantity=0,
-                reserved=0
+        ).scalar()
+        return available or 0
+
+    def _take_stock(self, nomenclature_id: UUID, sklad_id: UUID, quantity: int) -> int:
+        remaining = self.db.execute(
+            update(Stock)
+            .where(
+                Stock.nomenclature_id == nomenclature_id,
+                Stock.sklad_id == sklad_id,
+                Stock.quantity >= quantity
             )
-            self.db.add(stock)
-            self.db.flush()
-        
-        return stock
+            .values(quantity=Stock.quantity - quantity)
+            .returning(Stock.quantity)
+            .execution_options(synchronize_session=False)
+        ).scalar()
 
-    def _check_stock_availability(self, nomenclature_id: UUID, sklad_id: UUID, required_quantity: int):
-        stock = self.db.query(Stock).filter(
-            Stock.nomenclature_id == nomenclature_id,
-            Stock.sklad_id == sklad_id
-        ).first()
-        
-        if not stock or stock.quantity < required_quantity:
-            available = stock.quantity if stock else 0
+        if remaining is None:
+            available = self._available_quantity(nomenclature_id, sklad_id)
+            self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock. Available: {available}, Required: {required_quantity}"
+                detail=f"Insufficient stock. Available: {available}, Required: {quantity}"
             )
+        return remaining
+
+    def _put_stock(self, nomenclature_id: UUID, sklad_id: UUID, quantity: int) -> int:
+        stmt = pg_insert(Stock).values(
+            nomenclature_id=nomenclature_id,
+            sklad_id=sklad_id,
+            quantity=quantity,
+            reserved=0
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Stock.nomenclature_id, Stock.sklad_id],
+            set_={
+                "quantity": Stock.quantity + stmt.excluded.quantity,
+                "updated_at": text("TIMEZONE('utc', now())")
+            }
+        ).returning(Stock.quantity)
+        return self.db.execute(stmt).scalar()
+
+    def _adjust_stock(self, nomenclature_id: UUID, sklad_id: UUID, delta: int) -> int:
+        total = self.db.execute(
+            update(Stock)
+            .where(
+                Stock.nomenclature_id == nomenclature_id,
+                Stock.sklad_id == sklad_id,
+                Stock.quantity + delta >= 0
+            )
+            .values(quantity=Stock.quantity + delta)
+            .returning(Stock.quantity)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+
+        if total is None:
+            if delta < 0:
+                self.db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Stock quantity cannot be negative after adjustment"
+                )
+            total = self._put_stock(nomenclature_id, sklad_id, delta)
+        return total
 
     def create_operation(self, operation_data: StockOperationCreate, current_user: User) -> StockOperationResponse:
         organization_id = self._get_orga_id(current_user)
@@ -108,106 +194,166 @@ class StockOperationService:
                 detail="Unknown operation type"
             )
 
-    def _process_transfer(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
-        self._check_stock_availability(operation_data.nomenclature_id, operation_data.from_sklad_id, operation_data.quantity)
+    def create_operations_batch(self, operations: List[StockOperationCreate], current_user: User) -> List[StockOperationResponse]:
+        organization_id = self._get_orga_id(current_user)
+        self._validate_batch_refs(operations, organization_id)
 
-        from_stock = self._get_or_create_stock(operation_data.nomenclature_id, operation_data.from_sklad_id)
-        from_stock.quantity -= operation_data.quantity
+        pairs = set()
+        for operation_data in operations:
+            pairs.update(self._stock_pairs(operation_data))
+        stocks = self._lock_stocks(pairs)
 
-        to_stock = self._get_or_create_stock(operation_data.nomenclature_id, operation_data.to_sklad_id)
-        to_stock.quantity += operation_data.quantity
+        rows = []
+        deltas = Counter()
+        for index, operation_data in enumerate(operations):
+            self._apply_in_memory(operation_data, stocks, f"Operation {index}: ")
+            rows.append(self._operation_row(operation_data, organization_id, current_user.id))
+            deltas.update(self._stock_deltas(operation_data))
 
-        operation = StockOperation(
-            organization_id=organization_id,
-            operation_type=OperationType.TRANSFER,
-            from_sklad_id=operation_data.from_sklad_id,
-            to_sklad_id=operation_data.to_sklad_id,
-            nomenclature_id=operation_data.nomenclature_id,
-            quantity=operation_data.quantity,
-            performed_by=user_id,
-            comment=operation_data.comment,
-            operation_metadata=operation_data.operation_metadata or {}
-        )
-        
         try:
-            self.db.add(operation)
+            created = self.db.scalars(
+                insert(StockOperation).returning(StockOperation, sort_by_parameter_order=True),
+                rows
+            ).all()
+            result = [StockOperationResponse.from_orm(op) for op in created]
+            self.db.flush()
+            apply_stock_deltas(self.db, organization_id, deltas)
             self.db.commit()
-            self.db.refresh(operation)
         except IntegrityError:
             self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Error creating operation"
+                detail="Error creating operations"
             )
-        
-        return StockOperationResponse.from_orm(operation)
 
-    def _process_sale(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
-        self._check_stock_availability(operation_data.nomenclature_id, operation_data.from_sklad_id, operation_data.quantity)
+        return result
 
-        stock = self._get_or_create_stock(operation_data.nomenclature_id, operation_data.from_sklad_id)
-        stock.quantity -= operation_data.quantity
-        
+    def _validate_batch_refs(self, operations: List[StockOperationCreate], organization_id: UUID):
+        nomen_ids = {op.nomenclature_id for op in operations}
+        found_nomen = {row.id for row in self.db.query(Nomenclature.id).filter(
+            Nomenclature.id.in_(nomen_ids),
+            Nomenclature.organization_id == organization_id,
+            Nomenclature.is_deleted == False
+        )}
+        if found_nomen != nomen_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Nomenclature not found or does not belong to your organization: {', '.join(str(i) for i in nomen_ids - found_nomen)}"
+            )
 
-        operation = StockOperation(
-            organization_id=organization_id,
-            operation_type=OperationType.SALE,
-            from_sklad_id=operation_data.from_sklad_id,
-            to_sklad_id=None,
-            nomenclature_id=operation_data.nomenclature_id,
-            quantity=operation_data.quantity,
-            performed_by=user_id,
-            comment=operation_data.comment,
-            operation_metadata=operation_data.operation_metadata or {}
-        )
-        
-        try:
-            self.db.add(operation)
-            self.db.commit()
-            self.db.refresh(operation)
-        except IntegrityError:
-            self.db.rollback()
+        sklad_ids = {op.from_sklad_id for op in operations if op.from_sklad_id} | {op.to_sklad_id for op in operations if op.to_sklad_id}
+        if not sklad_ids:
+            return
+        found_sklads = {row.id for row in self.db.query(Sklads.id).filter(
+            Sklads.id.in_(sklad_ids),
+            Sklads.organization_id == organization_id,
+            Sklads.is_deleted == False
+        )}
+        if found_sklads != sklad_ids:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Error creating operation"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Warehouse not found or does not belong to your organization: {', '.join(str(i) for i in sklad_ids - found_sklads)}"
             )
-        
-        return StockOperationResponse.from_orm(operation)
 
-    def _process_disposal(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
-        self._check_stock_availability(
-            operation_data.nomenclature_id,
-            operation_data.from_sklad_id,
-            operation_data.quantity
-        )
+    def _stock_pairs(self, operation_data: StockOperationCreate) -> Set[Tuple[UUID, UUID]]:
+        if operation_data.operation_type == OperationType.ADJUSTMENT:
+            sklad_id = operation_data.to_sklad_id or operation_data.from_sklad_id
+            return {(operation_data.nomenclature_id, sklad_id)} if sklad_id else set()
+        pairs = set()
+        if operation_data.from_sklad_id and operation_data.operation_type in (OperationType.TRANSFER, OperationType.SALE, OperationType.DISPOSAL):
+            pairs.add((operation_data.nomenclature_id, operation_data.from_sklad_id))
+        if operation_data.to_sklad_id and operation_data.operation_type in (OperationType.TRANSFER, OperationType.RECEIPT, OperationType.RETURN):
+            pairs.add((operation_data.nomenclature_id, operation_data.to_sklad_id))
+        return pairs
 
-        stock = self._get_or_create_stock(operation_data.nomenclature_id, operation_data.from_sklad_id)
-        stock.quantity -= operation_data.quantity
+    def _stock_deltas(self, operation_data: StockOperationCreate) -> Counter:
+        deltas = Counter()
+        nomenclature_id = operation_data.nomenclature_id
+        if operation_data.operation_type == OperationType.ADJUSTMENT:
+            deltas[(operation_data.to_sklad_id or operation_data.from_sklad_id, nomenclature_id)] += operation_data.quantity
+            return deltas
+        if operation_data.operation_type in (OperationType.TRANSFER, OperationType.SALE, OperationType.DISPOSAL):
+            deltas[(operation_data.from_sklad_id, nomenclature_id)] -= operation_data.quantity
+        if operation_data.operation_type in (OperationType.TRANSFER, OperationType.RECEIPT, OperationType.RETURN):
+            deltas[(operation_data.to_sklad_id, nomenclature_id)] += operation_data.quantity
+        return deltas
 
-        operation = StockOperation(
-            organization_id=organization_id,
-            operation_type=OperationType.DISPOSAL,
-            from_sklad_id=operation_data.from_sklad_id,
-            to_sklad_id=None,
-            nomenclature_id=operation_data.nomenclature_id,
-            quantity=operation_data.quantity,
-            performed_by=user_id,
-            comment=operation_data.comment,
-            operation_metadata=operation_data.operation_metadata or {}
+    def _lock_stocks(self, pairs: Set[Tuple[UUID, UUID]]) -> Dict[Tuple[UUID, UUID], Stock]:
+        if not pairs:
+            return {}
+        ordered = sorted(pairs, key=lambda pair: (str(pair[1]), str(pair[0])))
+        self.db.execute(
+            pg_insert(Stock)
+            .values([
+                {"nomenclature_id": nomenclature_id, "sklad_id": sklad_id, "quantity": 0, "reserved": 0}
+                for nomenclature_id, sklad_id in ordered
+            ])
+            .on_conflict_do_nothing(index_elements=[Stock.nomenclature_id, Stock.sklad_id])
         )
-        
-        try:
-            self.db.add(operation)
-            self.db.commit()
-            self.db.refresh(operation)
-        except IntegrityError:
-            self.db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Error creating operation"
-            )
-        
-        return StockOperationResponse.from_orm(operation)
+
+        stocks = self.db.query(Stock).filter(
+            tuple_(Stock.nomenclature_id, Stock.sklad_id).in_(ordered)
+        ).order_by(Stock.sklad_id, Stock.nomenclature_id).with_for_update().all()
+        return {(stock.nomenclature_id, stock.sklad_id): stock for stock in stocks}
+
+    def _apply_in_memory(self, operation_data: StockOperationCreate, stocks: Dict[Tuple[UUID, UUID], Stock], prefix: str = ""):
+        op_type = operation_data.operation_type
+        quantity = operation_data.quantity
+
+        if op_type == OperationType.ADJUSTMENT:
+            sklad_id = operation_data.to_sklad_id or operation_data.from_sklad_id
+            if not sklad_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"{prefix}from_sklad_id or to_sklad_id is required for ADJUSTMENT"
+                )
+            stock = stocks[(operation_data.nomenclature_id, sklad_id)]
+            if stock.quantity + quantity < 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"{prefix}Stock quantity cannot be negative after adjustment"
+                )
+            stock.quantity += quantity
+            return
+
+        if op_type in (OperationType.TRANSFER, OperationType.SALE, OperationType.DISPOSAL):
+            from_stock = stocks[(operation_data.nomenclature_id, operation_data.from_sklad_id)]
+            if from_stock.quantity < quantity:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"{prefix}Insufficient stock. Available: {from_stock.quantity}, Required: {quantity}"
+                )
+            from_stock.quantity -= quantity
+
+        if op_type in (OperationType.TRANSFER, OperationType.RECEIPT, OperationType.RETURN):
+            stocks[(operation_data.nomenclature_id, operation_data.to_sklad_id)].quantity += quantity
+
+    def _operation_row(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> dict:
+        op_type = OperationType(operation_data.operation_type)
+        return {
+            "organization_id": organization_id,
+            "operation_type": op_type,
+            "from_sklad_id": None if op_type in (OperationType.RECEIPT, OperationType.RETURN) else operation_data.from_sklad_id,
+            "to_sklad_id": None if op_type in (OperationType.SALE, OperationType.DISPOSAL) else operation_data.to_sklad_id,
+            "nomenclature_id": operation_data.nomenclature_id,
+            "quantity": operation_data.quantity,
+            "performed_by": user_id,
+            "comment": operation_data.comment,
+            "operation_metadata": operation_data.operation_metadata or {}
+        }
+
+    def _process_transfer(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
+        stocks = self._lock_stocks(self._stock_pairs(operation_data))
+        self._apply_in_memory(operation_data, stocks)
+        return self._record_operation(operation_data, organization_id, user_id)
+
+    def _process_sale(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
+        self._take_stock(operation_data.nomenclature_id, operation_data.from_sklad_id, operation_data.quantity)
+        return self._record_operation(operation_data, organization_id, user_id)
+
+    def _process_disposal(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
+        self._take_stock(operation_data.nomenclature_id, operation_data.from_sklad_id, operation_data.quantity)
+        return self._record_operation(operation_data, organization_id, user_id)
 
     def _process_adjustment(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
         if not operation_data.from_sklad_id and not operation_data.to_sklad_id:
@@ -215,61 +361,26 @@ class StockOperationService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="from_sklad_id or to_sklad_id is required for ADJUSTMENT"
             )
-        
+
         sklad_id = operation_data.to_sklad_id or operation_data.from_sklad_id
-        stock = self._get_or_create_stock(operation_data.nomenclature_id, sklad_id)
+        self._adjust_stock(operation_data.nomenclature_id, sklad_id, operation_data.quantity)
+        return self._record_operation(operation_data, organization_id, user_id)
 
-        stock.quantity += operation_data.quantity
-        
-        if stock.quantity < 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Stock quantity cannot be negative after adjustment"
-            )
+    def _process_receipt(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
+        self._put_stock(operation_data.nomenclature_id, operation_data.to_sklad_id, operation_data.quantity)
+        return self._record_operation(operation_data, organization_id, user_id)
 
-        operation = StockOperation(
-            organization_id=organization_id,
-            operation_type=OperationType.ADJUSTMENT,
-            from_sklad_id=operation_data.from_sklad_id,
-            to_sklad_id=operation_data.to_sklad_id,
-            nomenclature_id=operation_data.nomenclature_id,
-            quantity=operation_data.quantity,
-            performed_by=user_id,
-            comment=operation_data.comment,
-            operation_metadata=operation_data.operation_metadata or {}
-        )
-        
-        try:
-            self.db.add(operation)
-            self.db.commit()
-            self.db.refresh(operation)
-        except IntegrityError:
-            self.db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Error creating operation"
-            )
-        
-        return StockOperationResponse.from_orm(operation)
+    def _process_return(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
+        self._put_stock(operation_data.nomenclature_id, operation_data.to_sklad_id, operation_data.quantity)
+        return self._record_operation(operation_data, organization_id, user_id)
 
-    def _process_receipt(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
-        stock = self._get_or_create_stock(operation_data.nomenclature_id, operation_data.to_sklad_id)
-        stock.quantity += operation_data.quantity
+    def _record_operation(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
+        operation = StockOperation(**self._operation_row(operation_data, organization_id, user_id))
 
-        operation = StockOperation(
-            organization_id=organization_id,
-            operation_type=OperationType.RECEIPT,
-            from_sklad_id=None,
-            to_sklad_id=operation_data.to_sklad_id,
-            nomenclature_id=operation_data.nomenclature_id,
-            quantity=operation_data.quantity,
-            performed_by=user_id,
-            comment=operation_data.comment,
-            operation_metadata=operation_data.operation_metadata or {}
-        )
-        
         try:
             self.db.add(operation)
+            self.db.flush()
+            apply_stock_deltas(self.db, organization_id, self._stock_deltas(operation_data))
             self.db.commit()
             self.db.refresh(operation)
         except IntegrityError:
@@ -278,40 +389,18 @@ class StockOperationService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Error creating operation"
             )
-        
-        return StockOperationResponse.from_orm(operation)
 
-    def _process_return(self, operation_data: StockOperationCreate, organization_id: UUID, user_id: UUID) -> StockOperationResponse:
-        stock = self._get_or_create_stock(operation_data.nomenclature_id, operation_data.to_sklad_id)
-        stock.quantity += operation_data.quantity
-        operation = StockOperation(
-            organization_id=organization_id,
-            operation_type=OperationType.RETURN,
-            from_sklad_id=None,
-            to_sklad_id=operation_data.to_sklad_id,
-            nomenclature_id=operation_data.nomenclature_id,
-            quantity=operation_data.quantity,
-            performed_by=user_id,
-            comment=operation_data.comment,
-            operation_metadata=operation_data.operation_metadata or {}
-        )
-        
-        try:
-            self.db.add(operation)
-            self.db.commit()
-            self.db.refresh(operation)
-        except IntegrityError:
-            self.db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Error creating operation"
-            )
-        
         return StockOperationResponse.from_orm(operation)
 
     def get_operations(self, organization_id: UUID, skip: int = 0, limit: int = 100, operation_type: Optional[OperationType] = None, nomenclature_id: Optional[UUID] = None,
-        sklad_id: Optional[UUID] = None) -> List[StockOperationResponse]:
+        sklad_id: Optional[UUID] = None, cursor: Optional[str] = None, created_from: Optional[datetime] = None, created_to: Optional[datetime] = None) -> Page:
         query = self.db.query(StockOperation).filter(StockOperation.organization_id == organization_id)
+
+        if created_from:
+            query = query.filter(StockOperation.created_at >= utc_naive(created_from))
+
+        if created_to:
+            query = query.filter(StockOperation.created_at < utc_naive(created_to))
         
         if operation_type:
             query = query.filter(StockOperation.operation_type == operation_type)
@@ -325,8 +414,8 @@ class StockOperationService:
                 (StockOperation.to_sklad_id == sklad_id)
             )
         
-        operations = query.order_by(StockOperation.created_at.desc()).offset(skip).limit(limit).all()
-        return [StockOperationResponse.from_orm(op) for op in operations]
+        page = paginate(query, OPERATIONS_KEYSET, limit, cursor, skip)
+        return Page([StockOperationResponse.from_orm(op) for op in page.items], page.next_cursor)
 
     def get_operation_by_id(self, operation_id: UUID, organization_id: UUID) -> StockOperationResponse:
         operation = self.db.query(StockOperation).filter(
@@ -342,3 +431,46 @@ class StockOperationService:
         
         return StockOperationResponse.from_orm(operation)
 
+    def _balance_totals(self):
+        return self.db.query(
+            StockBalance.sklad_id,
+            func.sum(StockBalance.quantity).label("quantity"),
+            func.sum(StockBalance.reserved).label("reserved"),
+            func.max(StockBalance.updated_at).label("updated_at")
+        ).group_by(StockBalance.sklad_id)
+
+    def _balance_response(self, balance) -> StockBalanceResponse:
+        return StockBalanceResponse(sklad_id=balance.sklad_id, quantity=balance.quantity, reserved=balance.reserved,
+                                    available=balance.quantity - balance.reserved, updated_at=balance.updated_at)
+
+    def get_sklad_balance(self, sklad_id: UUID, organization_id: UUID) -> StockBalanceResponse:
+        self._validate_sklad_belongs_to_org(sklad_id, organization_id)
+        balance = self._balance_totals().filter(StockBalance.sklad_id == sklad_id).first()
+        if not balance:
+            return StockBalanceResponse(sklad_id=sklad_id, quantity=0, reserved=0, available=0, updated_at=None)
+        return self._balance_response(balance)
+
+    def get_line_balance(self, sklad_id: UUID, nomenclature_id: UUID, organization_id: UUID) -> StockLineBalanceResponse:
+        self._validate_sklad_belongs_to_org(sklad_id, organization_id)
+        self._validate_nomen(nomenclature_id, organization_id)
+        stock = self.db.query(Stock).filter(
+            Stock.nomenclature_id == nomenclature_id,
+            Stock.sklad_id == sklad_id
+        ).first()
+        if not stock:
+            return StockLineBalanceResponse(sklad_id=sklad_id, nomenclature_id=nomenclature_id, quantity=0, reserved=0, available=0, updated_at=None)
+        return StockLineBalanceResponse.from_orm(stock)
+
+    def get_organization_balance(self, organization_id: UUID) -> OrganizationBalanceResponse:
+        balances = self._balance_totals().join(Sklads, Sklads.id == StockBalance.sklad_id).filter(
+            StockBalance.organization_id == organization_id,
+            Sklads.is_deleted == False
+        ).all()
+        sklads = [self._balance_response(balance) for balance in balances]
+        return OrganizationBalanceResponse(
+            organization_id=organization_id,
+            quantity=sum(balance.quantity for balance in sklads),
+            reserved=sum(balance.reserved for balance in sklads),
+            available=sum(balance.available for balance in sklads),
+            sklads=sklads
+        )
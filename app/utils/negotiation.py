@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import json
+from typing import Optional
+
+import msgpack
+import zstandard
+from fastapi import Request, Response
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def _accepted(header: str) -> dict:
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def pick_media_type(request: Request) -> str:
+    accepted = _accepted(request.headers.get("accept", ""))
+    msgpack_q = max((accepted.get(t, 0.0) for t in MSGPACK_TYPES), default=0.0)
+    json_q = max(accepted.get(JSON_TYPE, 0.0), accepted.get("*/*", 0.0), accepted.get("application/*", 0.0))
+    return MSGPACK_TYPES[0] if msgpack_q > 0 and msgpack_q >= json_q else JSON_TYPE
+
+
+def pick_encoding(request: Request) -> Optional[str]:
+    accepted = _accepted(request.headers.get("accept-encoding", ""))
+    wildcard = accepted.get("*", 0.0)
+    q, encoding = max(((accepted.get(name, wildcard), name) for name in ("zstd", "gzip")), key=lambda c: c[0])
+    return encoding if q > 0 else None
+
+
+def serialize(payload, media_type: str) -> bytes:
+    if media_type == JSON_TYPE:
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()) == opaque for tag in header.split(","))
+
+
+def negotiate(request: Request, etag: Optional[str] = None, headers: Optional[dict] = None) -> tuple:
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept, Accept-Encoding"
+    if etag:
+        headers["ETag"] = etag
+    return pick_media_type(request), pick_encoding(request), headers
+
+
+def encoded_response(body: bytes, media_type: str, encoding: Optional[str], headers: dict) -> Response:
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def negotiated_response(request: Request, payload, etag: Optional[str] = None, headers: Optional[dict] = None) -> Response:
+    media_type, encoding, headers = negotiate(request, etag, headers)
+    if etag and etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return encoded_response(compress(serialize(payload, media_type), encoding), media_type, encoding, headers)
@@ -0,0 +1,70 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class Page:
+    items: list
+    next_cursor: Optional[str] = None
+
+    def to_response(self, response: Response) -> list:
+        if self.next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = self.next_cursor
+        return self.items
+
+
+def _decoder(column):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat
+    if python_type is UUID:
+        return UUID
+    return python_type
+
+
+class Keyset:
+    def __init__(self, name: str, *columns, descending: bool = False):
+        self.name = name
+        self.columns = columns
+        self.descending = descending
+        self._decoders = [_decoder(column) for column in columns]
+
+    def order_by(self) -> list:
+        return [column.desc() if self.descending else column.asc() for column in self.columns]
+
+    def after(self, values: tuple):
+        key, bound = tuple_(*self.columns), tuple_(*values)
+        return key < bound if self.descending else key > bound
+
+    def encode(self, item) -> str:
+        values = [getattr(item, column.key) for column in self.columns]
+        payload = json.dumps({"k": self.name, "v": [value.isoformat() if isinstance(value, datetime) else str(value) for value in values]})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode(self, cursor: str) -> tuple:
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if payload["k"] != self.name or len(payload["v"]) != len(self.columns):
+                raise ValueError(cursor)
+            return tuple(decode(value) for decode, value in zip(self._decoders, payload["v"]))
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+
+
+def paginate(query, keyset: Keyset, limit: int, cursor: Optional[str] = None, skip: int = 0) -> Page:
+    if cursor:
+        query = query.filter(keyset.after(keyset.decode(cursor)))
+    query = query.order_by(*keyset.order_by())
+    if skip and not cursor:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    return Page(rows[:limit], keyset.encode(rows[limit - 1]) if len(rows) > limit else None)
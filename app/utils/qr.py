@@ -1,5 +1,3 @@
-import qrcode
-import qrcode.image.svg
 from io import BytesIO
 import base64
 import secrets
@@ -10,6 +8,9 @@ def generate_token(length: int = 32) -> str:
     return ''.join(secrets.choice(alphabet) for _ in range(length))
 
 def make_qr_base64(data: str) -> str:
+    import qrcode
+    import qrcode.image.svg
+
     img = qrcode.make(data, image_factory=qrcode.image.svg.SvgImage)
     bytes_io = BytesIO()
     img.save(bytes_io)
@@ -0,0 +1,52 @@
+import argparse
+import time
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.models.sklad_docs import SkladDocument, SkladDocumentItem, SkladDocumentItemUpdate
+from app.services.sdocs_service import SkladDocumentService
+from bench.offline_seed import seed_offline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify every line of an inventory document through update_item: time and rows read")
+    parser.add_argument("--items", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    rows_read = []
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def count_rows(conn, cursor, statement, parameters, context, executemany):
+        if cursor.description is not None and cursor.rowcount > 0:
+            rows_read.append(cursor.rowcount)
+
+    with factory() as session:
+        fixture = seed_offline(session, 1, args.items, nomenclature=args.items)
+        document_id = fixture["document_ids"][0]
+        item_ids = session.execute(select(SkladDocumentItem.id).where(SkladDocumentItem.document_id == document_id)).scalars().all()
+
+    with factory() as session:
+        service = SkladDocumentService(session)
+        rows_read.clear()
+        started = time.perf_counter()
+        for n, item_id in enumerate(item_ids, 1):
+            service.update_item(item_id, SkladDocumentItemUpdate(quantity_actual=10), fixture["org_id"])
+            if n % 1000 == 0:
+                print(f"{n:>6} lines  {time.perf_counter() - started:>7.2f} s  {sum(rows_read):>10} rows read")
+        elapsed = time.perf_counter() - started
+        doc = session.execute(select(SkladDocument).where(SkladDocument.id == document_id)).scalar_one()
+        session.refresh(doc)
+
+    print(f"{len(item_ids)} lines verified in {elapsed:.2f} s ({elapsed / len(item_ids) * 1000:.2f} ms/line), {sum(rows_read)} rows read")
+    print(f"document: is_verified={doc.is_verified} total_items={doc.total_items} verified_items={doc.verified_items}")
+    if not doc.is_verified or doc.verified_items != len(item_ids):
+        print("FAIL: document counters do not match its items")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import re
+import subprocess
+import sys
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+LAZY_MODULES = ("reportlab", "qrcode", "PIL", "barcode")
+
+
+def profile(module: str) -> list:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode:
+        print(result.stderr.strip().splitlines()[-1])
+        raise SystemExit(1)
+    return [(int(own), int(total), len(indent) // 2, name) for own, total, indent, name in LINE.findall(result.stderr)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import of app.main under -X importtime: total time budget and modules that must stay lazy")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [profile(args.module) for _ in range(args.runs)]
+    best = min(runs, key=lambda rows: next(total for _, total, _, name in rows if name == args.module))
+    total_ms = next(total for _, total, _, name in best if name == args.module) / 1000
+
+    print(f"{'self ms':>9} {'cumulative ms':>14}  module")
+    for own, total, _, name in sorted(best, reverse=True)[:args.top]:
+        print(f"{own / 1000:>9.1f} {total / 1000:>14.1f}  {name}")
+
+    loaded = sorted({name for _, _, _, name in best if name.split(".")[0] in LAZY_MODULES})
+    print(f"\n{args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms, best of {args.runs})")
+    failed = False
+    if loaded:
+        print(f"FAIL: imported at startup, must load lazily: {', '.join(loaded[:10])}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent HTTP load against the API: p50/p99 latency and requests per second")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", help="GET path to hit, may be repeated (default: /api/stock/all/?limit=50)")
+    parser.add_argument("--token", help="Bearer token for authenticated endpoints")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--label", default="run")
+    args = parser.parse_args()
+
+    paths = args.path or ["/api/stock/all/?limit=50"]
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    local = threading.local()
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def hit(n):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = session.get(args.url + paths[n % len(paths)], headers=headers, timeout=60)
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            (latencies if ok else failures).append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        list(pool.map(hit, range(args.requests)))
+    wall = time.perf_counter() - started
+
+    print(f"[{args.label}] clients={args.clients} requests={args.requests} failures={len(failures)}")
+    print(f"[{args.label}] rps={len(latencies) / wall:.1f}")
+    if latencies:
+        print(f"[{args.label}] p50={percentile(latencies, 50) * 1000:.1f}ms "
+              f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+              f"mean={statistics.fmean(latencies) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
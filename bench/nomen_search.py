@@ -0,0 +1,106 @@
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.models.nomen import Nomenclature
+from app.services.nomen_service import NomenclatureService
+from bench.offline_seed import seed_offline
+
+TRGM_INDEXES = [index.name for index in Nomenclature.__table__.indexes if index.name.endswith("_trgm")]
+QUERIES = ["молоко", "простокв", "кефир 2.5", "сметана", "zzzz"]
+
+SEED_SQL = text("""
+    INSERT INTO nomenclature (id, name, article, barcode, unit, quantity, category_id, properties, organization_id, sklad_id, is_deleted, is_verified)
+    SELECT gen_random_uuid(),
+           (ARRAY['Молоко', 'Кефир', 'Сметана', 'Творог', 'Йогурт', 'Ряженка', 'Масло', 'Сыр'])[1 + i % 8]
+               || ' ' || (ARRAY['Простоквашино', 'Домик в деревне', 'Весёлый молочник', 'Агуша', 'Вкуснотеево'])[1 + (i / 8) % 5]
+               || ' ' || (1 + i % 5) || '.' || (i % 10) || '% №' || i,
+           :prefix || '-' || lpad(i::text, 7, '0'),
+           :barcode || lpad(i::text, 8, '0'),
+           'pcs', 1,
+           (ARRAY['Молочные продукты', 'Сыры', 'Масла и жиры', 'Детское питание'])[1 + i % 4],
+           '{}'::jsonb, :org_id, :sklad_id, false, false
+    FROM generate_series(1, :rows) AS i
+""")
+
+
+def legacy_search(session, organization_id, sklad_id, term: str):
+    return session.query(Nomenclature).filter(
+        Nomenclature.organization_id == organization_id,
+        Nomenclature.sklad_id == sklad_id,
+        Nomenclature.is_deleted == False,
+        Nomenclature.name.ilike(f"%{term}%")
+    ).offset(0).limit(100).all()
+
+
+def measure(fn, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label: str, results: dict):
+    every = [ms for timings in results.values() for ms in timings]
+    print(f"{label}: p50 {statistics.median(every):.1f} ms, p95 {statistics.quantiles(every, n=20)[-1]:.1f} ms")
+    for term, timings in results.items():
+        print(f"    {term!r:<14} {statistics.median(timings):>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nomenclature search latency at 1M rows: ILIKE seq scan vs pg_trgm GIN indexes")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with factory() as session:
+        session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        fixture = seed_offline(session, 0, 0, nomenclature=1)
+        user = fixture["user"]
+        user.choosen_sklad = fixture["sklad_id"]
+        started = time.perf_counter()
+        suffix = str(fixture["sklad_id"].int % 10**5).zfill(5)
+        session.execute(SEED_SQL, {
+            "prefix": f"MLK{suffix}", "barcode": f"46{suffix}", "rows": args.rows,
+            "org_id": str(fixture["org_id"]), "sklad_id": str(fixture["sklad_id"])
+        })
+        for name in TRGM_INDEXES:
+            column = next(index.columns[0].name for index in Nomenclature.__table__.indexes if index.name == name)
+            session.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON nomenclature USING gin ({column} gin_trgm_ops)"))
+        session.commit()
+        session.execute(text("ANALYZE nomenclature"))
+        session.commit()
+        print(f"seeded {args.rows} rows in {time.perf_counter() - started:.1f} s")
+
+        organization_id, sklad_id = fixture["org_id"], fixture["sklad_id"]
+        service = NomenclatureService(session)
+        queries = QUERIES + [f"MLK{suffix}-00012", f"46{suffix}0001"]
+
+        for name in TRGM_INDEXES:
+            session.execute(text(f"DROP INDEX {name}"))
+        before = {term: measure(lambda: legacy_search(session, organization_id, sklad_id, term), args.repeat) for term in queries}
+        session.rollback()
+        report("before: ILIKE without trigram indexes (GET /list?search=)", before)
+
+        session.refresh(user)
+        after_legacy = {term: measure(lambda: legacy_search(session, organization_id, sklad_id, term), args.repeat) for term in queries}
+        report("after: same ILIKE with trigram indexes", after_legacy)
+        after = {term: measure(lambda: service.find(term, 20, current_user=user), args.repeat) for term in queries}
+        report("after: ranked search (GET /find)", after)
+
+        for term in queries[:2] + queries[-2:]:
+            top = service.find(term, 3, current_user=user)
+            print(f"    top for {term!r}: " + ", ".join(f"{item.name} [{item.article}] {item.score}" for item in top))
+
+
+if __name__ == "__main__":
+    main()
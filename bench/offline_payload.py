@@ -0,0 +1,76 @@
+import argparse
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.negotiation import serialize, compress, JSON_TYPE, MSGPACK_TYPES
+
+
+def fake_snapshot(nomenclature: int, documents: int, items_per_document: int) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    org_id = str(uuid.uuid4())
+    sklad_id = str(uuid.uuid4())
+    nomen = [
+        {
+            "id": str(uuid.uuid4()), "name": f"Молоко Простоквашино 3.2% №{i}", "article": f"MLK-{i:06d}",
+            "barcode": f"46{i:011d}", "unit": "pcs", "quantity": i % 50, "category_id": "Молочные продукты",
+            "properties": {"brand": "Простоквашино", "fat": "3.2%", "volume": "1л", "shelf_life": "7 дней"},
+            "organization_id": org_id, "created_at": now, "updated_at": now, "is_deleted": False, "is_verified": False
+        } for i in range(nomenclature)
+    ]
+    docs = []
+    for d in range(documents):
+        doc_id = str(uuid.uuid4())
+        docs.append({
+            "id": doc_id, "organization_id": org_id, "created_by": None, "sklad_ids": [sklad_id], "doc_type": "inventory",
+            "number": f"INV-{d:05d}", "description": None, "address_from": None, "address_to": None,
+            "created_at": now, "updated_at": now, "is_deleted": False, "is_verified": False,
+            "items": [
+                {
+                    "id": str(uuid.uuid4()), "document_id": doc_id, "nomenclature_id": nomen[(d + i) % len(nomen)]["id"],
+                    "name": nomen[(d + i) % len(nomen)]["name"], "unit": "pcs", "packaging": None,
+                    "quantity_documental": 10, "quantity_actual": None, "created_at": now, "updated_at": now, "is_verified": False
+                } for i in range(items_per_document)
+            ]
+        })
+    return {
+        "token": "x" * 32, "cursor": "c" * 48,
+        "sklad": {"id": sklad_id, "name": "Основной", "code": "MAIN-1", "type": "MAIN", "address": {"city": "Ростов-на-Дону"}, "organization_id": org_id},
+        "nomenclature": nomen, "documents": docs
+    }
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline snapshot size and encode time per format and content encoding")
+    parser.add_argument("--nomenclature", type=int, default=5000)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--items", type=int, default=50, help="Items per document")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = fake_snapshot(args.nomenclature, args.documents, args.items)
+
+    baseline, baseline_ms = timed(lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeat)
+    print(f"{'format':<22} {'bytes':>12} {'vs baseline':>12} {'encode ms':>10}")
+    print(f"{'json (FastAPI default)':<22} {len(baseline):>12} {'100.0%':>12} {baseline_ms:>10.1f}")
+    for media_type, label in ((JSON_TYPE, "json"), (MSGPACK_TYPES[0], "msgpack")):
+        for encoding in (None, "gzip", "zstd"):
+            body, ms = timed(lambda: compress(serialize(payload, media_type), encoding), args.repeat)
+            name = f"{label}+{encoding}" if encoding else label
+            print(f"{name:<22} {len(body):>12} {len(body) / len(baseline):>11.1%} {ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import time
+import uuid
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.services.offline_service import OfflineService
+from bench.offline_seed import seed_offline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statement count of the offline snapshot for growing document counts (N+1 regression check)")
+    parser.add_argument("--documents", type=int, nargs="+", default=[1, 50, 500])
+    parser.add_argument("--items", type=int, default=20, help="Items per document")
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **k: statements.append(1))
+
+    counts = {}
+    print(f"{'documents':>10} {'items':>8} {'statements':>11} {'seconds':>8}")
+    for documents in args.documents:
+        with factory() as session:
+            fixture = seed_offline(session, documents, args.items)
+        with factory() as session:
+            statements.clear()
+            started = time.perf_counter()
+            service = OfflineService(session)
+            data = service.build_snapshot(service.get_sklad_data(fixture["token"], f"bench-{uuid.uuid4().hex[:8]}"))
+            elapsed = time.perf_counter() - started
+        counts[documents] = len(statements)
+        assert len(data["documents"]) == documents
+        print(f"{documents:>10} {documents * args.items:>8} {counts[documents]:>11} {elapsed:>8.3f}")
+
+    if len(set(counts.values())) > 1:
+        print(f"FAIL: statement count depends on document count: {counts}")
+        raise SystemExit(1)
+    print("statement count: constant")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import uuid
+
+from sqlalchemy import insert
+
+from app.models.auth import User
+from app.models.orga import Orga
+from app.models.sklads import Sklads
+from app.models.nomen import Nomenclature
+from app.models.sklad_docs import SkladDocument, SkladDocumentItem, SkladDocumentType
+from app.models.offline import OfflineToken
+from app.utils.qr import generate_token
+
+
+def seed_offline(session, documents: int, items_per_document: int, nomenclature: int = 200) -> dict:
+    suffix = uuid.uuid4().hex[:10].upper()
+    user = User(email=f"bench-{suffix}@example.com", fullName="bench", role="Founder", is_active=True, email_verified=True)
+    session.add(user)
+    session.flush()
+
+    org = Orga(user_id=user.id, legalName=f"bench {suffix}", inn=f"INN{suffix}", kpp=f"KPP{suffix}", address={}, settings={})
+    session.add(org)
+    session.flush()
+    user.connect_organization = str(org.id)
+
+    sklad = Sklads(
+        name=f"bench {suffix}",
+        code=f"BENCH_{suffix}",
+        type="MAIN",
+        address={"country": "-", "city": "-", "street": "-", "postalCode": "-"},
+        settings={},
+        organization_id=org.id
+    )
+    session.add(sklad)
+    session.flush()
+
+    nomen_ids = [uuid.uuid4() for _ in range(max(nomenclature, 1))]
+    session.execute(insert(Nomenclature), [
+        {
+            "id": nomen_id,
+            "name": f"Товар {i}",
+            "article": f"B{suffix}-{i}",
+            "barcode": f"{suffix}{i:08d}",
+            "unit": "pcs",
+            "quantity": 1,
+            "category_id": "bench",
+            "properties": {"brand": "bench"},
+            "organization_id": org.id,
+            "sklad_id": sklad.id
+        } for i, nomen_id in enumerate(nomen_ids)
+    ])
+
+    doc_ids = [uuid.uuid4() for _ in range(documents)]
+    if doc_ids:
+        session.execute(insert(SkladDocument), [
+            {
+                "id": doc_id,
+                "organization_id": org.id,
+                "created_by": user.id,
+                "sklad_ids": [sklad.id],
+                "doc_type": SkladDocumentType.INVENTORY,
+                "number": f"INV-{i}",
+                "total_items": items_per_document
+            } for i, doc_id in enumerate(doc_ids)
+        ])
+        item_rows = [
+            {
+                "document_id": doc_id,
+                "nomenclature_id": nomen_ids[(d * items_per_document + i) % len(nomen_ids)],
+                "name": f"Товар {i}",
+                "unit": "pcs",
+                "quantity_documental": 10,
+                "quantity_actual": None
+            } for d, doc_id in enumerate(doc_ids) for i in range(items_per_document)
+        ]
+        for start in range(0, len(item_rows), 5000):
+            session.execute(insert(SkladDocumentItem), item_rows[start:start + 5000])
+
+    token = OfflineToken(organization_id=org.id, sklad_id=sklad.id, created_by=user.id, token=generate_token(), is_active=True)
+    session.add(token)
+    session.commit()
+    return {"user": user, "org_id": org.id, "sklad_id": sklad.id, "token": token.token, "document_ids": doc_ids, "nomenclature_ids": nomen_ids}
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.services.snapshot_cache import SnapshotCache, SnapshotRef
+from app.utils.negotiation import JSON_TYPE, MSGPACK_TYPES
+from bench.offline_payload import fake_snapshot
+
+
+async def run(args) -> None:
+    payload = fake_snapshot(args.nomenclature, args.documents, args.items)
+    cache = SnapshotCache(size=4)
+    ref = SnapshotRef(sklad_id=uuid.uuid4(), organization_id=uuid.uuid4(), token="x" * 32, version=1)
+
+    async def build() -> dict:
+        await asyncio.sleep(args.build_ms / 1000)
+        return payload
+
+    variants = [(JSON_TYPE, "zstd"), (JSON_TYPE, "gzip"), (MSGPACK_TYPES[0], "zstd"), (JSON_TYPE, None)]
+
+    async def device(n: int) -> float:
+        started = time.perf_counter()
+        entry = await cache.get_or_build(ref, build)
+        media_type, encoding = variants[n % len(variants)]
+        await cache.body(entry, media_type, encoding)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    await asyncio.gather(*(device(n) for n in range(args.devices)))
+    cold = time.perf_counter() - started
+
+    warm = []
+    for n in range(args.devices):
+        warm.append(await device(n))
+
+    uncached = time.perf_counter()
+    for _ in range(args.devices):
+        JSONResponse(jsonable_encoder(payload)).body
+    uncached = time.perf_counter() - uncached
+
+    stats = cache.stats()
+    print(f"devices: {args.devices}, snapshot: {stats['bytes'] / 1024 / 1024:.1f} MB cached across variants")
+    print(f"builds: {stats['builds']} (hits {stats['hits']}, misses {stats['misses']})")
+    print(f"cold burst, all devices concurrently: {cold * 1000:.0f} ms total")
+    print(f"warm hit per device: {sum(warm) / len(warm) * 1e6:.0f} us avg, {max(warm) * 1e6:.0f} us max")
+    print(f"uncached encode per device (previous path, excl. DB): {uncached / args.devices * 1000:.1f} ms")
+    if stats["builds"] != 1:
+        print("FAIL: snapshot was built more than once for one version")
+        raise SystemExit(1)
+
+    bumped = SnapshotRef(sklad_id=ref.sklad_id, organization_id=ref.organization_id, token=ref.token, version=2)
+    await cache.get_or_build(bumped, build)
+    if cache.get(ref) is not None or cache.stats()["builds"] != 2:
+        print("FAIL: version bump did not replace the cached snapshot")
+        raise SystemExit(1)
+    print("version bump: rebuilt once, previous version evicted")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline snapshot cache: one build per (sklad, version) for a burst of devices")
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--nomenclature", type=int, default=5000)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--items", type=int, default=50, help="Items per document")
+    parser.add_argument("--build-ms", type=float, default=200, help="Simulated DB time of one snapshot build")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
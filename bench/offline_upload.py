@@ -0,0 +1,75 @@
+import argparse
+import time
+import uuid
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.models.offline import OfflineResultsUpload, OfflineScanResult, OfflineScanStatus
+from app.models.sklad_docs import SkladDocumentItem, SkladDocumentItemUpdate
+from app.services.offline_service import OfflineService
+from app.services.sdocs_service import SkladDocumentService
+from bench.offline_seed import seed_offline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched offline scan upload vs one PUT /api/docs/items/{id} per scan")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--items", type=int, default=500, help="Items per document")
+    parser.add_argument("--single", type=int, default=500, help="Scans to time through update_item (extrapolated to all items)")
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **k: statements.append(1))
+
+    with factory() as session:
+        single = seed_offline(session, 1, args.single)
+        item_ids = session.execute(select(SkladDocumentItem.id).where(SkladDocumentItem.document_id == single["document_ids"][0])).scalars().all()
+    with factory() as session:
+        service = SkladDocumentService(session)
+        statements.clear()
+        started = time.perf_counter()
+        for item_id in item_ids:
+            service.update_item(item_id, SkladDocumentItemUpdate(quantity_actual=7), single["org_id"])
+        per_scan = (time.perf_counter() - started) / len(item_ids)
+        per_scan_statements = len(statements) / len(item_ids)
+
+    with factory() as session:
+        fixture = seed_offline(session, args.documents, args.items)
+        rows = session.execute(select(SkladDocumentItem.id).where(SkladDocumentItem.document_id.in_(fixture["document_ids"]))).scalars().all()
+    device_id = f"bench-{uuid.uuid4().hex[:8]}"
+    payload = OfflineResultsUpload(results=[
+        OfflineScanResult(seq=seq, item_id=item_id, quantity_actual=7) for seq, item_id in enumerate(rows)
+    ])
+
+    with factory() as session:
+        service = OfflineService(session)
+        service.get_sklad_data(fixture["token"], device_id)
+        statements.clear()
+        started = time.perf_counter()
+        response = service.upload_results(fixture["token"], device_id, payload)
+        batch = time.perf_counter() - started
+        batch_statements = len(statements)
+        started = time.perf_counter()
+        replay = service.upload_results(fixture["token"], device_id, payload)
+        replay_time = time.perf_counter() - started
+
+    total = len(rows)
+    print(f"scans: {total} across {args.documents} documents")
+    print(f"update_item, one per scan: {per_scan * 1000:.2f} ms and {per_scan_statements:.1f} statements per scan, ~{per_scan * total:.1f} s for all")
+    print(f"upload_results, one batch: {batch:.2f} s, {batch_statements} statements; applied {response.applied}, verified documents {len(response.verified_documents)}")
+    print(f"replay of the same batch: {replay_time:.2f} s, applied {replay.applied}, replayed {sum(r.replayed for r in replay.results)}")
+
+    if response.applied != total or len(response.verified_documents) != args.documents:
+        print("FAIL: batch did not apply every scan or verify every document")
+        raise SystemExit(1)
+    if replay.applied or not all(r.replayed and r.status == OfflineScanStatus.APPLIED for r in replay.results):
+        print("FAIL: replayed batch was applied again")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.models.stock_oper import StockOperation
+from app.services.stock_service import StockOperationService, OPERATIONS_KEYSET
+from app.services.stock_partitions import ensure_partitions
+from bench.offline_seed import seed_offline
+
+SEED_SQL = text("""
+    INSERT INTO stockk (id, organization_id, operation_type, from_sklad_id, to_sklad_id, nomenclature_id, quantity, operation_metadata, created_at, updated_at)
+    SELECT gen_random_uuid(), :org_id, 'RECEIPT', NULL, :sklad_id, :nomenclature_id, 1 + i % 10, '{}'::jsonb,
+           TIMEZONE('utc', now()) - make_interval(secs => i), TIMEZONE('utc', now())
+    FROM generate_series(1, :rows) AS i
+""")
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Operation journal pagination: offset vs keyset cursor at growing page depth")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with engine.connect() as conn:
+        now = datetime.now(timezone.utc)
+        ensure_partitions(conn, now, since=now - timedelta(seconds=args.rows))
+
+    with factory() as session:
+        fixture = seed_offline(session, 0, 0, nomenclature=1)
+        started = time.perf_counter()
+        session.execute(SEED_SQL, {
+            "org_id": str(fixture["org_id"]), "sklad_id": str(fixture["sklad_id"]),
+            "nomenclature_id": str(fixture["nomenclature_ids"][0]), "rows": args.rows
+        })
+        session.commit()
+        session.execute(text("ANALYZE stockk"))
+        session.commit()
+        print(f"seeded {args.rows} operations in {time.perf_counter() - started:.1f} s")
+
+        service = StockOperationService(session)
+        org_id = fixture["org_id"]
+        print(f"{'page':>6} {'offset ms':>10} {'cursor ms':>10}")
+        for page in args.pages:
+            skip = (page - 1) * args.limit
+            if skip >= args.rows:
+                continue
+            cursor = None
+            if skip:
+                boundary = session.query(StockOperation).filter(StockOperation.organization_id == org_id).order_by(
+                    *OPERATIONS_KEYSET.order_by()
+                ).offset(skip - 1).limit(1).one()
+                cursor = OPERATIONS_KEYSET.encode(boundary)
+            by_offset = service.get_operations(org_id, skip=skip, limit=args.limit)
+            by_cursor = service.get_operations(org_id, limit=args.limit, cursor=cursor)
+            if [op.id for op in by_offset.items] != [op.id for op in by_cursor.items]:
+                print(f"FAIL: page {page} differs between offset and cursor")
+                raise SystemExit(1)
+            offset_ms = timed(lambda: service.get_operations(org_id, skip=skip, limit=args.limit), args.repeat)
+            cursor_ms = timed(lambda: service.get_operations(org_id, limit=args.limit, cursor=cursor), args.repeat)
+            print(f"{page:>6} {offset_ms:>10.1f} {cursor_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
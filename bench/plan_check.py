@@ -0,0 +1,220 @@
+import argparse
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.models.auth import User
+from app.models.orga import Invitation
+from app.models.stock_oper import OperationType
+from app.services.nomen_service import NomenclatureService
+from app.services.offline_service import OfflineService, encode_cursor
+from app.services.sdocs_service import SkladDocumentService
+from app.services.stock_service import StockOperationService
+from app.services.stock_partitions import PARTITION_NAME, ensure_partitions
+from bench.offline_seed import seed_offline
+
+HOT_QUERIES = {}
+
+NOISE_SQL = [
+    text("""
+        INSERT INTO nomenclature (id, name, article, barcode, unit, quantity, category_id, properties, organization_id, sklad_id, is_deleted, is_verified)
+        SELECT gen_random_uuid(), 'Шум ' || i, 'N' || :suffix || '-' || i, 'N' || :suffix || lpad(i::text, 9, '0'), 'pcs', 1, 'noise', '{}'::jsonb,
+               :org_id, :sklad_id, i % 10 = 0, false
+        FROM generate_series(1, :rows) AS i
+    """),
+    text("""
+        INSERT INTO stockk (id, organization_id, operation_type, to_sklad_id, nomenclature_id, quantity, operation_metadata, created_at, updated_at)
+        SELECT gen_random_uuid(), :org_id, 'RECEIPT', :sklad_id, :nomenclature_id, 1, '{}'::jsonb,
+               TIMEZONE('utc', now()) - make_interval(secs => i), TIMEZONE('utc', now())
+        FROM generate_series(1, :rows * 2) AS i
+    """),
+    text("""
+        INSERT INTO sklad_doc (id, organization_id, sklad_ids, doc_type, number, is_deleted, is_verified, total_items, verified_items)
+        SELECT gen_random_uuid(), :org_id, ARRAY[CAST(:sklad_id AS uuid)], 'INVENTORY', 'NOISE-' || i, i % 10 = 0, false, 0, 0
+        FROM generate_series(1, :rows / 5) AS i
+    """),
+    text("""
+        INSERT INTO sklad_doc_items (id, document_id, nomenclature_id, name, unit, quantity_documental, is_deleted, is_verified)
+        SELECT gen_random_uuid(), d.id, :nomenclature_id, 'Шум', 'pcs', 1, false, false
+        FROM (SELECT id FROM sklad_doc WHERE organization_id = :org_id) d, generate_series(1, 10)
+    """),
+    text("""
+        INSERT INTO users (id, email, "fullName", role, connect_organization, is_active, email_verified)
+        SELECT gen_random_uuid(), 'noise-' || :suffix || '-' || i || '@example.com', 'Шум ' || i, 'User', :org_id, true, true
+        FROM generate_series(1, :rows / 2) AS i
+    """),
+    text("""
+        INSERT INTO invitations (id, organization_id, token, email, "fullName", role, status, is_used, expires_at)
+        SELECT gen_random_uuid(), :org_id, 'noise-' || :suffix || '-' || i, 'noise-' || :suffix || '-' || i || '@example.com', 'Шум', 'User',
+               (ARRAY['pending', 'accepted', 'declined'])[1 + i % 3], false, now() + interval '7 days'
+        FROM generate_series(1, :rows / 2) AS i
+    """),
+]
+
+
+def hot_query(name: str, *tables: str):
+    def register(fn):
+        HOT_QUERIES[name] = (fn, set(tables))
+        return fn
+    return register
+
+
+@hot_query("nomenclature list", "nomenclature")
+def nomenclature_list(session, fx):
+    page = NomenclatureService(session).get_nomen(limit=50, current_user=fx["user"])
+    NomenclatureService(session).get_nomen(limit=50, current_user=fx["user"], cursor=page.next_cursor)
+
+
+@hot_query("nomenclature find", "nomenclature")
+def nomenclature_find(session, fx):
+    NomenclatureService(session).find("Товар 12", 20, current_user=fx["user"])
+
+
+@hot_query("nomenclature barcode", "nomenclature")
+def nomenclature_barcode(session, fx):
+    NomenclatureService(session).search(fx["barcode"], current_user=fx["user"])
+
+
+@hot_query("operations journal", "stockk")
+def operations(session, fx):
+    service = StockOperationService(session)
+    page = service.get_operations(fx["org_id"], limit=100)
+    service.get_operations(fx["org_id"], limit=100, cursor=page.next_cursor)
+    service.get_operations(fx["org_id"], limit=100, nomenclature_id=fx["nomenclature_ids"][0])
+    service.get_operations(fx["org_id"], limit=100, operation_type=OperationType.RECEIPT)
+    now = datetime.now(timezone.utc)
+    service.get_operations(fx["org_id"], limit=100, created_from=now - timedelta(hours=1), created_to=now)
+
+
+@hot_query("sklad documents", "sklad_doc", "sklad_doc_items")
+def documents(session, fx):
+    service = SkladDocumentService(session)
+    service.get_documents(fx["org_id"], fx["sklad_id"])
+    service.get_items(fx["document_ids"][0], fx["org_id"])
+
+
+@hot_query("offline snapshot", "nomenclature", "sklad_doc", "sklad_doc_items", "offline_sklad_tokens")
+def offline_snapshot(session, fx):
+    service = OfflineService(session)
+    service.build_snapshot(service.get_sklad_data(fx["token"], "plan-check"))
+    service.get_sklad_changes(fx["token"], "plan-check", encode_cursor(datetime.now(timezone.utc) - timedelta(hours=1)))
+
+
+@hot_query("organization members", "users", "invitations")
+def members(session, fx):
+    org_id = fx["org_id"]
+    users = session.execute(select(User).where(User.connect_organization == str(org_id)).limit(20)).scalars().all()
+    for member in users[:5]:
+        session.execute(select(Invitation).where(
+            Invitation.organization_id == org_id,
+            Invitation.status == "accepted",
+            Invitation.user_id == member.id
+        ).order_by(Invitation.used_at.desc()).limit(1)).first()
+        session.execute(select(Invitation).where(
+            Invitation.organization_id == org_id,
+            Invitation.status == "accepted",
+            Invitation.email == member.email
+        ).order_by(Invitation.used_at.desc()).limit(1)).first()
+    session.execute(select(Invitation).where(
+        Invitation.organization_id == org_id,
+        Invitation.email == "nobody@example.com",
+        Invitation.status == "pending"
+    )).first()
+
+
+def relation(node: dict):
+    name = node.get("Relation Name")
+    return "stockk" if name and PARTITION_NAME.match(name) else name
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def seed(session, rows: int) -> dict:
+    noise = seed_offline(session, 0, 0, nomenclature=1)
+    suffix = uuid.uuid4().hex[:8]
+    params = {
+        "org_id": str(noise["org_id"]), "sklad_id": str(noise["sklad_id"]),
+        "nomenclature_id": str(noise["nomenclature_ids"][0]), "suffix": suffix, "rows": rows
+    }
+    for statement in NOISE_SQL:
+        session.execute(statement, params)
+    session.commit()
+
+    fixture = seed_offline(session, 20, 30, nomenclature=500)
+    fixture["user"].choosen_sklad = fixture["sklad_id"]
+    session.execute(text("""
+        INSERT INTO stockk (id, organization_id, operation_type, to_sklad_id, nomenclature_id, quantity, operation_metadata, created_at, updated_at)
+        SELECT gen_random_uuid(), :org_id, 'RECEIPT', :sklad_id, :nomenclature_id, 1, '{}'::jsonb,
+               TIMEZONE('utc', now()) - make_interval(secs => i), TIMEZONE('utc', now())
+        FROM generate_series(1, 500) AS i
+    """), {"org_id": str(fixture["org_id"]), "sklad_id": str(fixture["sklad_id"]), "nomenclature_id": str(fixture["nomenclature_ids"][0])})
+    session.commit()
+    fixture["barcode"] = session.execute(text("SELECT barcode FROM nomenclature WHERE id = :id"), {"id": str(fixture["nomenclature_ids"][0])}).scalar()
+    for table in ("nomenclature", "stockk", "sklad_doc", "sklad_doc_items", "users", "invitations", "offline_sklad_tokens"):
+        session.execute(text(f"ANALYZE {table}"))
+    session.commit()
+    return fixture
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every statement of the registered hot queries and fail on sequential scans")
+    parser.add_argument("--rows", type=int, default=100_000, help="Noise rows per table from another organization")
+    parser.add_argument("--verbose", action="store_true", help="Print the plan of every statement")
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    with engine.connect() as conn:
+        now = datetime.now(timezone.utc)
+        ensure_partitions(conn, now, since=now - timedelta(seconds=args.rows))
+
+    with factory() as session:
+        fixture = seed(session, args.rows)
+
+        failures = []
+        for name, (fn, tables) in HOT_QUERIES.items():
+            captured.clear()
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                fn(session, fixture)
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+            session.rollback()
+
+            indexes = set()
+            for statement, parameters in list(captured):
+                plan = session.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+                plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+                for node in plan_nodes(plan):
+                    if node.get("Index Name"):
+                        indexes.add(node["Index Name"])
+                    if node["Node Type"] == "Seq Scan" and relation(node) in tables:
+                        failures.append((name, node["Relation Name"], statement))
+                if args.verbose:
+                    print(f"--- {name}\n{statement}\n{json.dumps(plan, indent=1)[:2000]}")
+            session.rollback()
+            status = "FAIL" if any(failure[0] == name for failure in failures) else "ok"
+            print(f"{status:<5} {name:<22} {len(captured):>3} statements  indexes: {', '.join(sorted(indexes)) or '-'}")
+
+    if failures:
+        for name, table, statement in failures:
+            print(f"\nseq scan on {table} in '{name}':\n{statement}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
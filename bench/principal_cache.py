@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import fnmatch
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core import principal_cache as module
+from app.core.principal_cache import PrincipalCache, RedisBackend, principal_cache
+from app.models.auth import User
+
+
+class FakeRedis:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.down = False
+        self.calls = 0
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _call(self):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.down:
+            raise ConnectionError("fake redis is down")
+
+    def get(self, key):
+        self._call()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                return None
+            return item[1].encode()
+
+    def set(self, key, value, ex=None):
+        self._call()
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ex or 1e9), value)
+
+    def delete(self, *keys):
+        self._call()
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match="*", count=None):
+        self._call()
+        with self._lock:
+            return [key for key in self._data if fnmatch.fnmatchcase(key, match)]
+
+
+async def stalled(fn) -> float:
+    gaps, done = [], asyncio.Event()
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    fn()
+    await asyncio.sleep(0.01)
+    done.set()
+    await task
+    return max(gaps) * 1000
+
+
+def fail(message: str):
+    print(f"FAIL: {message}")
+    raise SystemExit(1)
+
+
+async def run(args):
+    fake = FakeRedis(args.latency_ms / 1000)
+    principal_cache.backend = RedisBackend(fake, 30)
+    other_worker = PrincipalCache(RedisBackend(fake, 30))
+    user = User(id=uuid.uuid4(), email="bench@example.com", fullName="Bench", role="admin", connect_organization=str(uuid.uuid4()),
+                choosen_sklad=uuid.uuid4(), is_active=True, email_verified=True, created_at=datetime.now(), updated_at=datetime.now())
+
+    await principal_cache.run(principal_cache.put_user, user)
+    cached = await other_worker.run(other_worker.get_user, user.id)
+    if cached is None or cached.choosen_sklad != user.choosen_sklad:
+        fail("a user cached by one worker is not visible to another")
+    print("shared backend: user cached by worker A is served by worker B")
+
+    def commit_user_change():
+        session = Session()
+        session.info["principal_cache"] = {"users": {user.id}, "orgs": set(), "clear_users": False, "clear_orgs": False}
+        module._invalidate_committed(session)
+
+    before = await stalled(lambda: principal_cache.backend.delete(f"user:{user.id}"))
+    await principal_cache.run(principal_cache.put_user, user)
+    after = await stalled(commit_user_change)
+    await run_in_threadpool(principal_cache.shutdown)
+    if await other_worker.run(other_worker.get_user, user.id) is not None:
+        fail("after_commit invalidation did not reach the shared backend")
+    if after >= args.latency_ms:
+        fail(f"after_commit invalidation still blocks the event loop for {after:.1f} ms")
+    print(f"event loop stall on commit, Redis latency {args.latency_ms} ms:")
+    print(f"  before: invalidation on the loop   {before:>7.1f} ms")
+    print(f"  after:  deferred to cache thread   {after:>7.1f} ms")
+
+    fake.down = True
+    if await other_worker.run(other_worker.get_user, user.id) is not None:
+        fail("an unreachable backend returned a cached user")
+    commit_user_change()
+    await run_in_threadpool(principal_cache.shutdown)
+    print("outage: reads fall back to a miss, invalidation errors are logged and do not fail the commit")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Principal cache over a Redis stand-in: worker coherence, loop stalls on invalidation, outage behaviour")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
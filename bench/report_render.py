@@ -0,0 +1,84 @@
+import argparse
+import itertools
+import json
+import resource
+import subprocess
+import sys
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.platypus import Table, Spacer
+
+from app.services.report_render import (
+    InventoryDocTemplate, StreamingFlowables, inventory_tables, inventory_row, inventory_table_style,
+    SKLAD_HEADERS, ORG_HEADERS
+)
+
+
+def fake_rows(count: int, sklad: bool):
+    for i in range(count):
+        yield SimpleNamespace(
+            name=f"Товар {i:07d}",
+            article=f"ART-{i:07d}",
+            barcode=f"46{i:011d}" if i % 3 else None,
+            unit="шт",
+            quantity=i % 997,
+            sklad_name=None if sklad else f"Склад {i % 7}"
+        )
+
+
+def render(count: int, mode: str, sklad: bool) -> dict:
+    buffer = BytesIO()
+    doc = InventoryDocTemplate(buffer, pagesize=A4, leftMargin=15*mm, rightMargin=15*mm,
+                               topMargin=20*mm, bottomMargin=40*mm,
+                               signature_hash="0" * 32, online_url="https://rsue.devoriole.ru/api/report/inventory/view/" + "x" * 32)
+    started = time.perf_counter()
+    if mode == "stream":
+        content = StreamingFlowables([], itertools.chain(inventory_tables(fake_rows(count, sklad), sklad), [Spacer(1, 12)]))
+    else:
+        data = [SKLAD_HEADERS if sklad else ORG_HEADERS]
+        data.extend(inventory_row(item, sklad) for item in fake_rows(count, sklad))
+        table = Table(data, repeatRows=1)
+        table.setStyle(inventory_table_style(sklad))
+        content = [table, Spacer(1, 12)]
+    doc.build(content)
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": count,
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "pdf_kb": round(len(buffer.getvalue()) / 1024, 1),
+        "pages": doc.page
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory PDF rendering: wall time and peak RSS, streaming vs single-table")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--mode", choices=["stream", "table", "both"], default="both")
+    parser.add_argument("--org", action="store_true", help="Render the all-warehouses layout (extra column)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(render(args.rows[0], args.mode, not args.org)))
+        return
+
+    modes = ["table", "stream"] if args.mode == "both" else [args.mode]
+    print(f"{'rows':>8} {'mode':>7} {'seconds':>9} {'max rss MB':>11} {'pdf KB':>9} {'pages':>6}")
+    for count in args.rows:
+        for mode in modes:
+            cmd = [sys.executable, "-m", "bench.report_render", "--child", "--rows", str(count), "--mode", mode]
+            if args.org:
+                cmd.append("--org")
+            out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(f"{r['rows']:>8} {r['mode']:>7} {r['seconds']:>9} {r['max_rss_mb']:>11} {r['pdf_kb']:>9} {r['pages']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import statistics
+import time
+import uuid
+
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.models.sklad_docs import SkladDocument, SkladDocumentResponse
+from app.services.sdocs_service import SkladDocumentService
+from bench.offline_seed import seed_offline
+
+SEED_SQL = text("""
+    INSERT INTO sklad_doc (id, organization_id, sklad_ids, doc_type, number, is_deleted, is_verified, total_items, verified_items)
+    SELECT gen_random_uuid(), :org_id,
+           CASE WHEN i % 10 = 0
+                THEN ARRAY[s.ids[1 + i % :sklads], s.ids[1 + (i / :sklads) % :sklads]]
+                ELSE ARRAY[s.ids[1 + i % :sklads]] END,
+           'INVENTORY', 'DOC-' || i, i % 20 = 0, false, 0, 0
+    FROM generate_series(1, :rows) AS i, (SELECT CAST(:sklad_ids AS uuid[]) AS ids) s
+""")
+
+
+def legacy_documents(session, org_id, sklad_id):
+    query = session.query(SkladDocument).filter(SkladDocument.organization_id == org_id, SkladDocument.is_deleted == False)
+    query = query.filter(func.array_position(SkladDocument.sklad_ids, sklad_id) != None)
+    return [SkladDocumentResponse.from_orm(d) for d in query.all()]
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-sklad document listing at 1M documents: array_position vs sklad_ids @> with a GIN index")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sklads", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with factory() as session:
+        fixture = seed_offline(session, 0, 0, nomenclature=1)
+        org_id, sklad_id = fixture["org_id"], fixture["sklad_id"]
+        sklad_ids = [str(sklad_id)] + [str(uuid.uuid4()) for _ in range(args.sklads - 1)]
+        started = time.perf_counter()
+        session.execute(SEED_SQL, {"org_id": str(org_id), "sklad_ids": sklad_ids, "sklads": args.sklads, "rows": args.rows})
+        session.execute(text("CREATE INDEX IF NOT EXISTS ix_sklad_doc_sklad_ids_gin ON sklad_doc USING gin (sklad_ids)"))
+        session.commit()
+        session.execute(text("ANALYZE sklad_doc"))
+        session.commit()
+        print(f"seeded {args.rows} documents over {args.sklads} sklads in {time.perf_counter() - started:.1f} s")
+
+        service = SkladDocumentService(session)
+        expected = {doc.id for doc in legacy_documents(session, org_id, sklad_id)}
+        found = {doc.id for doc in service.get_documents(org_id, sklad_id)}
+        if found != expected:
+            print(f"FAIL: containment returned {len(found)} documents, array_position {len(expected)}")
+            raise SystemExit(1)
+
+        before = timed(lambda: legacy_documents(session, org_id, sklad_id), args.repeat)
+        after = timed(lambda: service.get_documents(org_id, sklad_id), args.repeat)
+        plan = session.execute(text(
+            "EXPLAIN SELECT id FROM sklad_doc WHERE organization_id = :org_id AND is_deleted = false AND sklad_ids @> ARRAY[CAST(:sklad_id AS uuid)]"
+        ), {"org_id": str(org_id), "sklad_id": str(sklad_id)}).scalars().all()
+
+        print(f"{len(found)} documents for one sklad")
+        print(f"before: array_position        {before:>8.1f} ms")
+        print(f"after:  sklad_ids @> (GIN)     {after:>8.1f} ms")
+        print("\n".join(plan))
+
+
+if __name__ == "__main__":
+    main()
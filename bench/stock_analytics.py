@@ -0,0 +1,130 @@
+import argparse
+import statistics
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.models.sklads import Sklads
+from app.services.stock_analytics import StockAnalyticsService
+from app.services.stock_partitions import ensure_partitions
+from app.services.stock_service import StockOperationService
+from bench.offline_seed import seed_offline
+from bench.stock_asof import SEED_SQL
+
+OUTBOUND = {"TRANSFER", "SALE", "DISPOSAL"}
+INBOUND = {"TRANSFER", "RECEIPT", "RETURN", "ADJUSTMENT"}
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def client_side(service, org_id, created_from, created_to, limit: int):
+    totals, transferred, cursor = Counter(), 0, None
+    while True:
+        page = service.get_operations(org_id, limit=limit, cursor=cursor, created_from=created_from, created_to=created_to)
+        for op in page.items:
+            key = (op.created_at.replace(hour=0, minute=0, second=0, microsecond=0), op.operation_type)
+            outbound = op.operation_type in OUTBOUND and op.from_sklad_id
+            inbound = op.operation_type in INBOUND and (op.to_sklad_id or op.from_sklad_id)
+            if outbound:
+                totals[key + ("out",)] += op.quantity
+            if inbound:
+                totals[key + ("in",)] += max(op.quantity, 0)
+                totals[key + ("out",)] += max(-op.quantity, 0)
+            if outbound or inbound:
+                totals[key + ("operations",)] += 1
+        transferred += sum(len(op.model_dump_json()) for op in page.items) + 2
+        if not page.next_cursor:
+            return +totals, transferred
+        cursor = page.next_cursor
+
+
+def server_side(analytics, org_id, created_from, created_to):
+    result = analytics.turnover(org_id, created_from, created_to, "day")
+    totals = Counter()
+    for row in result.rows:
+        key = (row.period, row.operation_type)
+        totals[key + ("in",)] += row.quantity_in
+        totals[key + ("out",)] += row.quantity_out
+        totals[key + ("operations",)] += row.operations
+    return +totals, len(result.model_dump_json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turnover per day and operation type: paging /api/stock/all/ on the client vs SQL aggregation vs daily rollups")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--sklads", type=int, default=10)
+    parser.add_argument("--nomenclature", type=int, default=2000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with engine.connect() as conn:
+        ensure_partitions(conn, now, since=now - timedelta(days=args.days))
+
+    with factory() as session:
+        fixture = seed_offline(session, 0, 0, nomenclature=args.nomenclature)
+        org_id = fixture["org_id"]
+        sklads = [fixture["sklad_id"]]
+        for _ in range(args.sklads - 1):
+            suffix = uuid.uuid4().hex[:10].upper()
+            sklad = Sklads(name=f"bench {suffix}", code=f"BENCH_{suffix}", type="MAIN", organization_id=org_id,
+                           address={"country": "-", "city": "-", "street": "-", "postalCode": "-"}, settings={})
+            session.add(sklad)
+            session.flush()
+            sklads.append(sklad.id)
+        started = time.perf_counter()
+        session.execute(SEED_SQL, {"org_id": str(org_id), "sklad_ids": [str(sklad_id) for sklad_id in sklads],
+                                   "rows": args.rows, "days": args.days, "now": now})
+        session.commit()
+        session.execute(text("ANALYZE stockk"))
+        session.commit()
+        print(f"seeded {args.rows} operations over {args.days} days in {time.perf_counter() - started:.1f} s")
+
+        created_from = (now - timedelta(days=args.days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        created_to = now + timedelta(seconds=1)
+        service = StockOperationService(session)
+        analytics = StockAnalyticsService(session)
+
+        started = time.perf_counter()
+        expected, client_bytes = client_side(service, org_id, created_from, created_to, args.page)
+        client_ms = (time.perf_counter() - started) * 1000
+        actual, server_bytes = server_side(analytics, org_id, created_from, created_to)
+        if actual != expected:
+            print(f"FAIL: SQL turnover differs from client-side sums in {len(set(actual.items()) ^ set(expected.items()))} cells")
+            raise SystemExit(1)
+        journal_ms = timed(lambda: server_side(analytics, org_id, created_from, created_to), args.repeat)
+
+        started = time.perf_counter()
+        analytics.roll_organization(org_id, now.replace(hour=0, minute=0, second=0, microsecond=0))
+        print(f"rolled up {args.days} days in {time.perf_counter() - started:.1f} s")
+        rolled, _ = server_side(analytics, org_id, created_from, created_to)
+        if rolled != expected:
+            print(f"FAIL: rollup turnover differs from client-side sums in {len(set(rolled.items()) ^ set(expected.items()))} cells")
+            raise SystemExit(1)
+        rollup_ms = timed(lambda: server_side(analytics, org_id, created_from, created_to), args.repeat)
+        top_ms = timed(lambda: analytics.top_movers(org_id, created_from, created_to, "total", 10), args.repeat)
+
+        print(f"before: page /all/ by {args.page} and sum    {client_ms:>9.1f} ms  {client_bytes / 1024:>10.0f} KiB")
+        print(f"after:  /analytics/turnover (journal)  {journal_ms:>9.1f} ms  {server_bytes / 1024:>10.1f} KiB")
+        print(f"after:  /analytics/turnover (rollups)  {rollup_ms:>9.1f} ms")
+        print(f"after:  /analytics/top (rollups)       {top_ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.models.sklads import Sklads
+from app.services.stock_history import StockHistoryService, movements, balances
+from app.services.stock_partitions import ensure_partitions
+from bench.offline_seed import seed_offline
+
+SEED_SQL = text("""
+    INSERT INTO stockk (id, organization_id, operation_type, from_sklad_id, to_sklad_id, nomenclature_id, quantity, operation_metadata, created_at, updated_at)
+    SELECT gen_random_uuid(), :org_id, CAST(k.kinds[1 + i % 4] AS operationtype),
+           CASE WHEN i % 4 IN (1, 2) THEN s.ids[1 + i % array_length(s.ids, 1)] END,
+           CASE WHEN i % 4 IN (0, 3) THEN s.ids[1 + i % array_length(s.ids, 1)]
+                WHEN i % 4 = 2 THEN s.ids[1 + (i + 1) % array_length(s.ids, 1)] END,
+           n.ids[1 + (i / 4) % array_length(n.ids, 1)], 1 + i % 7, '{}'::jsonb,
+           :now - make_interval(secs => :days * 86400.0 * (:rows - i) / :rows), :now
+    FROM generate_series(1, :rows) AS i,
+         (SELECT CAST(:sklad_ids AS uuid[]) AS ids) s,
+         (SELECT ARRAY(SELECT id FROM nomenclature WHERE organization_id = :org_id) AS ids) n,
+         (SELECT ARRAY['RECEIPT', 'SALE', 'TRANSFER', 'ADJUSTMENT'] AS kinds) k
+""")
+
+
+def replay(session, org_id, at: datetime) -> dict:
+    rows = session.execute(balances(None, movements(org_id, None, at, inclusive=True))).all()
+    return {(row.sklad_id, row.nomenclature_id): row.quantity for row in rows}
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="As-of stock: full journal replay vs latest checkpoint plus journal tail")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--sklads", type=int, default=10)
+    parser.add_argument("--nomenclature", type=int, default=2000)
+    parser.add_argument("--threshold", type=int, default=50_000, help="STOCK_CHECKPOINT_MIN_OPERATIONS for this run")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with engine.connect() as conn:
+        ensure_partitions(conn, now, since=now - timedelta(days=args.days))
+
+    with factory() as session:
+        fixture = seed_offline(session, 0, 0, nomenclature=args.nomenclature)
+        org_id = fixture["org_id"]
+        sklads = [fixture["sklad_id"]]
+        for _ in range(args.sklads - 1):
+            suffix = uuid.uuid4().hex[:10].upper()
+            sklad = Sklads(name=f"bench {suffix}", code=f"BENCH_{suffix}", type="MAIN", organization_id=org_id,
+                           address={"country": "-", "city": "-", "street": "-", "postalCode": "-"}, settings={})
+            session.add(sklad)
+            session.flush()
+            sklads.append(sklad.id)
+        started = time.perf_counter()
+        session.execute(SEED_SQL, {"org_id": str(org_id), "sklad_ids": [str(sklad_id) for sklad_id in sklads],
+                                   "rows": args.rows, "days": args.days, "now": now})
+        session.commit()
+        session.execute(text("ANALYZE stockk"))
+        session.commit()
+        print(f"seeded {args.rows} operations over {args.days} days in {time.perf_counter() - started:.1f} s")
+
+        service = StockHistoryService(session)
+        started = time.perf_counter()
+        written = service.checkpoint_organization(org_id, now.replace(hour=0, minute=0, second=0, microsecond=0), args.threshold)
+        print(f"{written} checkpoints written in {time.perf_counter() - started:.1f} s")
+
+        points = []
+        month = (now - timedelta(days=args.days)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        while month < now:
+            month = (month + timedelta(days=32)).replace(day=1)
+            points.append(min(month, now) - timedelta(microseconds=1))
+
+        print(f"{'at':<28} {'checkpoint':<20} {'replay ms':>10} {'asof ms':>10}")
+        for at in points:
+            result = service.balance_at(org_id, at)
+            expected = replay(session, org_id, at)
+            actual = {(item.sklad_id, item.nomenclature_id): item.quantity for item in result.items}
+            if actual != expected:
+                print(f"FAIL: {at}: {len(set(actual.items()) ^ set(expected.items()))} lines differ from full replay")
+                raise SystemExit(1)
+            before = timed(lambda: replay(session, org_id, at), args.repeat)
+            after = timed(lambda: service.balance_at(org_id, at), args.repeat)
+            checkpoint = result.checkpoint_at.isoformat() if result.checkpoint_at else "-"
+            print(f"{at.isoformat():<28} {checkpoint:<20} {before:>10.1f} {after:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import statistics
+import time
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.models.nomen import Nomenclature, Stock
+from app.models.sklads import Sklads
+from app.models.stock_oper import StockOperationCreate, OperationType
+from app.services.nomen_service import NomenclatureService
+from app.services.stock_service import StockOperationService
+from bench.offline_seed import seed_offline
+
+SEED_SQL = [
+    text("""
+        INSERT INTO nomenclature (id, name, article, barcode, unit, quantity, category_id, properties, organization_id, sklad_id, is_deleted, is_verified)
+        SELECT gen_random_uuid(), 'Товар ' || i, :prefix || '-' || i, :prefix || lpad(i::text, 9, '0'), 'pcs', 1, 'bench', '{}'::jsonb,
+               :org_id, s.ids[1 + i % array_length(s.ids, 1)], false, false
+        FROM generate_series(1, :rows) AS i, (SELECT CAST(:sklad_ids AS uuid[]) AS ids) s
+    """),
+    text("""
+        INSERT INTO stock (id, nomenclature_id, sklad_id, quantity, reserved)
+        SELECT gen_random_uuid(), n.id, n.sklad_id, 1 + abs(hashtext(n.article)) % 100, abs(hashtext(n.article)) % 3
+        FROM nomenclature n
+        WHERE n.organization_id = :org_id
+        ON CONFLICT (nomenclature_id, sklad_id) DO NOTHING
+    """),
+    text("""
+        INSERT INTO stock_balances (sklad_id, organization_id, quantity, reserved)
+        SELECT s.sklad_id, n.organization_id, SUM(s.quantity), SUM(s.reserved)
+        FROM stock s JOIN nomenclature n ON n.id = s.nomenclature_id
+        WHERE n.organization_id = :org_id AND NOT n.is_deleted
+        GROUP BY s.sklad_id, n.organization_id
+        ON CONFLICT (sklad_id, shard) DO UPDATE SET quantity = EXCLUDED.quantity, reserved = EXCLUDED.reserved
+    """),
+]
+
+
+def aggregate(session, org_id) -> dict:
+    rows = session.query(Stock.sklad_id, func.sum(Stock.quantity), func.sum(Stock.reserved)).join(
+        Nomenclature, Nomenclature.id == Stock.nomenclature_id
+    ).join(Sklads, Sklads.id == Stock.sklad_id).filter(
+        Nomenclature.organization_id == org_id,
+        Nomenclature.is_deleted == False,
+        Sklads.is_deleted == False
+    ).group_by(Stock.sklad_id).all()
+    return {sklad_id: (int(quantity), int(reserved)) for sklad_id, quantity, reserved in rows}
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Organization stock totals: aggregate over stock at request time vs maintained stock_balances")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sklads", type=int, default=20)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--deletes", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with factory() as session:
+        fixture = seed_offline(session, 0, 0, nomenclature=1)
+        org_id, user = fixture["org_id"], fixture["user"]
+        sklads = [fixture["sklad_id"]]
+        for i in range(args.sklads - 1):
+            suffix = uuid.uuid4().hex[:10].upper()
+            sklad = Sklads(name=f"bench {suffix}", code=f"BENCH_{suffix}", type="MAIN", organization_id=org_id,
+                           address={"country": "-", "city": "-", "street": "-", "postalCode": "-"}, settings={})
+            session.add(sklad)
+            session.flush()
+            sklads.append(sklad.id)
+        started = time.perf_counter()
+        params = {"org_id": str(org_id), "sklad_ids": [str(sklad_id) for sklad_id in sklads], "rows": args.rows, "prefix": f"BAL{uuid.uuid4().hex[:6]}"}
+        for statement in SEED_SQL:
+            session.execute(statement, params)
+        session.commit()
+        session.execute(text("ANALYZE nomenclature"))
+        session.execute(text("ANALYZE stock"))
+        session.commit()
+        print(f"seeded {args.rows} stock rows over {args.sklads} sklads in {time.perf_counter() - started:.1f} s")
+
+        service = StockOperationService(session)
+        nomen_service = NomenclatureService(session)
+        sklad_user = lambda sklad_id: SimpleNamespace(id=user.id, connect_organization=str(org_id), choosen_sklad=str(sklad_id))
+        nomen = session.query(Nomenclature.id, Nomenclature.sklad_id).filter(Nomenclature.organization_id == org_id).limit(args.operations).all()
+        started = time.perf_counter()
+        for i, (nomenclature_id, sklad_id) in enumerate(nomen):
+            target = sklads[(sklads.index(sklad_id) + 1) % len(sklads)]
+            kind = [OperationType.RECEIPT, OperationType.SALE, OperationType.TRANSFER, OperationType.ADJUSTMENT][i % 4]
+            service.create_operation(StockOperationCreate(
+                operation_type=kind.value,
+                nomenclature_id=nomenclature_id,
+                from_sklad_id=None if kind == OperationType.RECEIPT else sklad_id,
+                to_sklad_id=target if kind in (OperationType.RECEIPT, OperationType.TRANSFER) else None,
+                quantity=-1 if kind == OperationType.ADJUSTMENT else 1
+            ), user)
+        print(f"{len(nomen)} operations through the service in {time.perf_counter() - started:.2f} s")
+
+        for nomenclature_id, sklad_id in nomen[:args.deletes]:
+            nomen_service.del_nomen(nomenclature_id, sklad_user(sklad_id))
+        print(f"{min(args.deletes, len(nomen))} nomenclature deleted")
+
+        expected = aggregate(session, org_id)
+        summary = service.get_organization_balance(org_id)
+        maintained = {balance.sklad_id: (balance.quantity, balance.reserved) for balance in summary.sklads}
+        if maintained != expected:
+            print(f"FAIL: maintained quantity or reserved drifts from stock: {len(set(maintained.items()) ^ set(expected.items()))} sklads differ")
+            raise SystemExit(1)
+
+        before = timed(lambda: aggregate(session, org_id), args.repeat)
+        after = timed(lambda: service.get_organization_balance(org_id), args.repeat)
+        sklad = timed(lambda: service.get_sklad_balance(sklads[0], org_id), args.repeat)
+        print(f"organization total {summary.quantity} ({summary.reserved} reserved) over {len(summary.sklads)} sklads")
+        print(f"before: GROUP BY over stock         {before:>9.1f} ms")
+        print(f"after:  /balance/summary            {after:>9.1f} ms")
+        print(f"after:  /balance/summary/{{sklad}}    {sklad:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
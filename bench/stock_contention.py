@@ -0,0 +1,166 @@
+import argparse
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.models.nomen import Nomenclature, Stock, StockBalance
+from app.models.sklads import Sklads
+from app.models.stock_oper import StockOperation, StockOperationCreate, OperationType
+from app.services.stock_service import StockOperationService
+
+
+def seed(session, org_id, initial, skus):
+    sklads = []
+    for suffix in ("A", "B"):
+        sklad = Sklads(
+            name=f"bench {suffix}",
+            code=f"BENCH_{suffix}_{uuid.uuid4().hex[:8].upper()}",
+            type="MAIN",
+            address={"country": "-", "city": "-", "street": "-", "postalCode": "-"},
+            settings={},
+            organization_id=org_id
+        )
+        session.add(sklad)
+        sklads.append(sklad)
+    session.flush()
+
+    nomen_ids = []
+    for i in range(skus):
+        nomen = Nomenclature(
+            name=f"hot sku {i}",
+            article=f"HOT-{uuid.uuid4().hex[:10].upper()}",
+            unit="pcs",
+            quantity=initial,
+            organization_id=org_id,
+            sklad_id=sklads[0].id
+        )
+        session.add(nomen)
+        session.flush()
+        session.add(Stock(nomenclature_id=nomen.id, sklad_id=sklads[0].id, quantity=initial, reserved=0))
+        session.add(Stock(nomenclature_id=nomen.id, sklad_id=sklads[1].id, quantity=0, reserved=0))
+        nomen_ids.append(nomen.id)
+    session.add(StockBalance(sklad_id=sklads[0].id, shard=0, organization_id=org_id, quantity=initial * skus, reserved=0))
+    session.commit()
+    return nomen_ids, sklads[0].id, sklads[1].id
+
+
+def worker(factory, user, nomen_ids, sklad_a, sklad_b, deadline, results, lock):
+    local = Counter()
+    rnd = random.Random()
+    while time.perf_counter() < deadline:
+        roll = rnd.random()
+        if roll < 0.45:
+            payload = {"operation_type": "SALE", "from_sklad_id": sklad_a}
+        elif roll < 0.6:
+            payload = {"operation_type": "RECEIPT", "to_sklad_id": sklad_a}
+        else:
+            src, dst = (sklad_a, sklad_b) if rnd.random() < 0.5 else (sklad_b, sklad_a)
+            payload = {"operation_type": "TRANSFER", "from_sklad_id": src, "to_sklad_id": dst}
+        data = StockOperationCreate(nomenclature_id=rnd.choice(nomen_ids), quantity=1, **payload)
+
+        session = factory()
+        try:
+            StockOperationService(session).create_operation(data, user)
+            local[payload["operation_type"]] += 1
+        except HTTPException:
+            local["rejected"] += 1
+        except Exception:
+            local["errors"] += 1
+        finally:
+            session.close()
+    with lock:
+        results.update(local)
+
+
+def check(session, org_id, nomen_ids, initial, results):
+    violations = []
+    stocks = session.query(Stock).filter(Stock.nomenclature_id.in_(nomen_ids)).all()
+    rows = Counter((s.nomenclature_id, s.sklad_id) for s in stocks)
+    if any(count > 1 for count in rows.values()):
+        violations.append(f"duplicate stock rows: {dict(rows)}")
+    if any(s.quantity < 0 for s in stocks):
+        violations.append(f"negative stock: {[(str(s.sklad_id), s.quantity) for s in stocks]}")
+
+    total = sum(s.quantity for s in stocks)
+    expected = initial * len(nomen_ids) + results["RECEIPT"] - results["SALE"]
+    if total != expected:
+        violations.append(f"lost update: stock total {total}, expected {expected}")
+
+    per_sklad = Counter()
+    for s in stocks:
+        per_sklad[s.sklad_id] += s.quantity
+    summary = Counter()
+    for sklad_id, quantity in session.query(StockBalance.sklad_id, func.sum(StockBalance.quantity)).filter(
+        StockBalance.organization_id == org_id
+    ).group_by(StockBalance.sklad_id):
+        summary[sklad_id] += int(quantity)
+    if +summary != +per_sklad:
+        violations.append(f"stock_balances drift: {dict(summary)} vs stock {dict(per_sklad)}")
+
+    journal = {
+        OperationType(op_type).value: count
+        for op_type, count in session.query(StockOperation.operation_type, func.count()).filter(
+            StockOperation.organization_id == org_id
+        ).group_by(StockOperation.operation_type)
+    }
+    for op_type in ("SALE", "RECEIPT", "TRANSFER"):
+        if journal.get(op_type, 0) != results[op_type]:
+            violations.append(f"journal mismatch for {op_type}: {journal.get(op_type, 0)} rows, {results[op_type]} acknowledged")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel workers hammering hot SKUs of one sklad through StockOperationService")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--initial", type=int, default=500)
+    parser.add_argument("--skus", type=int, default=1)
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_size=args.workers, max_overflow=0)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    org_id = uuid.uuid4()
+
+    with factory() as session:
+        nomen_ids, sklad_a, sklad_b = seed(session, org_id, args.initial, args.skus)
+
+    user = SimpleNamespace(id=None, connect_organization=str(org_id))
+    results = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=worker, args=(factory, user, nomen_ids, sklad_a, sklad_b, deadline, results, lock))
+        for _ in range(args.workers)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    applied = results["SALE"] + results["RECEIPT"] + results["TRANSFER"]
+    print(f"workers={args.workers} skus={args.skus} elapsed={elapsed:.2f}s")
+    print(f"applied={applied} rejected={results['rejected']} errors={results['errors']}")
+    print(f"throughput={applied / elapsed:.1f} ops/s")
+
+    with factory() as session:
+        violations = check(session, org_id, nomen_ids, args.initial, results)
+    if violations:
+        print("INVARIANT VIOLATIONS:")
+        for violation in violations:
+            print(f"  - {violation}")
+        raise SystemExit(1)
+    print("invariants: ok")
+
+
+if __name__ == "__main__":
+    main()
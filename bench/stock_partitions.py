@@ -0,0 +1,144 @@
+import argparse
+import json
+import re
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.core import SQLALCHEMY_DATABASE_URL
+from app.services.stock_partitions import PARTITION_NAME, add_months, ensure_partitions, month_start
+from app.services.stock_service import StockOperationService
+from bench.offline_seed import seed_offline
+
+FLAT = "bench_stockk_flat"
+
+SEED_SQL = text("""
+    INSERT INTO stockk (id, organization_id, operation_type, to_sklad_id, nomenclature_id, quantity, operation_metadata, created_at, updated_at)
+    SELECT gen_random_uuid(), :org_id, 'RECEIPT', :sklad_id, :nomenclature_id, 1 + i % 10, '{}'::jsonb,
+           CAST(:now AS timestamp) - make_interval(secs => :seconds * (i - 1) / :rows), CAST(:now AS timestamp)
+    FROM generate_series(:start, :stop) AS i
+""")
+
+INSERT_SQL = """
+    INSERT INTO {table} (id, organization_id, operation_type, to_sklad_id, nomenclature_id, quantity, operation_metadata, created_at, updated_at)
+    VALUES (:id, :org_id, 'RECEIPT', :sklad_id, :nomenclature_id, 1, '{{}}'::jsonb, TIMEZONE('utc', now()), TIMEZONE('utc', now()))
+"""
+
+LIST_SQL = """
+    SELECT * FROM {table}
+    WHERE organization_id = :org_id {window}
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+"""
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def scanned(session, statement: str, params: dict) -> int:
+    plan = session.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, params).scalar()
+    plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+    relations, stack = set(), [plan]
+    while stack:
+        node = stack.pop()
+        if node.get("Relation Name"):
+            relations.add(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return len({name for name in relations if PARTITION_NAME.match(name) or name == FLAT})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Operation journal at scale: monthly partitioned stockk vs the same rows in one table")
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--chunk", type=int, default=5_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--inserts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    since = add_months(month_start(now), -args.months)
+    with engine.connect() as conn:
+        created = ensure_partitions(conn, now, since=since)
+    print(f"{len(created)} partitions created for {since:%Y-%m}…")
+
+    with factory() as session:
+        fixture = seed_offline(session, 0, 0, nomenclature=1)
+        org_id = str(fixture["org_id"])
+        params = {"org_id": org_id, "sklad_id": str(fixture["sklad_id"]), "nomenclature_id": str(fixture["nomenclature_ids"][0])}
+
+        started = time.perf_counter()
+        seconds = int((now - since).total_seconds())
+        for start in range(1, args.rows + 1, args.chunk):
+            stop = min(start + args.chunk - 1, args.rows)
+            session.execute(SEED_SQL, {**params, "now": now, "seconds": seconds, "rows": args.rows, "start": start, "stop": stop})
+            session.commit()
+            print(f"  {stop} rows, {time.perf_counter() - started:.0f} s")
+
+        session.execute(text(f"DROP TABLE IF EXISTS {FLAT}"))
+        session.execute(text(f"CREATE TABLE {FLAT} (LIKE stockk INCLUDING DEFAULTS)"))
+        session.execute(text(f"INSERT INTO {FLAT} SELECT * FROM stockk WHERE organization_id = :org_id"), {"org_id": org_id})
+        session.execute(text(f"ALTER TABLE {FLAT} ADD PRIMARY KEY (id, created_at)"))
+        for name, definition in session.execute(text("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'stockk' AND indexname <> 'stockk_pkey'")):
+            definition = re.sub(r" ON (ONLY )?\S+ ", f" ON {FLAT} ", definition).replace(name, f"{name}_flat", 1)
+            session.execute(text(definition))
+        session.commit()
+        session.execute(text("ANALYZE stockk"))
+        session.execute(text(f"ANALYZE {FLAT}"))
+        session.commit()
+        print(f"seeded {args.rows} operations over {args.months} months in {time.perf_counter() - started:.1f} s")
+
+        middle = add_months(since, args.months // 2)
+        window = "AND created_at >= :created_from AND created_at < :created_to"
+        cases = [
+            ("latest page", "", {}),
+            ("one month", window, {"created_from": middle, "created_to": add_months(middle, 1)}),
+            ("one day", window, {"created_from": middle + timedelta(days=10), "created_to": middle + timedelta(days=11)}),
+        ]
+
+        service = StockOperationService(session)
+        page = service.get_operations(fixture["org_id"], limit=args.limit, created_from=middle, created_to=add_months(middle, 1))
+        expected = session.execute(text(LIST_SQL.format(table=FLAT, window=window)),
+                                   {"org_id": org_id, "limit": args.limit, "created_from": middle, "created_to": add_months(middle, 1)}).all()
+        if [op.id for op in page.items] != [row.id for row in expected]:
+            print("FAIL: date-filtered journal page differs from the unpartitioned table")
+            raise SystemExit(1)
+
+        print(f"{'query':<14} {'flat ms':>9} {'parts':>6} {'partitioned ms':>15} {'parts':>6}")
+        for label, clause, extra in cases:
+            query = {"org_id": org_id, "limit": args.limit, **extra}
+            row = []
+            for table in (FLAT, "stockk"):
+                statement = LIST_SQL.format(table=table, window=clause)
+                row.append(timed(lambda: session.execute(text(statement), query).all(), args.repeat))
+                row.append(scanned(session, text(statement).compile(engine).string, query))
+            print(f"{label:<14} {row[0]:>9.1f} {row[1]:>6} {row[2]:>15.1f} {row[3]:>6}")
+
+        for table in (FLAT, "stockk"):
+            statement = text(INSERT_SQL.format(table=table))
+            started = time.perf_counter()
+            for _ in range(args.inserts):
+                session.execute(statement, {**params, "id": str(uuid.uuid4())})
+            session.commit()
+            elapsed = time.perf_counter() - started
+            print(f"inserts into {table:<18} {args.inserts / elapsed:>9.0f} rows/s")
+
+        session.execute(text(f"DROP TABLE {FLAT}"))
+        session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+-- Collapse duplicate stock rows per (nomenclature_id, sklad_id) and enforce uniqueness.
+BEGIN;
+
+LOCK TABLE stock IN SHARE ROW EXCLUSIVE MODE;
+
+WITH totals AS (
+    SELECT nomenclature_id, sklad_id,
+           SUM(quantity) AS quantity,
+           SUM(reserved) AS reserved,
+           MIN(min_quantity) AS min_quantity,
+           (ARRAY_AGG(id ORDER BY created_at, id))[1] AS keep_id
+    FROM stock
+    GROUP BY nomenclature_id, sklad_id
+    HAVING COUNT(*) > 1
+)
+UPDATE stock s
+SET quantity = t.quantity,
+    reserved = t.reserved,
+    min_quantity = t.min_quantity,
+    updated_at = TIMEZONE('utc', now())
+FROM totals t
+WHERE s.id = t.keep_id;
+
+DELETE FROM stock s
+USING (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY nomenclature_id, sklad_id ORDER BY created_at, id) AS rn
+    FROM stock
+) d
+WHERE s.id = d.id AND d.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_nomenclature_sklad ON stock (nomenclature_id, sklad_id);
+
+COMMIT;
@@ -0,0 +1,32 @@
+-- Background inventory report jobs.
+BEGIN;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'reportjobstatus') THEN
+        CREATE TYPE reportjobstatus AS ENUM ('QUEUED', 'RUNNING', 'DONE', 'FAILED');
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id UUID PRIMARY KEY,
+    organization_id UUID NOT NULL REFERENCES organisations (id) ON DELETE CASCADE,
+    requested_by UUID NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    sklad_id UUID REFERENCES sklads (id) ON DELETE CASCADE,
+    status reportjobstatus NOT NULL,
+    error VARCHAR,
+    error_code INTEGER,
+    file_path VARCHAR,
+    download_url VARCHAR,
+    filename VARCHAR,
+    online_url VARCHAR,
+    signature_hash VARCHAR,
+    qr_code TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS ix_report_jobs_organization_id ON report_jobs (organization_id);
+
+COMMIT;
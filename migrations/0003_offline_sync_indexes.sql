@@ -0,0 +1,4 @@
+-- Indexes for the offline delta sync (/api/offline/sklad/changes): rows changed after a watermark.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nomenclature_sklad_updated ON nomenclature (sklad_id, updated_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sklad_doc_org_updated ON sklad_doc (organization_id, updated_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sklad_doc_items_document_updated ON sklad_doc_items (document_id, updated_at);
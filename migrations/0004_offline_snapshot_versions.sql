@@ -0,0 +1,6 @@
+-- Per-sklad data version for the offline snapshot cache, bumped in the same transaction as every write to the sklad's nomenclature/documents.
+CREATE TABLE IF NOT EXISTS offline_snapshot_versions (
+    sklad_id UUID PRIMARY KEY REFERENCES sklads (id) ON DELETE CASCADE,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
@@ -0,0 +1,12 @@
+-- Idempotency log for batched offline scan uploads (POST /api/offline/sklad/results): one row per (device, client seq).
+CREATE TABLE IF NOT EXISTS offline_scans (
+    id UUID PRIMARY KEY,
+    device_id UUID NOT NULL REFERENCES offline_devices (id) ON DELETE CASCADE,
+    seq BIGINT NOT NULL,
+    item_id UUID NOT NULL,
+    quantity_actual INTEGER NOT NULL,
+    status VARCHAR NOT NULL,
+    server_quantity INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    CONSTRAINT uq_offline_scan_device_seq UNIQUE (device_id, seq)
+);
@@ -0,0 +1,26 @@
+-- Item counters on sklad_doc so is_verified is maintained in O(1) per item write instead of rescanning the document.
+BEGIN;
+
+ALTER TABLE sklad_doc ADD COLUMN IF NOT EXISTS total_items INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE sklad_doc ADD COLUMN IF NOT EXISTS verified_items INTEGER NOT NULL DEFAULT 0;
+
+UPDATE sklad_doc d
+SET total_items = c.total_items,
+    verified_items = c.verified_items
+FROM (
+    SELECT document_id,
+           count(*) FILTER (WHERE NOT is_deleted) AS total_items,
+           count(*) FILTER (WHERE NOT is_deleted AND is_verified) AS verified_items
+    FROM sklad_doc_items
+    GROUP BY document_id
+) c
+WHERE d.id = c.document_id
+  AND NOT d.is_deleted
+  AND (d.total_items, d.verified_items) IS DISTINCT FROM (c.total_items, c.verified_items);
+
+UPDATE sklad_doc
+SET is_verified = (total_items > 0 AND verified_items = total_items)
+WHERE NOT is_deleted
+  AND is_verified IS DISTINCT FROM (total_items > 0 AND verified_items = total_items);
+
+COMMIT;
@@ -0,0 +1,6 @@
+-- Trigram GIN indexes for nomenclature search (GET /api/reestr/find and the ILIKE filter of /api/reestr/list).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nomenclature_name_trgm ON nomenclature USING gin (name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nomenclature_article_trgm ON nomenclature USING gin (article gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nomenclature_barcode_trgm ON nomenclature USING gin (barcode gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nomenclature_category_trgm ON nomenclature USING gin (category_id gin_trgm_ops);
@@ -0,0 +1,4 @@
+-- Composite indexes matching the keyset (cursor) order of the paginated lists.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nomenclature_org_sklad_name_id ON nomenclature (organization_id, sklad_id, name, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stockk_org_created_id ON stockk (organization_id, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sklads_org_created_id ON sklads (organization_id, created_at, id);
@@ -0,0 +1,14 @@
+-- Composite and partial indexes for the hot service queries; checked by `python -m bench.plan_check`.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nomenclature_live_org_sklad_name ON nomenclature (organization_id, sklad_id, name, id) WHERE is_deleted = false;
+DROP INDEX CONCURRENTLY IF EXISTS ix_nomenclature_org_sklad_name_id;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stockk_org_nomenclature_created ON stockk (organization_id, nomenclature_id, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stockk_org_type_created ON stockk (organization_id, operation_type, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sklad_doc_live_org ON sklad_doc (organization_id, created_at) WHERE is_deleted = false;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sklad_doc_items_live_document ON sklad_doc_items (document_id, id) WHERE is_deleted = false;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_invitations_org_status_user ON invitations (organization_id, status, user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_invitations_org_status_email ON invitations (organization_id, status, email);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_connect_organization ON users (connect_organization) WHERE connect_organization IS NOT NULL;
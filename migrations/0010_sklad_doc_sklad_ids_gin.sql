@@ -0,0 +1,3 @@
+-- Documents are filtered per sklad with `sklad_ids @> ARRAY[:id]`; a GIN index serves containment, the old btree on the array never did.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sklad_doc_sklad_ids_gin ON sklad_doc USING gin (sklad_ids);
+DROP INDEX CONCURRENTLY IF EXISTS ix_sklad_doc_sklad_ids;
@@ -0,0 +1,23 @@
+-- Per-sklad stock totals maintained by stock writes (GET /api/stock/balance/summary), backfilled from live nomenclature stock.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS stock_balances (
+    sklad_id UUID PRIMARY KEY REFERENCES sklads (id) ON DELETE CASCADE,
+    organization_id UUID NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    reserved INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT TIMEZONE('utc', now())
+);
+
+CREATE INDEX IF NOT EXISTS ix_stock_balances_organization_id ON stock_balances (organization_id);
+
+LOCK TABLE stock IN SHARE MODE;
+
+INSERT INTO stock_balances (sklad_id, organization_id, quantity, reserved)
+SELECT s.sklad_id, k.organization_id, COALESCE(SUM(s.quantity) FILTER (WHERE NOT n.is_deleted), 0), COALESCE(SUM(s.reserved) FILTER (WHERE NOT n.is_deleted), 0)
+FROM stock s
+JOIN nomenclature n ON n.id = s.nomenclature_id
+JOIN sklads k ON k.id = s.sklad_id
+GROUP BY s.sklad_id, k.organization_id;
+
+COMMIT;
@@ -0,0 +1,43 @@
+-- Journal checkpoints for GET /api/stock/balance?at=..., plus opening-balance ADJUSTMENTs so replaying stockk reproduces current stock.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS stock_checkpoints (
+    id UUID PRIMARY KEY,
+    organization_id UUID NOT NULL REFERENCES organisations (id) ON DELETE CASCADE,
+    taken_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT TIMEZONE('utc', now())
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_checkpoints_org_taken ON stock_checkpoints (organization_id, taken_at);
+
+CREATE TABLE IF NOT EXISTS stock_checkpoint_lines (
+    checkpoint_id UUID NOT NULL REFERENCES stock_checkpoints (id) ON DELETE CASCADE,
+    sklad_id UUID NOT NULL,
+    nomenclature_id UUID NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (checkpoint_id, sklad_id, nomenclature_id)
+);
+
+LOCK TABLE stock IN SHARE MODE;
+
+INSERT INTO stockk (id, organization_id, operation_type, to_sklad_id, nomenclature_id, quantity, operation_metadata, comment, created_at, updated_at)
+SELECT gen_random_uuid(), n.organization_id, 'ADJUSTMENT', s.sklad_id, s.nomenclature_id, s.quantity - COALESCE(j.quantity, 0),
+       '{"source": "opening_balance"}'::jsonb, 'Opening balance', s.created_at, s.created_at
+FROM stock s
+JOIN nomenclature n ON n.id = s.nomenclature_id
+LEFT JOIN (
+    SELECT sklad_id, nomenclature_id, SUM(quantity) AS quantity
+    FROM (
+        SELECT from_sklad_id AS sklad_id, nomenclature_id, -quantity AS quantity
+        FROM stockk
+        WHERE operation_type IN ('TRANSFER', 'SALE', 'DISPOSAL')
+        UNION ALL
+        SELECT COALESCE(to_sklad_id, from_sklad_id), nomenclature_id, quantity
+        FROM stockk
+        WHERE operation_type IN ('TRANSFER', 'RECEIPT', 'RETURN', 'ADJUSTMENT')
+    ) movements
+    GROUP BY sklad_id, nomenclature_id
+) j ON j.sklad_id = s.sklad_id AND j.nomenclature_id = s.nomenclature_id
+WHERE s.quantity <> COALESCE(j.quantity, 0);
+
+COMMIT;
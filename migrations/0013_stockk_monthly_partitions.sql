@@ -0,0 +1,74 @@
+-- Range-partition the stock operation journal by month on created_at; later months are created by app.services.stock_partitions.
+BEGIN;
+
+LOCK TABLE stockk IN ACCESS EXCLUSIVE MODE;
+
+DO $$
+DECLARE
+    legacy BOOLEAN := NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'stockk'::regclass);
+    bound DATE := date_trunc('month', TIMEZONE('utc', now()));
+    last_bound DATE := date_trunc('month', TIMEZONE('utc', now())) + INTERVAL '3 months';
+BEGIN
+    IF legacy THEN
+        ALTER TABLE stockk RENAME TO stockk_unpartitioned;
+        ALTER TABLE stockk_unpartitioned RENAME CONSTRAINT stockk_pkey TO stockk_unpartitioned_pkey;
+
+        CREATE TABLE stockk (
+            id UUID NOT NULL,
+            organization_id UUID NOT NULL,
+            operation_type operationtype NOT NULL,
+            from_sklad_id UUID REFERENCES sklads (id) ON DELETE SET NULL,
+            to_sklad_id UUID REFERENCES sklads (id) ON DELETE SET NULL,
+            nomenclature_id UUID NOT NULL REFERENCES nomenclature (id) ON DELETE CASCADE,
+            quantity INTEGER NOT NULL,
+            performed_by UUID REFERENCES users (id) ON DELETE SET NULL,
+            operation_metadata JSONB,
+            comment VARCHAR,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT TIMEZONE('utc', now()),
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT TIMEZONE('utc', now()),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+
+        SELECT LEAST(bound, COALESCE(date_trunc('month', min(created_at))::date, bound)),
+               GREATEST(last_bound, COALESCE(date_trunc('month', max(created_at))::date, last_bound))
+        INTO bound, last_bound
+        FROM stockk_unpartitioned;
+    END IF;
+
+    WHILE bound <= last_bound LOOP
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF stockk FOR VALUES FROM (%L) TO (%L)',
+                       'stockk_' || to_char(bound, 'YYYY_MM'), bound, (bound + INTERVAL '1 month')::date);
+        bound := bound + INTERVAL '1 month';
+    END LOOP;
+
+    IF legacy THEN
+        INSERT INTO stockk (id, organization_id, operation_type, from_sklad_id, to_sklad_id, nomenclature_id, quantity,
+                            performed_by, operation_metadata, comment, created_at, updated_at)
+        SELECT id, organization_id, operation_type, from_sklad_id, to_sklad_id, nomenclature_id, quantity,
+               performed_by, operation_metadata, comment, created_at, updated_at
+        FROM stockk_unpartitioned;
+        DROP TABLE stockk_unpartitioned;
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS ix_stockk_organization_id ON stockk (organization_id);
+CREATE INDEX IF NOT EXISTS ix_stockk_operation_type ON stockk (operation_type);
+CREATE INDEX IF NOT EXISTS ix_stockk_from_sklad_id ON stockk (from_sklad_id);
+CREATE INDEX IF NOT EXISTS ix_stockk_to_sklad_id ON stockk (to_sklad_id);
+CREATE INDEX IF NOT EXISTS ix_stockk_nomenclature_id ON stockk (nomenclature_id);
+CREATE INDEX IF NOT EXISTS ix_stockk_org_created_id ON stockk (organization_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_stockk_org_nomenclature_created ON stockk (organization_id, nomenclature_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_stockk_org_type_created ON stockk (organization_id, operation_type, created_at, id);
+
+CREATE TABLE IF NOT EXISTS stock_journal_archives (
+    partition_name VARCHAR PRIMARY KEY,
+    range_from TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    range_to TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    path VARCHAR NOT NULL,
+    row_count INTEGER NOT NULL,
+    archived_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT TIMEZONE('utc', now())
+);
+
+CREATE INDEX IF NOT EXISTS ix_stock_journal_archives_range_to ON stock_journal_archives (range_to);
+
+COMMIT;
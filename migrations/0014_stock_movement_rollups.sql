@@ -0,0 +1,18 @@
+-- Daily stock movement rollups for GET /api/stock/analytics/*, filled incrementally by app.services.stock_analytics.
+CREATE TABLE IF NOT EXISTS stock_movement_rollups (
+    organization_id UUID NOT NULL,
+    day TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    operation_type operationtype NOT NULL,
+    sklad_id UUID NOT NULL,
+    nomenclature_id UUID NOT NULL,
+    quantity_in INTEGER NOT NULL DEFAULT 0,
+    quantity_out INTEGER NOT NULL DEFAULT 0,
+    operations INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (organization_id, day, operation_type, sklad_id, nomenclature_id)
+);
+
+CREATE TABLE IF NOT EXISTS stock_rollup_watermarks (
+    organization_id UUID PRIMARY KEY REFERENCES organisations (id) ON DELETE CASCADE,
+    rolled_until TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT TIMEZONE('utc', now())
+);
@@ -0,0 +1,25 @@
+-- Count each TRANSFER once in stock_movement_rollups.operations; its inbound leg goes to transfers_in, added back only per sklad.
+BEGIN;
+
+LOCK TABLE stock_movement_rollups IN EXCLUSIVE MODE;
+
+ALTER TABLE stock_movement_rollups ADD COLUMN IF NOT EXISTS transfers_in INTEGER NOT NULL DEFAULT 0;
+
+-- Days whose journal is already archived cannot be rebuilt: rows holding only inbound transfer legs are split exactly, mixed rows stay as they are.
+UPDATE stock_movement_rollups
+SET transfers_in = operations,
+    operations = 0
+WHERE operation_type = 'TRANSFER' AND quantity_out = 0 AND transfers_in = 0;
+
+-- Everything still in the journal is dropped and rolled up again by app.services.stock_analytics.
+DELETE FROM stock_movement_rollups
+WHERE day >= COALESCE((SELECT max(range_to) FROM stock_journal_archives), '-infinity'::timestamp);
+
+DELETE FROM stock_rollup_watermarks
+WHERE NOT EXISTS (SELECT 1 FROM stock_journal_archives);
+
+UPDATE stock_rollup_watermarks
+SET rolled_until = LEAST(rolled_until, (SELECT max(range_to) FROM stock_journal_archives)),
+    updated_at = TIMEZONE('utc', now());
+
+COMMIT;
@@ -0,0 +1,12 @@
+-- Item snapshot of streamed inventory reports, paged by GET /api/report/inventory/view/{token}.
+CREATE TABLE IF NOT EXISTS inventory_token_items (
+    token_id UUID NOT NULL REFERENCES inventory_tokens (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name VARCHAR NOT NULL,
+    article VARCHAR NOT NULL,
+    barcode VARCHAR,
+    unit VARCHAR NOT NULL,
+    quantity INTEGER NOT NULL,
+    sklad_name VARCHAR,
+    PRIMARY KEY (token_id, position)
+);
@@ -0,0 +1,9 @@
+-- Documents removed from a sklad, sent as deletions in that sklad's offline delta feed (GET /api/offline/sklad/changes).
+CREATE TABLE IF NOT EXISTS sklad_doc_unlinks (
+    document_id UUID NOT NULL REFERENCES sklad_doc (id) ON DELETE CASCADE,
+    sklad_id UUID NOT NULL,
+    unlinked_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT TIMEZONE('utc', now()),
+    PRIMARY KEY (document_id, sklad_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_sklad_doc_unlinks_sklad_unlinked ON sklad_doc_unlinks (sklad_id, unlinked_at);
@@ -0,0 +1,20 @@
+-- Soft-deleted nomenclature holds no stock: journal its remaining quantity out and zero the rows, so GET /api/stock/balance?at=... agrees with /balance/summary.
+BEGIN;
+
+LOCK TABLE stock IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO stockk (id, organization_id, operation_type, to_sklad_id, nomenclature_id, quantity, operation_metadata, comment, created_at, updated_at)
+SELECT gen_random_uuid(), n.organization_id, 'ADJUSTMENT', s.sklad_id, s.nomenclature_id, -s.quantity,
+       '{"source": "nomenclature_delete"}'::jsonb, 'Deleted nomenclature', TIMEZONE('utc', now()), TIMEZONE('utc', now())
+FROM stock s
+JOIN nomenclature n ON n.id = s.nomenclature_id
+WHERE n.is_deleted AND s.quantity <> 0;
+
+UPDATE stock s
+SET quantity = 0,
+    reserved = 0,
+    updated_at = TIMEZONE('utc', now())
+FROM nomenclature n
+WHERE n.id = s.nomenclature_id AND n.is_deleted AND (s.quantity <> 0 OR s.reserved <> 0);
+
+COMMIT;
@@ -0,0 +1,12 @@
+-- Spread each sklad's stock_balances row over shards keyed by nomenclature, so writers of different items stop queueing on one row; totals are SUM over shards.
+BEGIN;
+
+LOCK TABLE stock_balances IN ACCESS EXCLUSIVE MODE;
+
+ALTER TABLE stock_balances ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0;
+
+-- Existing totals stay in shard 0; which shard holds a delta does not matter for the sum.
+ALTER TABLE stock_balances DROP CONSTRAINT IF EXISTS stock_balances_pkey;
+ALTER TABLE stock_balances ADD CONSTRAINT stock_balances_pkey PRIMARY KEY (sklad_id, shard);
+
+COMMIT;